@@ -23,6 +23,10 @@ public class PlannerRequest {
     // - constraints (TripConstraints)
     // - preferences (Preferences - sans les paramètres météo)
     
+    // Géométrie des segments: vrai seulement si le champ GraphQL geometry est sélectionné
+    // (le Planner ne demande alors pas de polylines au Routing)
+    private Boolean includeGeometry;
+    
     @Data
     @Builder
     public static class Location {
@@ -2,6 +2,7 @@ package com.healthroute.gateway.resolver;
 
 import com.healthroute.gateway.model.*;
 import com.healthroute.gateway.service.HealthRouteOrchestrator;
+import graphql.schema.DataFetchingFieldSelectionSet;
 import lombok.RequiredArgsConstructor;
 import lombok.extern.slf4j.Slf4j;
 import org.springframework.graphql.data.method.annotation.Argument;
@@ -33,9 +34,12 @@ public class HealthPlanResolver {
      * - Logger la requête
      * - Appeler l'orchestrateur
      * - Retourner le résultat ou erreur GraphQL
+     * - Géométrie demandée au Planner seulement si le client sélectionne
+     *   le champ geometry d'un segment (payloads réduits sinon)
      */
     @QueryMapping
-    public Mono<HealthPlanResponse> healthPlan(@Argument HealthPlanInput input) {
+    public Mono<HealthPlanResponse> healthPlan(@Argument HealthPlanInput input,
+                                               DataFetchingFieldSelectionSet selectionSet) {
         
         // ÉTAPE 4.1.1: Logger la requête entrante
         // - "Received healthPlan request: origin={}, destination={}"
@@ -46,8 +50,10 @@ public class HealthPlanResolver {
         // - Si invalide, retourner Mono.error() avec GraphQL error
         
         // ÉTAPE 4.1.3: Déléguer au service
-        // - Appeler orchestrator.planHealthRoute(input)
+        // - Le champ geometry est-il sélectionné (n'importe quel plan) ?
+        boolean includeGeometry = selectionSet.contains("**/segments/geometry");
         // - Laisser le service gérer la logique
+        Mono<HealthPlanResponse> response = orchestrator.planHealthRoute(input, includeGeometry);
         
         // ÉTAPE 4.1.4: Gestion des erreurs
         // - doOnError() pour logger les erreurs
@@ -57,6 +63,6 @@ public class HealthPlanResolver {
         // ÉTAPE 4.1.5: Logger la réponse
         // - doOnSuccess() pour logger: "Successfully returned health plan"
         
-        return null; // TODO: Implémenter
+        return response; // TODO: Validation, gestion des erreurs et logs (4.1.1, 4.1.2, 4.1.4, 4.1.5)
     }
 }
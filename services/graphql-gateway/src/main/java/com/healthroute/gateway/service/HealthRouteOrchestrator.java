@@ -40,8 +40,9 @@ public class HealthRouteOrchestrator {
      * - Orchestrer les appels séquentiels
      * - Construire la réponse finale
      * - Gérer les erreurs globalement
+     * - includeGeometry: transmis au Planner (polylines omises si faux)
      */
-    public Mono<HealthPlanResponse> planHealthRoute(HealthPlanInput input) {
+    public Mono<HealthPlanResponse> planHealthRoute(HealthPlanInput input, boolean includeGeometry) {
         
         // ÉTAPE 3.1.1: Génération du requestId
         // - Utiliser UUID.randomUUID()
@@ -53,7 +54,8 @@ public class HealthRouteOrchestrator {
         // - Si invalide, retourner Mono.error() avec message clair
         
         // ÉTAPE 3.1.3: Appeler le Planner
-        // - Transformer HealthPlanInput en PlannerRequest
+        // - Transformer HealthPlanInput en PlannerRequest (avec includeGeometry)
+        PlannerRequest plannerRequest = transformToPlannerRequest(input, includeGeometry);
         // - Appeler callHealthPlanner()
         // - En cas d'erreur, logger et renvoyer erreur
         
@@ -176,7 +178,7 @@ public class HealthRouteOrchestrator {
     /**
      * ÉTAPE 3.5: Transformer input GraphQL en request REST
      */
-    private PlannerRequest transformToPlannerRequest(HealthPlanInput input) {
+    private PlannerRequest transformToPlannerRequest(HealthPlanInput input, boolean includeGeometry) {
         
         // ÉTAPE: Mapper tous les champs
         // - origin
@@ -185,7 +187,10 @@ public class HealthRouteOrchestrator {
         // - goals
         // - constraints
         // - preferences (exclure avoidRain et windTolerance - c'est pour Weather)
+        // - includeGeometry (sélection du champ GraphQL geometry)
         
-        return null; // TODO: Implémenter
+        return PlannerRequest.builder()
+                .includeGeometry(includeGeometry)
+                .build(); // TODO: Mapper les autres champs (origin, destination, goals...)
     }
 }
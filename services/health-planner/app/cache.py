@@ -4,18 +4,26 @@ Cache pour stocker les plans générés (persistance JSON)
 LOGIQUE:
 - Sauvegarder les plans pour analyse/monitoring
 - Éviter de recalculer des plans identiques
-- Limiter la taille du cache (FIFO)
+- Limiter la taille du cache (LRU borné en nombre et en octets, cœur partagé
+  avec les caches Naolib et météo)
 """
 
 import json
+import logging
 import os
 from datetime import datetime
 from typing import Dict, Optional, List
 import hashlib
 
+from .cache_core import LRUCache
+
+logger = logging.getLogger(__name__)
+
 DATA_DIR = "/app/data"
 CACHE_FILE = os.path.join(DATA_DIR, "plans_cache.json")
 MAX_CACHE_SIZE = 100  # Nombre max de plans en cache
+MAX_CACHE_BYTES = 8 * 1024 * 1024  # Taille approximative (JSON) max en mémoire
+PLAN_TTL_SECONDS = 3600  # Un plan de plus d'une heure n'est plus servi
 
 
 class PlanCache:
@@ -23,16 +31,30 @@ class PlanCache:
     Gestionnaire de cache pour les plans
     """
     
-    def __init__(self):
+    def __init__(
+        self,
+        path: str = CACHE_FILE,
+        max_entries: int = MAX_CACHE_SIZE,
+        max_bytes: int = MAX_CACHE_BYTES,
+        ttl_seconds: int = PLAN_TTL_SECONDS
+    ):
         """
         ÉTAPE: Initialiser le cache
         
         LOGIQUE:
         - Créer le dossier data s'il n'existe pas
         - Charger le cache existant ou créer un nouveau
+        - Entrées en mémoire: hash -> {"timestamp", "plan"} (LRU + TTL)
         """
-        # TODO: Implémenter
-        pass
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._entries = LRUCache(max_entries, max_bytes, ttl_seconds)
+        for request_hash, entry in self._load_cache().items():
+            try:
+                saved_at = datetime.fromisoformat(entry["timestamp"]).timestamp()
+            except (KeyError, TypeError, ValueError):
+                continue
+            self._entries.set(request_hash, entry, expires_at=saved_at + ttl_seconds)
     
     
     def _load_cache(self) -> Dict:
@@ -44,8 +66,18 @@ class PlanCache:
         - Parser JSON
         - Si fichier n'existe pas ou corrompu, retourner {}
         """
-        # TODO: Implémenter
-        pass
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                cache = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable plan cache {self.path}: {e}")
+            return {}
+        if not isinstance(cache, dict):
+            return {}
+        # Les plus anciens d'abord: le LRU garde les plus récents si la borne a baissé
+        return dict(sorted(cache.items(), key=lambda item: str(item[1].get("timestamp", ""))))
     
     
     def _save_cache(self, cache: Dict):
@@ -56,9 +88,15 @@ class PlanCache:
         - Écrire le dict en JSON
         - Formater joliment (indent=2)
         - Gérer les erreurs d'écriture
+        - Fichier temporaire puis renommage: jamais de fichier à moitié écrit
         """
-        # TODO: Implémenter
-        pass
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(cache, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.error(f"Failed to save plan cache {self.path}: {e}")
     
     
     def get_plan(self, request_hash: str) -> Optional[Dict]:
@@ -67,11 +105,11 @@ class PlanCache:
         
         LOGIQUE:
         - Chercher par hash de la requête
-        - Vérifier que le plan n'est pas trop ancien (ex: < 1 heure)
+        - Vérifier que le plan n'est pas trop ancien (ex: < 1 heure): TTL du LRU
         - Retourner le plan ou None
         """
-        # TODO: Implémenter
-        pass
+        entry = self._entries.get(request_hash)
+        return entry["plan"] if entry is not None else None
     
     
     def save_plan(self, request_hash: str, plan: Dict):
@@ -80,11 +118,11 @@ class PlanCache:
         
         LOGIQUE:
         - Ajouter timestamp
-        - Limiter la taille du cache (FIFO)
-        - Sauvegarder sur disque
+        - Limiter la taille du cache (éviction LRU, bornes en entrées et en octets)
+        - Sauvegarder sur disque (au plus MAX_CACHE_SIZE plans)
         """
-        # TODO: Implémenter
-        pass
+        self._entries.set(request_hash, {"timestamp": datetime.now().isoformat(), "plan": plan})
+        self._save_cache(self._entries_by_hash())
     
     
     def generate_request_hash(self, request: Dict) -> str:
@@ -92,12 +130,19 @@ class PlanCache:
         ÉTAPE: Générer un hash unique pour une requête
         
         LOGIQUE:
-        - Sérialiser les champs importants (origin, dest, goals)
+        - Sérialiser les champs importants (origin, dest, goals, constraints)
         - Calculer MD5 ou SHA256
         - Retourner le hash en hex
         """
-        # TODO: Implémenter
-        pass
+        key = {
+            field: request.get(field)
+            for field in (
+                "origin", "destination", "departure_time", "goals", "constraints", "preferences",
+                "include_geometry",
+            )
+        }
+        payload = json.dumps(key, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
     
     
     def get_recent_plans(self, limit: int = 10) -> List[Dict]:
@@ -109,5 +154,19 @@ class PlanCache:
         - Retourner les N premiers
         - Utile pour monitoring/debug
         """
-        # TODO: Implémenter
-        pass
+        self._entries.expire()
+        entries = sorted(
+            ({"request_hash": h, **entry} for h, entry in self._entries_by_hash().items()),
+            key=lambda entry: entry["timestamp"],
+            reverse=True
+        )
+        return entries[:limit]
+    
+    
+    def get_stats(self) -> Dict:
+        """Retourner les compteurs du cache (pour /metrics)"""
+        return self._entries.get_stats()
+    
+    
+    def _entries_by_hash(self) -> Dict[str, Dict]:
+        return {request_hash: entry for request_hash, (entry, _) in self._entries.items()}
@@ -8,34 +8,96 @@ LOGIQUE MÉTIER PRINCIPALE:
 - Type C: Boucle courte près du départ ou arrivée
 
 Chaque type a une stratégie différente pour atteindre l'objectif d'activité
+
+CONCURRENCE:
+- Les appels indépendants sont lancés en parallèle via FanOutScheduler
+- Étape 1: baseline + parkings origine/destination
+- Étape 2: Type A et Type B (tous leurs segments en parallèle)
+- Étape 3: Type C (dépend de l'activité obtenue par A et B)
 """
 
+import asyncio
 import logging
-from typing import List, Dict, Any
+import math
+from typing import List, Dict, Any, Optional
 import httpx
 
+from .fanout import FanOutScheduler, FanOutScope
+from .http_clients import ServiceClients
+from .payload_stats import PayloadStats
+from .singleflight import SingleFlight, route_key
+
 logger = logging.getLogger(__name__)
 
+# Paramètres de génération
+MIN_WAIT_MINUTES = 5             # Attente minimale pour un candidat Type A
+MAX_NEXT_STOPS = 2               # Arrêts suivants testés par attente
+PARKING_SEARCH_RADIUS_M = 800    # Rayon de recherche des parkings vélos
+MAX_PARKINGS_PER_SIDE = 3        # Parkings retenus autour de l'origine / destination
+MAX_TYPE_B_CANDIDATES = 5        # Top N candidats Type B
+WALK_SPEED_KMH = 5.0
+
+# Paramètres HTTP (timeouts: voir PoolConfig)
+CALL_RETRIES = 1
+
 
 class CandidateGenerator:
     """
     Générateur de candidats de plans santé
     """
-    
-    def __init__(self, routing_service_url: str, naolib_service_url: str):
+
+    def __init__(
+        self,
+        routing_service_url: str,
+        naolib_service_url: str,
+        scheduler: Optional[FanOutScheduler] = None,
+        deadline_seconds: float = 2.5,
+        clients: Optional[ServiceClients] = None,
+        route_time_bucket_minutes: int = 5,
+        geometry_tolerance_m: float = 5.0
+    ):
         """
         ÉTAPE: Initialiser le générateur
-        
+
         LOGIQUE:
         - Stocker les URLs des services
-        - Créer des clients HTTP (httpx.AsyncClient)
-        - Configurer les timeouts
+        - Utiliser les clients HTTP partagés (pools créés par le lifespan) ;
+          sans clients injectés, le générateur crée ses propres pools et
+          les ferme dans aclose()
+        - Partager un FanOutScheduler (limite d'appels en vol par service)
+        - deadline_seconds: budget total d'une génération de candidats
+        - Coalescer les segments identiques en vol (single-flight), y compris
+          entre requêtes /plan concurrentes
+        - geometry_tolerance_m: simplification des polylines demandées au Routing
+        - Compter les octets reçus par service / endpoint en aval
         """
         self.routing_url = routing_service_url
         self.naolib_url = naolib_service_url
-        # TODO: Initialiser httpx clients
-    
-    
+        self._owns_clients = clients is None
+        self.clients = clients or ServiceClients({
+            "routing": routing_service_url,
+            "naolib": naolib_service_url,
+        })
+        self.scheduler = scheduler or FanOutScheduler({"routing": 16, "naolib": 8})
+        self.deadline_seconds = deadline_seconds
+        self.route_flights = SingleFlight()
+        self.route_time_bucket_minutes = route_time_bucket_minutes
+        self.geometry_tolerance_m = geometry_tolerance_m
+        self.payload_received = PayloadStats()
+
+
+    async def aclose(self):
+        """
+        ÉTAPE: Libérer les ressources du générateur
+
+        LOGIQUE:
+        - Fermer les pools HTTP seulement s'ils ont été créés ici (les
+          clients injectés appartiennent à leur créateur, ex. le lifespan)
+        """
+        if self._owns_clients:
+            await self.clients.aclose()
+
+
     async def generate_candidates(
         self,
         origin: Dict,
@@ -43,114 +105,209 @@ class CandidateGenerator:
         departure_time: str,
         goals: Dict,
         constraints: Dict,
-        request_id: str
+        request_id: str,
+        include_geometry: bool = True
     ) -> List[Dict]:
         """
         ÉTAPE PRINCIPALE: Générer tous les types de candidats
-        
+
         LOGIQUE:
         1. Obtenir l'itinéraire normal (baseline)
         2. Générer candidats Type A (attente -> marche)
         3. Générer candidats Type B (waypoint)
         4. Générer candidats Type C (boucle)
         5. Retourner la liste complète
-        
+
+        Les étapes indépendantes sont exécutées en parallèle sous une
+        deadline unique (self.deadline_seconds).
+
+        include_geometry=False: aucun itinéraire n'est demandé avec sa
+        polyline (le client n'affiche pas le tracé, payloads minimaux).
+
         RETURN: Liste de dictionnaires représentant des candidats
         """
-        
-        # ÉTAPE 1: Obtenir l'itinéraire normal
-        # - Appeler Routing service avec mode=transit
-        # - Analyser les segments pour trouver les attentes
-        # - Stocker comme baseline pour comparaison
-        # - Logger: "Baseline route: {} minutes, {} km"
-        
+        scope = self.scheduler.scope(self.deadline_seconds, request_id)
+        wants_bike = (goals.get("bike_minutes") or 0) > 0
+
+        # ÉTAPE 1: Obtenir l'itinéraire normal + les parkings (en parallèle)
+        # - Les parkings ne dépendent pas de la baseline
+        calls = [(
+            "routing", self._call_routing_service,
+            ("transit", origin["lat"], origin["lon"],
+             destination["lat"], destination["lon"], departure_time, request_id, include_geometry)
+        )]
+        if wants_bike:
+            calls.append((
+                "naolib", self._call_naolib_service,
+                (origin["lat"], origin["lon"], PARKING_SEARCH_RADIUS_M, request_id)
+            ))
+            calls.append((
+                "naolib", self._call_naolib_service,
+                (destination["lat"], destination["lon"], PARKING_SEARCH_RADIUS_M, request_id)
+            ))
+        results = await scope.gather(calls)
+        baseline_route = results[0]
+        origin_parkings = results[1] if wants_bike else None
+        dest_parkings = results[2] if wants_bike else None
+
+        if baseline_route is None:
+            logger.error(f"[{request_id}] Baseline route unavailable, no candidates")
+            return []
+        logger.info(
+            f"[{request_id}] Baseline route: {baseline_route.get('duration_minutes')} minutes, "
+            f"{baseline_route.get('distance_km')} km"
+        )
+
         # ÉTAPE 2: Initialiser la liste de candidats
         candidates = []
-        
-        # ÉTAPE 3: Générer Type A (si applicable)
-        # - Appeler _generate_type_a_candidates()
-        # - Ajouter à la liste
-        # - Logger: "Generated {} Type A candidates"
-        
-        # ÉTAPE 4: Générer Type B (si applicable)
-        # - Appeler _generate_type_b_candidates()
-        # - Ajouter à la liste
-        # - Logger: "Generated {} Type B candidates"
-        
+
+        # ÉTAPE 3 + 4: Générer Type A et Type B en parallèle
+        type_a, type_b = await asyncio.gather(
+            self._generate_type_a_candidates(
+                baseline_route, origin, destination, goals, request_id,
+                scope=scope, departure_time=departure_time, constraints=constraints,
+                include_geometry=include_geometry
+            ),
+            self._generate_type_b_candidates(
+                origin, destination, goals, constraints, request_id,
+                scope=scope, departure_time=departure_time,
+                origin_parkings=origin_parkings, dest_parkings=dest_parkings,
+                include_geometry=include_geometry
+            )
+        )
+        logger.info(f"[{request_id}] Generated {len(type_a)} Type A candidates")
+        logger.info(f"[{request_id}] Generated {len(type_b)} Type B candidates")
+        candidates.extend(type_a)
+        candidates.extend(type_b)
+
         # ÉTAPE 5: Générer Type C (si objectif non atteint)
-        # - Appeler _generate_type_c_candidates()
-        # - Ajouter à la liste
-        # - Logger: "Generated {} Type C candidates"
-        
+        # - Base de la boucle: meilleur candidat en marche, sinon la baseline
+        baseline_candidate = self._build_candidate(
+            "BASELINE", baseline_route.get("segments", []), "Itinéraire normal"
+        )
+        best_base = max(candidates + [baseline_candidate], key=lambda c: c["walk_minutes"])
+        type_c = await self._generate_type_c_candidates(
+            origin, destination, goals, constraints,
+            best_base["walk_minutes"], request_id,
+            scope=scope, base_candidate=best_base, include_geometry=include_geometry
+        )
+        logger.info(f"[{request_id}] Generated {len(type_c)} Type C candidates")
+        candidates.extend(type_c)
+
         # ÉTAPE 6: Logger et retourner
-        # - Logger: "Total candidates generated: {}"
-        # - Retourner candidates
-        
-        # TODO: Implémenter
-        pass
-    
-    
+        logger.info(
+            f"[{request_id}] Total candidates generated: {len(candidates)} "
+            f"({scope.remaining():.2f}s left before deadline)"
+        )
+        return candidates
+
+
     async def _generate_type_a_candidates(
         self,
         baseline_route: Dict,
         origin: Dict,
         destination: Dict,
         goals: Dict,
-        request_id: str
+        request_id: str,
+        scope: Optional[FanOutScope] = None,
+        departure_time: str = "now",
+        constraints: Optional[Dict] = None,
+        include_geometry: bool = True
     ) -> List[Dict]:
         """
         ÉTAPE 2.1: Candidats Type A - Remplacer l'attente par la marche
-        
+
         LOGIQUE MÉTIER:
         - Analyser l'itinéraire normal
         - Trouver les segments avec attente (waiting time)
         - Pour chaque attente > 5 minutes:
           * Proposer de marcher vers un arrêt suivant
           * Calculer si ça réduit l'attente ET ajoute de la marche
-        
+
         EXEMPLE:
         - Itinéraire normal: Attendre 15min à l'arrêt A, puis bus
         - Candidat A: Marcher 10min vers l'arrêt B, attendre 2min, puis bus
         - Résultat: +10min marche, -13min attente = gain!
+
+        Une seule recherche par attente (GET /transit/walk-ahead): arrêts
+        suivants du même trajet avec la marche pré-calculée depuis l'arrêt
+        et le segment transit restant ; toutes les attentes en un fan-out.
         """
-        
+        scope = scope or self.scheduler.scope(self.deadline_seconds, request_id)
+        segments = baseline_route.get("segments", [])
+
         # ÉTAPE 2.1.1: Identifier les attentes dans baseline
-        # - Parser baseline_route.segments
-        # - Chercher les gaps temporels entre segments
-        # - waiting_periods = [(stop_id, wait_time_minutes)]
-        
-        # ÉTAPE 2.1.2: Pour chaque attente significative (> 5min)
-        # - Identifier l'arrêt actuel (stop A)
-        # - Obtenir les arrêts suivants sur la ligne (stop B, C...)
-        # - Calculer distance de marche A->B, A->C
-        # - Vérifier si temps de marche < temps d'attente
-        
-        # ÉTAPE 2.1.3: Générer un candidat pour chaque option valide
-        # - Créer un nouveau plan avec:
-        #   * Segment marche: origin -> stop B
-        #   * Segment transit: stop B -> destination
-        # - Calculer durée totale et activité ajoutée
-        # - Vérifier contraintes (temps max, détour)
-        
+        # - Suivies du segment transit qu'elles précèdent (trajet identifié)
+        waiting_periods = [
+            (index, segment) for index, segment in enumerate(segments)
+            if segment.get("mode") == "WAIT"
+            and segment.get("duration_minutes", 0) > MIN_WAIT_MINUTES
+            and index + 1 < len(segments)
+            and segments[index + 1].get("mode") == "TRANSIT"
+            and segments[index + 1].get("trip_id")
+        ]
+        if not waiting_periods:
+            return []
+
+        # ÉTAPE 2.1.2: Arrêts suivants sur la ligne (une recherche par attente)
+        results = await scope.gather([
+            ("routing", self._call_walk_ahead, (segments[index + 1], request_id, include_geometry))
+            for index, _ in waiting_periods
+        ])
+
+        # ÉTAPE 2.1.3: Générer un candidat pour chaque arrêt suivant valide
+        # - Même véhicule: marcher A->B, attendre le passage à B, puis le
+        #   reste du trajet ; la suite de la baseline est inchangée
+        candidates = []
+        for (index, wait_segment), result in zip(waiting_periods, results):
+            if not result or not result.get("lines"):
+                continue
+            for stop in result["lines"][0]["stops"]:
+                walk, ride = stop.get("walk"), stop.get("ride")
+                if walk is None or ride is None:
+                    continue
+                # - Vérifier si temps de marche < temps d'attente (le véhicule
+                #   passe à B ride_minutes après A: il est forcément attrapé)
+                if walk["duration_minutes"] >= wait_segment["duration_minutes"]:
+                    continue
+                new_segments = segments[:index] + [walk]
+                remaining_wait = wait_segment["duration_minutes"] + stop["ride_minutes"] - walk["duration_minutes"]
+                if remaining_wait > 0:
+                    new_segments.append({
+                        "mode": "WAIT",
+                        "from": walk["to"],
+                        "to": walk["to"],
+                        "duration_minutes": remaining_wait,
+                        "distance_km": 0.0,
+                    })
+                new_segments += [ride] + segments[index + 2:]
+                candidates.append(self._build_candidate(
+                    "A", new_segments,
+                    f"Marche vers l'arrêt {stop.get('name') or stop.get('stop_id')} au lieu d'attendre"
+                ))
+
         # ÉTAPE 2.1.4: Filtrer et retourner
-        # - Ne garder que les candidats qui respectent les contraintes
-        # - Trier par gain d'activité / pénalité temps
-        
-        # TODO: Implémenter
-        return []
-    
-    
+        candidates = self._filter_by_constraints(candidates, constraints or {})
+        candidates.sort(key=lambda c: c["walk_minutes"], reverse=True)
+        return candidates
+
+
     async def _generate_type_b_candidates(
         self,
         origin: Dict,
         destination: Dict,
         goals: Dict,
         constraints: Dict,
-        request_id: str
+        request_id: str,
+        scope: Optional[FanOutScope] = None,
+        departure_time: str = "now",
+        origin_parkings: Optional[List[Dict]] = None,
+        dest_parkings: Optional[List[Dict]] = None,
+        include_geometry: bool = True
     ) -> List[Dict]:
         """
         ÉTAPE 2.2: Candidats Type B - Waypoint intermédiaire
-        
+
         LOGIQUE MÉTIER:
         - Ajouter un point P entre origine et destination
         - P peut être:
@@ -158,49 +315,244 @@ class CandidateGenerator:
           * Un arrêt de transit stratégique
           * Un point d'intérêt
         - Créer: A -> P (walk/bike) -> P -> B (transit/walk)
-        
+
         EXEMPLE VÉLO:
         - Normal: A -> Bus -> B (5min marche)
         - Type B: A -> Parking1 (walk 8min) -> Vélo -> Parking2 (bike 15min) -> B (walk 5min)
         - Résultat: 8min marche + 15min vélo
-        
+
         EXEMPLE MARCHE:
         - Normal: A -> Bus1 -> B (0min marche)
         - Type B: A -> Stop1 (walk 12min) -> Bus2 -> B
         - Résultat: 12min marche
+
+        CONCURRENCE:
+        - Les N segments A->P1, N*M segments P1->P2 et M segments P2->B
+          sont obtenus par 3 matrices (POST /route/matrix) en parallèle
+          au lieu de N + N*M + M itinéraires
+        - Les matrices servent au classement ; la géométrie (si demandée)
+          n'est récupérée que pour les segments des candidats retenus
         """
-        
+        scope = scope or self.scheduler.scope(self.deadline_seconds, request_id)
+
         # ÉTAPE 2.2.1: Identifier les waypoints possibles
-        # - Si goals.bike_minutes > 0:
-        #   * Appeler Naolib pour obtenir bike parkings proches de origin
-        #   * Appeler Naolib pour obtenir bike parkings proches de destination
-        # - Sinon:
-        #   * Chercher des arrêts de transit intermédiaires
-        
-        # ÉTAPE 2.2.2: Pour chaque paire de parkings (P1, P2)
-        # - Calculer: A -> P1 (walk) -> P1 -> P2 (bike) -> P2 -> B (walk)
-        # - Appeler Routing pour chaque segment
-        # - Vérifier disponibilité des parkings (Naolib)
-        # - Calculer temps total et activité
-        
-        # ÉTAPE 2.2.3: Pour les waypoints marche
-        # - Chercher des arrêts à ~1km de l'origine
-        # - Calculer: A -> Stop (walk) -> Stop -> B (transit)
-        # - Vérifier que ça ajoute assez de marche
-        
+        if (goals.get("bike_minutes") or 0) > 0:
+            if origin_parkings is None or dest_parkings is None:
+                origin_parkings, dest_parkings = await scope.gather([
+                    ("naolib", self._call_naolib_service,
+                     (origin["lat"], origin["lon"], PARKING_SEARCH_RADIUS_M, request_id)),
+                    ("naolib", self._call_naolib_service,
+                     (destination["lat"], destination["lon"], PARKING_SEARCH_RADIUS_M, request_id)),
+                ])
+            # - Écarter les parkings hors d'atteinte à pied dans le temps max
+            #   (une isochrone par côté) avant de retenir les plus proches
+            max_time = (constraints or {}).get("max_total_time_minutes")
+            if max_time:
+                origin_parkings, dest_parkings = await self._reachable_parkings(
+                    origin, destination, origin_parkings or [], dest_parkings or [],
+                    max_time, request_id, scope
+                )
+            candidates = await self._bike_waypoint_candidates(
+                origin, destination, (origin_parkings or [])[:MAX_PARKINGS_PER_SIDE],
+                (dest_parkings or [])[:MAX_PARKINGS_PER_SIDE],
+                departure_time, request_id, scope
+            )
+        else:
+            # ÉTAPE 2.2.3: Pour les waypoints marche
+            candidates = await self._walk_waypoint_candidates(
+                origin, destination, goals, departure_time, request_id, scope, include_geometry
+            )
+
         # ÉTAPE 2.2.4: Filtrer par contraintes
-        # - Temps total < constraints.max_total_time
-        # - Détour < constraints.max_detour
-        # - Activité proche de goals
-        
+        candidates = self._filter_by_constraints(candidates, constraints)
+
         # ÉTAPE 2.2.5: Optimiser les meilleurs
         # - Trier par proximité avec l'objectif
-        # - Ne garder que les Top N (ex: 5 candidats)
-        
-        # TODO: Implémenter
-        return []
-    
-    
+        walk_goal = goals.get("walk_minutes") or 0
+        bike_goal = goals.get("bike_minutes") or 0
+        candidates.sort(
+            key=lambda c: abs(c["walk_minutes"] - walk_goal) + abs(c["bike_minutes"] - bike_goal)
+        )
+        candidates = candidates[:MAX_TYPE_B_CANDIDATES]
+
+        # ÉTAPE 2.2.6: Géométrie des segments issus des matrices
+        if include_geometry:
+            await self._attach_segment_geometry(candidates, departure_time, request_id, scope)
+        return candidates
+
+
+    async def _attach_segment_geometry(
+        self,
+        candidates: List[Dict],
+        departure_time: str,
+        request_id: str,
+        scope: FanOutScope
+    ):
+        """
+        ÉTAPE 2.2.6: Ajouter la géométrie aux segments walk / bike qui n'en ont pas
+
+        LOGIQUE:
+        - Segments venant des matrices (durée et distance seulement)
+        - Un GET /route par segment distinct (mode, départ, arrivée), en
+          parallèle ; les candidats qui partagent un segment partagent l'appel
+        - Durées et distances des matrices conservées (classement inchangé) ;
+          un appel en échec laisse le segment sans géométrie
+        """
+        legs: Dict[tuple, List[Dict]] = {}
+        for candidate in candidates:
+            for segment in candidate["segments"]:
+                if segment.get("geometry") or segment.get("mode") not in ("WALK", "BIKE"):
+                    continue
+                start, end = segment["from"], segment["to"]
+                key = (segment["mode"].lower(), start["lat"], start["lon"], end["lat"], end["lon"])
+                legs.setdefault(key, []).append(segment)
+        if not legs:
+            return
+        routes = await scope.gather([
+            ("routing", self._call_routing_service, (*key, departure_time, request_id, True))
+            for key in legs
+        ])
+        for segments, route in zip(legs.values(), routes):
+            if route and route.get("geometry"):
+                for segment in segments:
+                    segment["geometry"] = route["geometry"]
+
+
+    async def _bike_waypoint_candidates(
+        self,
+        origin: Dict,
+        destination: Dict,
+        origin_parkings: List[Dict],
+        dest_parkings: List[Dict],
+        departure_time: str,
+        request_id: str,
+        scope: FanOutScope
+    ) -> List[Dict]:
+        """
+        ÉTAPE 2.2.2: Pour chaque paire de parkings (P1, P2)
+
+        LOGIQUE:
+        - Calculer: A -> P1 (walk) -> P1 -> P2 (bike) -> P2 -> B (walk)
+        - Trois matrices en parallèle: A x P1 (walk), P1 x P2 (bike),
+          P2 x B (walk) ; chaque cellule donne durée et distance d'un segment
+          (sans géométrie: ajoutée ensuite aux seuls candidats retenus)
+        """
+        if not origin_parkings or not dest_parkings:
+            return []
+
+        walk_in, bike_legs, walk_out = await scope.gather([
+            ("routing", self._call_routing_matrix,
+             ("walk", [origin], origin_parkings, request_id)),
+            ("routing", self._call_routing_matrix,
+             ("bike", origin_parkings, dest_parkings, request_id)),
+            ("routing", self._call_routing_matrix,
+             ("walk", dest_parkings, [destination], request_id)),
+        ])
+        if walk_in is None or bike_legs is None or walk_out is None:
+            return []
+
+        candidates = []
+        for i, p1 in enumerate(origin_parkings):
+            for j, p2 in enumerate(dest_parkings):
+                if p1.get("id") == p2.get("id"):
+                    continue
+                segments = [
+                    _matrix_segment(walk_in, 0, i, origin, p1),
+                    _matrix_segment(bike_legs, i, j, p1, p2),
+                    _matrix_segment(walk_out, j, 0, p2, destination),
+                ]
+                if any(segment is None for segment in segments):
+                    continue
+                candidates.append(self._build_candidate(
+                    "B", segments,
+                    f"Vélo entre les parkings {p1.get('name')} et {p2.get('name')}"
+                ))
+        return candidates
+
+
+    async def _reachable_parkings(
+        self,
+        origin: Dict,
+        destination: Dict,
+        origin_parkings: List[Dict],
+        dest_parkings: List[Dict],
+        max_minutes: int,
+        request_id: str,
+        scope: FanOutScope
+    ) -> tuple:
+        """
+        ÉTAPE 2.2.1 bis: Pré-filtrer les parkings par isochrone
+
+        LOGIQUE:
+        - Isochrone marche de max_minutes depuis l'origine (parkings P1) et
+          depuis la destination (parkings P2, la marche est symétrique)
+        - Un parking hors de l'isochrone ne peut pas donner de candidat
+          dans le temps max: aucun itinéraire n'est demandé pour lui
+        - Si une isochrone échoue, la liste correspondante est gardée telle quelle
+        """
+        sides = [(origin, origin_parkings), (destination, dest_parkings)]
+        isochrones = await scope.gather([
+            ("routing", self._call_routing_isochrone,
+             (place["lat"], place["lon"], max_minutes, parkings, request_id))
+            for place, parkings in sides if parkings
+        ])
+        results = iter(isochrones)
+        filtered = []
+        for _, parkings in sides:
+            isochrone = next(results) if parkings else None
+            if isochrone is None:
+                filtered.append(parkings)
+                continue
+            filtered.append([
+                parking for parking, point in zip(parkings, isochrone["points"]) if point["reachable"]
+            ])
+        logger.debug(
+            f"[{request_id}] Reachable parkings: {len(filtered[0])}/{len(origin_parkings)} near origin, "
+            f"{len(filtered[1])}/{len(dest_parkings)} near destination"
+        )
+        return filtered[0], filtered[1]
+
+
+    async def _walk_waypoint_candidates(
+        self,
+        origin: Dict,
+        destination: Dict,
+        goals: Dict,
+        departure_time: str,
+        request_id: str,
+        scope: FanOutScope,
+        include_geometry: bool = True
+    ) -> List[Dict]:
+        """
+        ÉTAPE 2.2.3: Pour les waypoints marche
+
+        LOGIQUE:
+        - Placer un point W sur l'axe A -> B, à la distance de marche visée
+        - Calculer: A -> W (walk) -> W -> B (transit), en parallèle
+        """
+        walk_km = (goals.get("walk_minutes") or 0) * WALK_SPEED_KMH / 60
+        direct_km = _distance_km(origin["lat"], origin["lon"], destination["lat"], destination["lon"])
+        if walk_km <= 0 or direct_km <= 0:
+            return []
+        ratio = min(walk_km / direct_km, 0.9)
+        waypoint = {
+            "lat": origin["lat"] + (destination["lat"] - origin["lat"]) * ratio,
+            "lon": origin["lon"] + (destination["lon"] - origin["lon"]) * ratio,
+        }
+        walk_route, transit_route = await scope.gather([
+            ("routing", self._call_routing_service,
+             ("walk", origin["lat"], origin["lon"], waypoint["lat"], waypoint["lon"],
+              departure_time, request_id, include_geometry)),
+            ("routing", self._call_routing_service,
+             ("transit", waypoint["lat"], waypoint["lon"],
+              destination["lat"], destination["lon"], departure_time, request_id, include_geometry)),
+        ])
+        if walk_route is None or transit_route is None:
+            return []
+        segments = walk_route.get("segments", []) + transit_route.get("segments", [])
+        return [self._build_candidate("B", segments, "Marche jusqu'à un arrêt intermédiaire")]
+
+
     async def _generate_type_c_candidates(
         self,
         origin: Dict,
@@ -208,51 +560,92 @@ class CandidateGenerator:
         goals: Dict,
         constraints: Dict,
         current_walk_minutes: int,
-        request_id: str
+        request_id: str,
+        scope: Optional[FanOutScope] = None,
+        base_candidate: Optional[Dict] = None,
+        include_geometry: bool = True
     ) -> List[Dict]:
         """
         ÉTAPE 2.3: Candidats Type C - Boucle courte
-        
+
         LOGIQUE MÉTIER:
         - Si l'objectif n'est pas atteint avec A et B
         - Ajouter une petite boucle avant/après le trajet
         - Boucle = détour circulaire qui revient au point de départ
-        
+
         EXEMPLE:
         - Objectif: 20min de marche
         - Itinéraire + waypoint: 12min de marche
         - Manque: 8min
         - Solution: Ajouter boucle de 8min près de la destination
         """
-        
+        scope = scope or self.scheduler.scope(self.deadline_seconds, request_id)
+
         # ÉTAPE 2.3.1: Calculer le déficit d'activité
-        # - deficit = goals.walk_minutes - current_walk_minutes
-        # - Si deficit <= 0, pas de boucle nécessaire, return []
-        
-        # ÉTAPE 2.3.2: Déterminer où placer la boucle
-        # - Option A: Près de l'origine (avant le trajet)
-        # - Option B: Près de la destination (après le trajet)
-        # - Privilégier destination (plus naturel)
-        
-        # ÉTAPE 2.3.3: Générer une boucle circulaire
-        # - Rayon estimé: (deficit_minutes * 5 km/h) / 60 / 2
-        #   (diviser par 2 car c'est un aller-retour)
-        # - Appeler Routing pour obtenir un itinéraire circulaire
-        #   autour du point choisi
-        
+        deficit = (goals.get("walk_minutes") or 0) - current_walk_minutes
+        if deficit <= 0:
+            return []
+
+        # ÉTAPE 2.3.2 + 2.3.3: Boucle près de la destination et de l'origine (en parallèle)
+        # - Longueur visée: deficit_minutes * 5 km/h / 60 ; le Routing ajuste
+        #   lui-même le rayon (un appel par boucle, pas un par tronçon)
+        distance_km = round(deficit * WALK_SPEED_KMH / 60, 3)
+        places = [("destination", destination), ("origine", origin)]
+        loops = await scope.gather([
+            ("routing", self._call_routing_circular,
+             (place["lat"], place["lon"], distance_km, request_id, include_geometry))
+            for _, place in places
+        ])
+
         # ÉTAPE 2.3.4: Créer le candidat
-        # - Segments du trajet normal
-        # - + Segment boucle (walk)
-        # - Calculer durée totale
-        # - Vérifier contraintes
-        
+        base_segments = base_candidate["segments"] if base_candidate else []
+        candidates = []
+        for (label, _), loop in zip(places, loops):
+            if loop is None:
+                continue
+            loop_segments = loop.get("segments", [])
+            if label == "destination":
+                segments = base_segments + loop_segments
+            else:
+                segments = loop_segments + base_segments
+            candidates.append(self._build_candidate(
+                "C", segments, f"Boucle de marche près de la {label}"
+            ))
+
         # ÉTAPE 2.3.5: Retourner
-        # - 1-2 candidats (boucle au départ / boucle à l'arrivée)
-        
-        # TODO: Implémenter
-        return []
-    
-    
+        return self._filter_by_constraints(candidates, constraints)
+
+
+    def _build_candidate(self, candidate_type: str, segments: List[Dict], why: str) -> Dict:
+        """
+        ÉTAPE HELPER: Construire un candidat à partir de ses segments
+
+        LOGIQUE:
+        - Sommer durées et distances
+        - Séparer l'activité marche / vélo
+        """
+        walk_minutes = sum(s.get("duration_minutes", 0) for s in segments if s.get("mode") == "WALK")
+        bike_minutes = sum(s.get("duration_minutes", 0) for s in segments if s.get("mode") == "BIKE")
+        return {
+            "candidate_type": candidate_type,
+            "plan_type": "HEALTH",
+            "total_duration_minutes": round(sum(s.get("duration_minutes", 0) for s in segments)),
+            "total_distance_km": round(sum(s.get("distance_km", 0) for s in segments), 3),
+            "walk_minutes": round(walk_minutes),
+            "bike_minutes": round(bike_minutes),
+            "segments": segments,
+            "why": why,
+        }
+
+
+    def _filter_by_constraints(self, candidates: List[Dict], constraints: Dict) -> List[Dict]:
+        """Écarter tôt les candidats qui dépassent le temps maximum"""
+        max_time = constraints.get("max_total_time_minutes")
+        if not max_time:
+            return candidates
+        return [c for c in candidates if c["total_duration_minutes"] <= max_time]
+
+
     async def _call_routing_service(
         self,
         mode: str,
@@ -261,36 +654,140 @@ class CandidateGenerator:
         to_lat: float,
         to_lon: float,
         time: str,
-        request_id: str
+        request_id: str,
+        include_geometry: bool = True
     ) -> Dict:
         """
         ÉTAPE HELPER: Appeler le Routing Service
-        
+
         LOGIQUE:
         - GET /route avec paramètres
         - mode: "walk", "bike", "transit"
         - Timeout: 2 secondes
         - Retry: 1 fois
+        - Les appels identiques concurrents (mode, from, to, créneau)
+          partagent une seule requête (single-flight)
+        - Polyline simplifiée à geometry_tolerance_m, ou omise par le
+          Routing si include_geometry est faux
         """
-        
+
+        # ÉTAPE: Coalescer les requêtes identiques en vol
+        # - Avec et sans géométrie: réponses différentes, clés différentes
+        key = route_key(
+            mode, from_lat, from_lon, to_lat, to_lon, time,
+            self.route_time_bucket_minutes
+        ) + (include_geometry,)
+
         # ÉTAPE: Construire la requête
-        # - URL: f"{self.routing_url}/route"
-        # - Params: mode, from, to, time
-        # - Headers: X-Request-Id
-        
-        # ÉTAPE: Envoyer et gérer la réponse
-        # - async with httpx.AsyncClient() as client:
-        # - response = await client.get(...)
-        # - Vérifier status_code == 200
-        # - Parser JSON
-        
-        # ÉTAPE: Gestion des erreurs
-        # - Si timeout ou erreur, logger et raise
-        
-        # TODO: Implémenter
-        pass
-    
-    
+        params = {
+            "mode": mode,
+            "from_lat": from_lat,
+            "from_lon": from_lon,
+            "to_lat": to_lat,
+            "to_lon": to_lon,
+            "time": time,
+            **self._geometry_params(include_geometry),
+        }
+        return await self.route_flights.do(
+            key, lambda: self._get_json("routing", "/route", params, request_id)
+        )
+
+
+    async def _call_walk_ahead(self, transit_segment: Dict, request_id: str, include_geometry: bool = True) -> Dict:
+        """
+        ÉTAPE HELPER: Appeler GET /transit/walk-ahead (Type A)
+
+        LOGIQUE:
+        - Arrêt d'attente, ligne et trajet du segment transit ; arrêt de
+          descente pour obtenir le segment transit restant depuis chaque
+          arrêt suivant
+        - MAX_NEXT_STOPS arrêts suivants, marche pré-calculée par le Routing
+        """
+        params = {
+            "stop_id": transit_segment["from"].get("stop_id"),
+            "route_id": transit_segment.get("route_id"),
+            "trip_id": transit_segment["trip_id"],
+            "to_stop_id": transit_segment["to"].get("stop_id"),
+            "limit": MAX_NEXT_STOPS,
+            **self._geometry_params(include_geometry),
+        }
+        return await self._get_json("routing", "/transit/walk-ahead", params, request_id)
+
+
+    async def _call_routing_circular(
+        self,
+        center_lat: float,
+        center_lon: float,
+        distance_km: float,
+        request_id: str,
+        include_geometry: bool = True
+    ) -> Dict:
+        """
+        ÉTAPE HELPER: Appeler GET /route/circular (boucles Type C)
+
+        LOGIQUE:
+        - Longueur visée en km ; boucle complète (tous ses tronçons) en un appel
+        """
+        params = {
+            "center_lat": center_lat,
+            "center_lon": center_lon,
+            "distance_km": distance_km,
+            "mode": "walk",
+            **self._geometry_params(include_geometry),
+        }
+        return await self._get_json("routing", "/route/circular", params, request_id)
+
+
+    def _geometry_params(self, include_geometry: bool) -> Dict:
+        """Paramètres géométrie du Routing: omise, ou simplifiée à geometry_tolerance_m"""
+        if not include_geometry:
+            return {"geometry": "false"}
+        return {"geometry": "true", "simplify": self.geometry_tolerance_m}
+
+
+    async def _call_routing_matrix(
+        self,
+        mode: str,
+        sources: List[Dict],
+        targets: List[Dict],
+        request_id: str
+    ) -> Dict:
+        """
+        ÉTAPE HELPER: Appeler POST /route/matrix (walk / bike)
+
+        LOGIQUE:
+        - Une requête pour toutes les paires sources x cibles
+        - Retourne {mode, durations_minutes, distances_km}
+        """
+        body = {
+            "mode": mode,
+            "sources": [{"lat": p["lat"], "lon": p["lon"]} for p in sources],
+            "targets": [{"lat": p["lat"], "lon": p["lon"]} for p in targets],
+        }
+        return await self._post_json("routing", "/route/matrix", body, request_id)
+
+
+    async def _call_routing_isochrone(
+        self,
+        lat: float,
+        lon: float,
+        minutes: int,
+        points: List[Dict],
+        request_id: str
+    ) -> Dict:
+        """
+        ÉTAPE HELPER: Appeler GET /isochrone (marche) avec des points candidats
+        """
+        params = {
+            "lat": lat,
+            "lon": lon,
+            "minutes": minutes,
+            "mode": "walk",
+            "point": [f"{p['lat']},{p['lon']}" for p in points],
+        }
+        return await self._get_json("routing", "/isochrone", params, request_id)
+
+
     async def _call_naolib_service(
         self,
         lat: float,
@@ -300,22 +797,89 @@ class CandidateGenerator:
     ) -> List[Dict]:
         """
         ÉTAPE HELPER: Appeler Naolib Service pour parkings vélos
-        
+
         LOGIQUE:
         - GET /bike-parkings/nearby
         - Obtenir les parkings dans un rayon
         - Filtrer par disponibilité
         """
-        
+
         # ÉTAPE: Construire la requête
-        # - URL: f"{self.naolib_url}/bike-parkings/nearby"
-        # - Params: lat, lon, radius
-        # - Headers: X-Request-Id
-        
+        params = {"lat": lat, "lon": lon, "radius": radius}
+
         # ÉTAPE: Envoyer et parser
-        # - Obtenir la liste de parkings
-        # - Filtrer ceux avec available > 0
-        # - Trier par distance
-        
-        # TODO: Implémenter
-        pass
+        parkings = await self._get_json("naolib", "/bike-parkings/nearby", params, request_id)
+        parkings = [p for p in parkings if p.get("available", 0) > 0]
+        parkings.sort(key=lambda p: p.get("distance_meters", 0))
+        return parkings
+
+
+    async def _get_json(self, service: str, path: str, params: Dict, request_id: str) -> Any:
+        """
+        ÉTAPE HELPER: GET JSON avec timeout et retry
+
+        LOGIQUE:
+        - Connexion prise dans le pool partagé du service (keep-alive)
+        - Header X-Request-Id propagé
+        - Timeout: 2 secondes, Retry: 1 fois (erreurs réseau et 5xx
+          seulement ; 4xx et 501 sont des réponses définitives)
+        - Si échec définitif, logger et raise
+        """
+        return await self._request_json(service, "GET", path, request_id, params=params)
+
+
+    async def _post_json(self, service: str, path: str, body: Dict, request_id: str) -> Any:
+        """ÉTAPE HELPER: POST JSON (mêmes timeout et retry que _get_json)"""
+        return await self._request_json(service, "POST", path, request_id, json=body)
+
+
+    async def _request_json(self, service: str, method: str, path: str, request_id: str, **kwargs) -> Any:
+        headers = {"X-Request-Id": request_id}
+        last_error: Optional[Exception] = None
+        for attempt in range(CALL_RETRIES + 1):
+            try:
+                response = await self.clients.request(service, method, path, headers=headers, **kwargs)
+                response.raise_for_status()
+                self.payload_received.record(f"{service}{path}", len(response.content))
+                return response.json()
+            except httpx.HTTPError as e:
+                last_error = e
+                logger.warning(f"[{request_id}] {method} {service}{path} failed (attempt {attempt + 1}): {e}")
+                if not _is_retryable(e):
+                    break
+        raise last_error
+
+
+def _is_retryable(error: httpx.HTTPError) -> bool:
+    """Erreur réseau ou 5xx (hors 501: mode non disponible) ; un 404 NoRoute ne change pas au 2e essai"""
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return status >= 500 and status != 501
+    return True
+
+
+def _matrix_segment(matrix: Dict, i: int, j: int, start: Dict, end: Dict) -> Optional[Dict]:
+    """Segment start -> end depuis la cellule (i, j) d'une matrice (None si inaccessible)"""
+    duration = matrix["durations_minutes"][i][j]
+    if duration is None:
+        return None
+
+    def location(place: Dict) -> Dict:
+        return {key: place[key] for key in ("lat", "lon", "name") if place.get(key) is not None}
+
+    return {
+        "mode": matrix["mode"].upper(),
+        "from": location(start),
+        "to": location(end),
+        "duration_minutes": duration,
+        "distance_km": matrix["distances_km"][i][j],
+    }
+
+
+def _distance_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Distance à vol d'oiseau (Haversine) en km"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = math.radians(lat2 - lat1)
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 6371.0 * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
@@ -0,0 +1,156 @@
+"""
+Ordonnanceur fan-out pour les appels aux services en aval
+
+LOGIQUE:
+- Lancer en parallèle les appels indépendants (Routing, Naolib)
+- Limiter le nombre de requêtes en vol par service (un Semaphore par service,
+  partagé entre toutes les requêtes /plan pour protéger les services en aval)
+- Appliquer une deadline unique à toute la requête /plan : chaque appel
+  reçoit le temps restant, pas un timeout propre
+
+La latence d'un /plan suit ainsi l'appel le plus lent de chaque étape
+au lieu de la somme de tous les appels.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Limite par défaut si un service n'est pas déclaré
+DEFAULT_MAX_IN_FLIGHT = 8
+
+
+class DeadlineExceeded(Exception):
+    """La deadline globale de la requête est dépassée"""
+
+
+class FanOutScheduler:
+    """
+    Limiteur partagé : nombre max de requêtes en vol par service
+    """
+
+    def __init__(self, max_in_flight: Dict[str, int]):
+        """
+        ÉTAPE: Initialiser les sémaphores
+
+        LOGIQUE:
+        - Un asyncio.Semaphore par service en aval ("routing", "naolib")
+        - Les compteurs servent au monitoring (appels en vol / en attente)
+        """
+        self.max_in_flight = dict(max_in_flight)
+        self._semaphores = {
+            service: asyncio.Semaphore(limit)
+            for service, limit in self.max_in_flight.items()
+        }
+        self.in_flight = {service: 0 for service in self.max_in_flight}
+        self.waiting = {service: 0 for service in self.max_in_flight}
+
+    def _semaphore(self, service: str) -> asyncio.Semaphore:
+        if service not in self._semaphores:
+            self.max_in_flight[service] = DEFAULT_MAX_IN_FLIGHT
+            self._semaphores[service] = asyncio.Semaphore(DEFAULT_MAX_IN_FLIGHT)
+            self.in_flight[service] = 0
+            self.waiting[service] = 0
+        return self._semaphores[service]
+
+    def scope(self, deadline_seconds: float, request_id: str) -> "FanOutScope":
+        """
+        ÉTAPE: Ouvrir un scope pour une requête /plan
+
+        LOGIQUE:
+        - La deadline est fixée une fois, au début de la requête
+        """
+        return FanOutScope(self, time.monotonic() + deadline_seconds, request_id)
+
+    def get_stats(self) -> Dict[str, Dict[str, int]]:
+        """Retourner l'état des limiteurs (pour /metrics)"""
+        return {
+            service: {
+                "max_in_flight": self.max_in_flight[service],
+                "in_flight": self.in_flight[service],
+                "waiting": self.waiting[service],
+            }
+            for service in self.max_in_flight
+        }
+
+
+class FanOutScope:
+    """
+    Contexte d'une requête : deadline commune à tous ses appels
+    """
+
+    def __init__(self, scheduler: FanOutScheduler, deadline: float, request_id: str):
+        self.scheduler = scheduler
+        self.deadline = deadline
+        self.request_id = request_id
+
+    def remaining(self) -> float:
+        """Temps restant avant la deadline (secondes, >= 0)"""
+        return max(0.0, self.deadline - time.monotonic())
+
+    async def call(
+        self,
+        service: str,
+        fn: Callable[..., Awaitable[Any]],
+        *args,
+        **kwargs
+    ) -> Any:
+        """
+        ÉTAPE: Exécuter un appel sous limite de concurrence et deadline
+
+        LOGIQUE:
+        - Attendre une place dans le sémaphore du service (borné par la deadline)
+        - Exécuter l'appel avec le temps restant comme timeout
+        - Lever DeadlineExceeded si la deadline est atteinte
+        """
+        semaphore = self.scheduler._semaphore(service)
+        if self.remaining() <= 0:
+            raise DeadlineExceeded(f"{service}: deadline already exceeded")
+
+        self.scheduler.waiting[service] += 1
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout=self.remaining())
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded(f"{service}: no slot before deadline")
+        finally:
+            self.scheduler.waiting[service] -= 1
+
+        self.scheduler.in_flight[service] += 1
+        try:
+            return await asyncio.wait_for(fn(*args, **kwargs), timeout=self.remaining())
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded(f"{service}: call exceeded deadline")
+        finally:
+            self.scheduler.in_flight[service] -= 1
+            semaphore.release()
+
+    async def gather(
+        self,
+        calls: List[Tuple[str, Callable[..., Awaitable[Any]], tuple]]
+    ) -> List[Optional[Any]]:
+        """
+        ÉTAPE: Lancer plusieurs appels indépendants en parallèle
+
+        LOGIQUE:
+        - calls = [(service, fn, args), ...]
+        - Les résultats sont retournés dans l'ordre des appels
+        - Un appel en échec (erreur, deadline) donne None : un candidat
+          manquant ne doit pas faire échouer tout le plan
+        """
+        results = await asyncio.gather(
+            *(self.call(service, fn, *args) for service, fn, args in calls),
+            return_exceptions=True
+        )
+        output = []
+        for (service, fn, _), result in zip(calls, results):
+            if isinstance(result, BaseException):
+                logger.warning(
+                    f"[{self.request_id}] {service} call {fn.__name__} failed: {result!r}"
+                )
+                output.append(None)
+            else:
+                output.append(result)
+        return output
@@ -0,0 +1,139 @@
+"""
+Clients HTTP partagés vers les services en aval (Routing, Naolib)
+
+LOGIQUE:
+- Un httpx.AsyncClient longue durée par service en aval : les connexions
+  TCP sont réutilisées (keep-alive) au lieu d'être ouvertes à chaque segment
+- Taille du pool, keep-alive et timeouts configurables
+- Créés et fermés par le lifespan FastAPI (main.py)
+- Compteurs de saturation du pool pour le monitoring
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PoolConfig:
+    """Configuration d'un pool de connexions"""
+    max_connections: int = 32
+    max_keepalive_connections: int = 16
+    keepalive_expiry: float = 30.0
+    connect_timeout: float = 0.5
+    read_timeout: float = 2.0
+    pool_timeout: float = 1.0
+    http2: bool = False
+
+
+class PoolStats:
+    """
+    Compteurs d'utilisation d'un pool
+
+    LOGIQUE:
+    - in_flight / peak_in_flight: requêtes en cours
+    - saturated_total: requêtes démarrées alors que toutes les connexions
+      du pool étaient occupées (elles attendent une connexion libre)
+    - pool_timeouts: requêtes abandonnées faute de connexion (PoolTimeout)
+    """
+
+    def __init__(self, max_connections: int):
+        self.max_connections = max_connections
+        self.requests_total = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.saturated_total = 0
+        self.pool_timeouts = 0
+        self.errors = 0
+
+    def to_dict(self) -> Dict[str, int]:
+        return {
+            "max_connections": self.max_connections,
+            "requests_total": self.requests_total,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "saturated_total": self.saturated_total,
+            "pool_timeouts": self.pool_timeouts,
+            "errors": self.errors,
+        }
+
+
+class ServiceClients:
+    """
+    Registre des clients HTTP, un par service en aval
+    """
+
+    def __init__(self, base_urls: Dict[str, str], config: Optional[PoolConfig] = None):
+        """
+        ÉTAPE: Créer les clients
+
+        LOGIQUE:
+        - base_urls: {"routing": "http://routing-service:8002", ...}
+        - Même configuration de pool pour chaque service
+        """
+        self.config = config or PoolConfig()
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._stats: Dict[str, PoolStats] = {}
+        for service, base_url in base_urls.items():
+            self._clients[service] = httpx.AsyncClient(
+                base_url=base_url,
+                http2=self.config.http2,
+                limits=httpx.Limits(
+                    max_connections=self.config.max_connections,
+                    max_keepalive_connections=self.config.max_keepalive_connections,
+                    keepalive_expiry=self.config.keepalive_expiry,
+                ),
+                timeout=httpx.Timeout(
+                    self.config.read_timeout,
+                    connect=self.config.connect_timeout,
+                    pool=self.config.pool_timeout,
+                ),
+            )
+            self._stats[service] = PoolStats(self.config.max_connections)
+        logger.info(f"HTTP pools ready for {list(base_urls)} (http2={self.config.http2})")
+
+    async def get(self, service: str, path: str, **kwargs) -> httpx.Response:
+        """
+        ÉTAPE: GET via le pool du service
+
+        LOGIQUE:
+        - Mettre à jour les compteurs avant/après la requête
+        - Laisser remonter les erreurs httpx (gérées par l'appelant)
+        """
+        return await self.request(service, "GET", path, **kwargs)
+
+    async def post(self, service: str, path: str, **kwargs) -> httpx.Response:
+        """ÉTAPE: POST via le pool du service"""
+        return await self.request(service, "POST", path, **kwargs)
+
+    async def request(self, service: str, method: str, path: str, **kwargs) -> httpx.Response:
+        stats = self._stats[service]
+        stats.requests_total += 1
+        if stats.in_flight >= stats.max_connections:
+            stats.saturated_total += 1
+        stats.in_flight += 1
+        stats.peak_in_flight = max(stats.peak_in_flight, stats.in_flight)
+        try:
+            return await self._clients[service].request(method, path, **kwargs)
+        except httpx.PoolTimeout:
+            stats.pool_timeouts += 1
+            raise
+        except httpx.HTTPError:
+            stats.errors += 1
+            raise
+        finally:
+            stats.in_flight -= 1
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Retourner les compteurs de chaque pool (pour /metrics)"""
+        return {service: stats.to_dict() for service, stats in self._stats.items()}
+
+    async def aclose(self):
+        """ÉTAPE: Fermer toutes les connexions (arrêt du service)"""
+        for client in self._clients.values():
+            await client.aclose()
+        logger.info("HTTP pools closed")
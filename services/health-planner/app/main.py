@@ -10,9 +10,11 @@ LOGIQUE GLOBALE:
 PORT: 8001
 """
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.responses import JSONResponse
 import logging
+import time
 import uuid
 from typing import Optional
 import os
@@ -20,8 +22,12 @@ import os
 # ÉTAPE: Importer les modules locaux
 # from .models import PlanRequest, PlanResponse
 # from .services.planner_service import PlannerService
-# from .services.candidate_generator import CandidateGenerator
 # from .services.scoring_service import ScoringService
+from .cache import PlanCache
+from .candidate_generator import CandidateGenerator
+from .fanout import FanOutScheduler
+from .http_clients import PoolConfig, ServiceClients
+from .payload_stats import PayloadStats
 
 # ÉTAPE: Configuration du logging
 logging.basicConfig(
@@ -30,12 +36,80 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# ÉTAPE: Configuration
+ROUTING_SERVICE_URL = os.getenv("ROUTING_SERVICE_URL", "http://routing-service:8002")
+NAOLIB_SERVICE_URL = os.getenv("NAOLIB_SERVICE_URL", "http://naolib-service:8003")
+# Budget total de la génération de candidats (< timeout Gateway -> Planner de 3s)
+PLAN_DEADLINE_SECONDS = float(os.getenv("PLAN_DEADLINE_SECONDS", "2.5"))
+# Nombre max de requêtes en vol par service en aval (toutes requêtes /plan confondues)
+ROUTING_MAX_IN_FLIGHT = int(os.getenv("ROUTING_MAX_IN_FLIGHT", "16"))
+NAOLIB_MAX_IN_FLIGHT = int(os.getenv("NAOLIB_MAX_IN_FLIGHT", "8"))
+# Créneau horaire des clés single-flight pour les segments transit
+ROUTE_TIME_BUCKET_MINUTES = int(os.getenv("ROUTE_TIME_BUCKET_MINUTES", "5"))
+# Pools HTTP vers les services en aval (un pool par service)
+HTTP_POOL_CONFIG = PoolConfig(
+    max_connections=int(os.getenv("HTTP_POOL_MAX_CONNECTIONS", "32")),
+    max_keepalive_connections=int(os.getenv("HTTP_POOL_MAX_KEEPALIVE", "16")),
+    keepalive_expiry=float(os.getenv("HTTP_KEEPALIVE_EXPIRY_SECONDS", "30")),
+    connect_timeout=float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", "0.5")),
+    read_timeout=float(os.getenv("HTTP_READ_TIMEOUT_SECONDS", "2.0")),
+    pool_timeout=float(os.getenv("HTTP_POOL_TIMEOUT_SECONDS", "1.0")),
+    # HTTP/2 nécessite TLS (ou un proxy h2) : uvicorn ne parle que HTTP/1.1
+    http2=os.getenv("HTTP2_ENABLED", "false").lower() == "true",
+)
+# Tolérance de simplification des géométries demandées au Routing (mètres)
+ROUTE_GEOMETRY_TOLERANCE_M = float(os.getenv("ROUTE_GEOMETRY_TOLERANCE_M", "5"))
+# Bornes du cache de plans (éviction LRU au-delà)
+PLAN_CACHE_MAX_ENTRIES = int(os.getenv("PLAN_CACHE_MAX_ENTRIES", "100"))
+PLAN_CACHE_MAX_BYTES = int(os.getenv("PLAN_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+
+
+# ÉTAPE: Cycle de vie de l'application
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    LOGIQUE:
+    - Au démarrage: créer les pools HTTP partagés, le générateur de candidats
+      et le cache de plans
+    - À l'arrêt: fermer proprement les connexions keep-alive
+    """
+    clients = ServiceClients(
+        {"routing": ROUTING_SERVICE_URL, "naolib": NAOLIB_SERVICE_URL},
+        HTTP_POOL_CONFIG
+    )
+    scheduler = FanOutScheduler({
+        "routing": ROUTING_MAX_IN_FLIGHT,
+        "naolib": NAOLIB_MAX_IN_FLIGHT,
+    })
+    app.state.http_clients = clients
+    app.state.scheduler = scheduler
+    app.state.candidate_generator = CandidateGenerator(
+        ROUTING_SERVICE_URL,
+        NAOLIB_SERVICE_URL,
+        scheduler=scheduler,
+        deadline_seconds=PLAN_DEADLINE_SECONDS,
+        clients=clients,
+        route_time_bucket_minutes=ROUTE_TIME_BUCKET_MINUTES,
+        geometry_tolerance_m=ROUTE_GEOMETRY_TOLERANCE_M
+    )
+    app.state.plan_cache = PlanCache(
+        max_entries=PLAN_CACHE_MAX_ENTRIES,
+        max_bytes=PLAN_CACHE_MAX_BYTES
+    )
+    yield
+    await app.state.candidate_generator.aclose()
+    await clients.aclose()
+
+
 # ÉTAPE: Initialiser l'application FastAPI
 app = FastAPI(
     title="Health Planner Service",
     description="Service de planification d'itinéraires santé",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
+payload_stats = PayloadStats()
+
 
 # ÉTAPE: Middleware pour logging et requestId
 @app.middleware("http")
@@ -45,10 +119,22 @@ async def add_request_id(request: Request, call_next):
     - Extraire X-Request-Id du header ou générer un nouveau
     - Logger chaque requête avec requestId
     - Propager requestId aux services appelés
-    - Logger le temps de réponse
+    - Logger le temps de réponse et la taille du payload
     """
-    # TODO: Implémenter
-    pass
+    request_id = request.headers.get("X-Request-Id") or str(uuid.uuid4())
+    request.state.request_id = request_id
+    start = time.perf_counter()
+    response = await call_next(request)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    response.headers["X-Request-Id"] = request_id
+    size = int(response.headers.get("content-length", 0))
+    if request.scope.get("endpoint") is not None:
+        payload_stats.record(request.url.path, size)
+    logger.info(
+        f"[{request_id}] {request.method} {request.url.path} -> {response.status_code} "
+        f"({elapsed_ms:.1f}ms, {size}B)"
+    )
+    return response
 
 
 # ÉTAPE: Endpoint de santé
@@ -64,6 +150,28 @@ async def health_check():
     return {"status": "healthy", "service": "health-planner"}
 
 
+# ÉTAPE: Endpoint de monitoring - GET /metrics
+@app.get("/metrics")
+async def get_metrics():
+    """
+    LOGIQUE:
+    - Exposer l'état des limiteurs fan-out (appels en vol / en attente par service)
+    - Exposer la saturation des pools HTTP
+    - Exposer les appels Routing économisés par coalescence (single-flight)
+    - Exposer les compteurs du cache de plans (hits, misses, évictions, taille)
+    - Exposer la taille des réponses envoyées (par endpoint) et reçues
+      (par service / endpoint en aval)
+    """
+    return {
+        "fanout": app.state.scheduler.get_stats(),
+        "http_pools": app.state.http_clients.get_stats(),
+        "route_singleflight": app.state.candidate_generator.route_flights.get_stats(),
+        "plan_cache": app.state.plan_cache.get_stats(),
+        "payload_bytes": payload_stats.get_stats(),
+        "payload_bytes_received": app.state.candidate_generator.payload_received.get_stats(),
+    }
+
+
 # ÉTAPE: Endpoint principal - POST /plan
 @app.post("/plan")
 async def create_health_plan(request: Request):
@@ -103,7 +211,8 @@ async def create_health_plan(request: Request):
     # - Si invalide, raise HTTPException(400)
     
     # ÉTAPE 1.3: Appeler le service de génération de candidats
-    # - Passer à CandidateGenerator
+    # - Passer à CandidateGenerator (avec include_geometry: pas de polylines
+    #   demandées au Routing si le client n'affiche pas le tracé)
     # - Obtenir liste de candidats (plans possibles)
     
     # ÉTAPE 1.4: Scorer les candidats
@@ -138,15 +247,14 @@ async def create_health_plan(request: Request):
 
 # ÉTAPE: Endpoint de test - GET /plans/history (optionnel)
 @app.get("/plans/history")
-async def get_plans_history():
+async def get_plans_history(limit: int = 10):
     """
     LOGIQUE:
-    - Lire les plans générés depuis data/plans_cache.json
+    - Lire les plans générés (cache en mémoire, chargé depuis data/plans_cache.json)
     - Retourner les N derniers plans
     - Utile pour debug/monitoring
     """
-    # TODO: Implémenter
-    pass
+    return {"plans": app.state.plan_cache.get_recent_plans(limit)}
 
 
 if __name__ == "__main__":
@@ -70,6 +70,9 @@ class PlanRequest(BaseModel):
     goals: ActivityGoals
     constraints: TripConstraints
     preferences: Optional[Preferences] = Preferences()
+    # Géométrie des segments: seulement si le client affiche le tracé
+    # (la Gateway la demande quand le champ GraphQL `geometry` est sélectionné)
+    include_geometry: bool = True
 
 
 # ==================== RESPONSE ====================
@@ -0,0 +1,107 @@
+"""
+Coalescence des requêtes identiques (single-flight)
+
+LOGIQUE:
+- Plusieurs appels concurrents avec la même clé partagent un seul appel
+  en vol : le premier lance la requête, les suivants attendent son résultat
+- La clé est retirée dès que l'appel se termine (pas de cache)
+- Compter les appels économisés pour le monitoring
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Précision des coordonnées dans les clés (6 décimales ~ 10 cm)
+COORD_DECIMALS = 6
+
+
+class SingleFlight:
+    """
+    Registre des appels en vol, indexés par clé
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self.calls = 0       # Appels reçus
+        self.executed = 0    # Appels réellement envoyés
+        self.coalesced = 0   # Appels économisés (partagés avec un appel en vol)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        ÉTAPE: Exécuter fn une seule fois par clé en vol
+
+        LOGIQUE:
+        - Si un appel avec la même clé est en cours, attendre son résultat
+        - Sinon, lancer fn dans une tâche partagée
+        - asyncio.shield: l'annulation d'un appelant (deadline) n'annule pas
+          la requête partagée pour les autres
+        """
+        self.calls += 1
+        task = self._in_flight.get(key)
+        if task is None:
+            self.executed += 1
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._on_done(key, done))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _on_done(self, key: Hashable, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Marquer l'exception comme lue si plus personne n'attend la tâche
+        if not task.cancelled():
+            task.exception()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retourner les compteurs (pour /metrics)"""
+        return {
+            "calls": self.calls,
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "saved_ratio": round(self.coalesced / self.calls, 3) if self.calls else 0.0,
+            "in_flight": len(self._in_flight),
+        }
+
+
+def route_key(
+    mode: str,
+    from_lat: float,
+    from_lon: float,
+    to_lat: float,
+    to_lon: float,
+    time: str,
+    bucket_minutes: int
+) -> Tuple:
+    """
+    ÉTAPE: Construire la clé d'un segment (mode, from, to, créneau horaire)
+
+    LOGIQUE:
+    - Coordonnées arrondies à COORD_DECIMALS
+    - Marche / vélo: l'heure n'influence pas l'itinéraire, pas de créneau
+    - Transit: heure arrondie au créneau de bucket_minutes ("now" = maintenant)
+    """
+    return (
+        mode,
+        round(from_lat, COORD_DECIMALS),
+        round(from_lon, COORD_DECIMALS),
+        round(to_lat, COORD_DECIMALS),
+        round(to_lon, COORD_DECIMALS),
+        _time_bucket(time, bucket_minutes) if mode == "transit" else None,
+    )
+
+
+def _time_bucket(time: str, bucket_minutes: int) -> Optional[str]:
+    """Arrondir une heure ISO 8601 (ou "now") au créneau inférieur"""
+    try:
+        moment = datetime.now() if time in (None, "", "now") else datetime.fromisoformat(time)
+    except ValueError:
+        return time
+    bucket_minutes = max(1, bucket_minutes)
+    minutes = (moment.hour * 60 + moment.minute) // bucket_minutes * bucket_minutes
+    return f"{moment.date().isoformat()}T{minutes // 60:02d}:{minutes % 60:02d}"
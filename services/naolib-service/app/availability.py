@@ -0,0 +1,209 @@
+"""
+Disponibilité temps réel des parkings, séparée des métadonnées statiques
+
+LOGIQUE:
+- Les métadonnées (nom, position, capacité) vivent dans le ParkingSnapshot
+  et changent rarement
+- La disponibilité vit dans un tableau compact int32 indexé par la position
+  du parking dans le snapshot, rafraîchi à sa propre cadence (courte)
+- Chaque mise à jour qui change au moins une valeur incrémente la version ;
+  changed_at[i] = version de la dernière modification du parking i
+- Delta "depuis la version X" = positions où changed_at > X (vectorisé)
+- Les versions repartent de 1 à chaque démarrage: epoch (tiré au démarrage)
+  les accompagne ; un client d'un autre epoch se resynchronise en entier
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+import numpy as np
+
+from .snapshot import ParkingSnapshot
+
+logger = logging.getLogger(__name__)
+
+
+class AvailabilityTable:
+    """
+    Tableau des places disponibles pour un snapshot de métadonnées
+    """
+
+    def __init__(self, snapshot: ParkingSnapshot, version: int, epoch: str):
+        """
+        ÉTAPE: Initialiser depuis un snapshot
+
+        LOGIQUE:
+        - Positions = ordre des parkings dans le snapshot (même ordre que l'index)
+        - Valeurs initiales = disponibilités du snapshot
+        - base_version: un client plus ancien doit se resynchroniser en entier
+        - epoch: identifiant du processus qui numérote les versions
+        """
+        self.epoch = epoch
+        self.metadata_version = snapshot.version
+        self.ids: List[str] = [p["id"] for p in snapshot.index.parkings]
+        self.positions: Dict[str, int] = {pid: i for i, pid in enumerate(self.ids)}
+        self.available = np.array(
+            [p.get("available") or 0 for p in snapshot.index.parkings], dtype=np.int32
+        )
+        self.version = version
+        self.base_version = version
+        self.changed_at = np.full(len(self.ids), version, dtype=np.int64)
+
+    def get(self, position: int) -> int:
+        return int(self.available[position])
+
+    def apply(self, updates: Dict[str, int]) -> int:
+        """
+        ÉTAPE: Appliquer une lecture de l'API de disponibilité
+
+        LOGIQUE:
+        - Ignorer les ids inconnus (parkings pas encore dans les métadonnées)
+        - Nouvelle version seulement si au moins une valeur change
+
+        RETURN: nombre de parkings modifiés
+        """
+        positions, values = [], []
+        for parking_id, available in updates.items():
+            position = self.positions.get(parking_id)
+            if position is not None:
+                positions.append(position)
+                values.append(available)
+        if not positions:
+            return 0
+        positions = np.asarray(positions, dtype=np.intp)
+        values = np.asarray(values, dtype=np.int32)
+        changed = positions[self.available[positions] != values]
+        if len(changed) == 0:
+            return 0
+        self.version += 1
+        self.available[positions] = values
+        self.changed_at[changed] = self.version
+        return len(changed)
+
+    def delta(self, since: int, epoch: Optional[str] = None) -> dict:
+        """
+        ÉTAPE: Changements depuis la version `since`
+
+        LOGIQUE:
+        - since < base_version (ou métadonnées changées): liste complète, full=True
+        - Autre epoch (service redémarré) ou since > version (version d'un
+          processus précédent, client sans epoch): liste complète, full=True
+        - Sinon: seulement les parkings modifiés après `since`
+        """
+        full = (
+            since < self.base_version
+            or since > self.version
+            or (epoch is not None and epoch != self.epoch)
+        )
+        if full:
+            positions = np.arange(len(self.ids))
+        else:
+            positions = np.nonzero(self.changed_at > since)[0]
+        return {
+            "epoch": self.epoch,
+            "metadata_version": self.metadata_version,
+            "version": self.version,
+            "since": since,
+            "full": full,
+            "ids": [self.ids[i] for i in positions],
+            "available": self.available[positions].tolist(),
+        }
+
+
+AvailabilityFetchFn = Callable[[httpx.AsyncClient], Awaitable[Dict[str, int]]]
+
+
+class AvailabilityRefresher:
+    """
+    Tâche de fond qui met à jour la disponibilité à courte cadence
+    """
+
+    def __init__(self, fetch: AvailabilityFetchFn, interval_seconds: float):
+        self._fetch = fetch
+        self.interval_seconds = interval_seconds
+        # Versions valables pour ce processus seulement
+        self.epoch = uuid.uuid4().hex[:12]
+        self.table: Optional[AvailabilityTable] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._task: Optional[asyncio.Task] = None
+        self.updates = 0
+        self.failures = 0
+        self.last_changed = 0
+        self.last_checked_at: Optional[float] = None
+
+    def on_snapshot(self, snapshot: ParkingSnapshot):
+        """
+        ÉTAPE: Nouveau snapshot de métadonnées
+
+        LOGIQUE:
+        - Reconstruire le tableau pour les nouvelles positions
+        - La numérotation des versions continue (les clients voient full=True)
+        """
+        next_version = (self.table.version + 1) if self.table else 1
+        self.table = AvailabilityTable(snapshot, next_version, self.epoch)
+        logger.info(
+            f"Availability table rebuilt for metadata v{snapshot.version} "
+            f"({len(self.table.ids)} parkings, version {next_version})"
+        )
+
+    async def start(self):
+        """ÉTAPE: Lancer la boucle de rafraîchissement (appelé par le lifespan)"""
+        self._client = httpx.AsyncClient()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._client:
+            await self._client.aclose()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            await self.refresh_once()
+
+    async def refresh_once(self):
+        """
+        ÉTAPE: Un cycle de mise à jour
+
+        LOGIQUE:
+        - Lire seulement (id, disponibilité), sans normaliser les records complets
+        - En cas d'erreur, garder les valeurs courantes
+        """
+        if self.table is None:
+            return
+        try:
+            updates = await self._fetch(self._client)
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"Availability refresh failed: {e}")
+            return
+        self.last_checked_at = time.time()
+        self.last_changed = self.table.apply(updates)
+        self.updates += 1
+        if self.last_changed:
+            logger.debug(f"Availability v{self.table.version}: {self.last_changed} parkings changed")
+
+    def get_stats(self) -> dict:
+        """Retourner l'état de la disponibilité (pour /metrics)"""
+        table = self.table
+        return {
+            "epoch": self.epoch,
+            "version": table.version if table else None,
+            "metadata_version": table.metadata_version if table else None,
+            "refresh_interval_seconds": self.interval_seconds,
+            "seconds_since_check": (
+                round(time.time() - self.last_checked_at, 1) if self.last_checked_at else None
+            ),
+            "updates": self.updates,
+            "last_changed": self.last_changed,
+            "failures": self.failures,
+        }
@@ -1,75 +1,95 @@
 """
-Cache pour les données Naolib (persistance JSON)
+Cache pour les données Naolib (persistance en journal append-only)
 
 LOGIQUE:
 - Cache court (60s) pour réduire les appels API
-- Sauvegarder les données sur disque pour redémarrage
+- Sauvegarder les données sur disque pour redémarrage (LogStore:
+  une ligne par écriture, thread dédié, compaction périodique)
 - Gestion TTL (Time To Live)
 """
 
-import json
 import os
-from datetime import datetime, timedelta
-from typing import Dict, Optional
+from typing import Optional
+
+from .cache_core import LRUCache
+from .log_store import LogStore
 
 DATA_DIR = "/app/data"
-CACHE_FILE = os.path.join(DATA_DIR, "naolib_cache.json")
+CACHE_FILE = os.path.join(DATA_DIR, "naolib_cache.log")
+MAX_ENTRIES = 10000
+MAX_BYTES = 32 * 1024 * 1024  # Taille approximative (JSON) max en mémoire
 
 
 class NaolibCache:
     """
     Gestionnaire de cache pour les données Naolib
     """
-    
-    def __init__(self, ttl_seconds: int = 60):
+
+    def __init__(
+        self,
+        ttl_seconds: int = 60,
+        path: str = CACHE_FILE,
+        max_entries: int = MAX_ENTRIES,
+        max_bytes: int = MAX_BYTES
+    ):
         """
         ÉTAPE: Initialiser le cache
-        
+
         LOGIQUE:
         - Créer le dossier data s'il n'existe pas
-        - Définir TTL
-        - Charger le cache existant
+        - Définir TTL et bornes mémoire (entrées + octets, éviction LRU)
+        - Charger le cache existant (rejeu du journal, bornes appliquées)
         """
         self.ttl_seconds = ttl_seconds
-        # TODO: Implémenter
-        pass
-    
-    
+        self._store = LogStore(path)
+        self._entries = LRUCache(max_entries, max_bytes, ttl_seconds)
+        for key, (value, expires_at) in self._store.replay().items():
+            self._entries.set(key, value, expires_at=expires_at)
+
+
     def get(self, key: str) -> Optional[dict]:
         """
         ÉTAPE: Récupérer une valeur depuis le cache
-        
+
         LOGIQUE:
         - Vérifier si la clé existe
         - Vérifier si le TTL n'est pas expiré
         - Si valide, retourner la valeur
         - Sinon, retourner None
         """
-        # TODO: Implémenter
-        pass
-    
-    
+        return self._entries.get(key)
+
+
     def set(self, key: str, value: dict, ttl: Optional[int] = None):
         """
         ÉTAPE: Mettre une valeur en cache
-        
+
         LOGIQUE:
-        - Stocker avec timestamp actuel
+        - Stocker avec timestamp d'expiration
         - Utiliser ttl fourni ou ttl par défaut
-        - Sauvegarder sur disque
+        - Journaliser sur disque (ajout d'une ligne, hors boucle d'événements)
         """
-        # TODO: Implémenter
-        pass
-    
-    
+        expires_at = self._entries.set(key, value, ttl=ttl)
+        self._store.append_set(key, value, expires_at)
+        self._store.maybe_compact(len(self._entries), self._entries.to_dict)
+
+
     def clear_expired(self):
         """
         ÉTAPE: Nettoyer les entrées expirées
-        
+
         LOGIQUE:
-        - Parcourir toutes les clés
-        - Supprimer celles dont le timestamp + TTL < now
-        - Sauvegarder le cache nettoyé
+        - Dépiler le tas d'expiration (coût = entrées expirées seulement)
+        - Pas de réécriture: la compaction du journal ignore les entrées expirées
         """
-        # TODO: Implémenter
-        pass
+        return self._entries.expire()
+
+
+    def get_stats(self) -> dict:
+        """Retourner les compteurs du cache (pour /metrics)"""
+        return self._entries.get_stats()
+
+
+    def close(self):
+        """ÉTAPE: Vider le journal sur disque (arrêt du service)"""
+        self._store.close()
@@ -0,0 +1,169 @@
+"""
+Cœur de cache en mémoire borné: LRU + TTL avec comptabilité de taille
+
+LOGIQUE:
+- get / set en O(1) (OrderedDict: l'ordre = récence d'utilisation)
+- Éviction LRU dès que le nombre d'entrées OU la taille approximative
+  (octets JSON) dépasse sa borne
+- Expiration par tas (heap) trié sur la date d'expiration: nettoyer ne
+  coûte que les entrées réellement expirées, pas un parcours complet
+- Compteurs hits / misses / évictions / expirations pour le monitoring
+
+Même module dans chaque service (chaque image ne copie que son app/).
+"""
+
+import heapq
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+def approximate_size(key: str, value: Any) -> int:
+    """Taille approximative d'une entrée (octets de sa forme JSON)"""
+    try:
+        return len(key) + len(json.dumps(value, default=str))
+    except (TypeError, ValueError):
+        return len(key) + 64
+
+
+class LRUCache:
+    """
+    Cache LRU borné en entrées et en octets, avec TTL
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, default_ttl: float):
+        """
+        ÉTAPE: Initialiser
+
+        LOGIQUE:
+        - _entries: clé -> (valeur, expiration, taille)
+        - _expiry_heap: (expiration, clé) ; les doublons périmés sont ignorés
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._entries: "OrderedDict[str, Tuple[Any, float, int]]" = OrderedDict()
+        self._expiry_heap: List[Tuple[float, str]] = []
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        ÉTAPE: Lire une entrée
+
+        LOGIQUE:
+        - Absente ou expirée: miss
+        - Présente: hit, l'entrée devient la plus récente
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        value, expires_at, _ = entry
+        if expires_at <= time.time():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def peek(self, key: str) -> Optional[Any]:
+        """Lire sans toucher à la récence ni aux compteurs (monitoring, tâches de fond)"""
+        entry = self._entries.get(key)
+        if entry is None or entry[1] <= time.time():
+            return None
+        return entry[0]
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None, expires_at: Optional[float] = None) -> float:
+        """
+        ÉTAPE: Écrire une entrée
+
+        LOGIQUE:
+        - Expiration = expires_at fourni (rejeu) ou now + ttl
+        - Retirer d'abord les entrées expirées (O(1) si aucune: sommet du tas)
+        - Remplacer l'éventuelle entrée existante
+        - Évincer les moins récentes tant que les bornes sont dépassées
+
+        RETURN: timestamp d'expiration retenu
+        """
+        if expires_at is None:
+            expires_at = time.time() + (ttl if ttl is not None else self.default_ttl)
+        self.expire()
+        size = approximate_size(key, value)
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (value, expires_at, size)
+        self.bytes += size
+        heapq.heappush(self._expiry_heap, (expires_at, key))
+        while self._entries and (len(self._entries) > self.max_entries or self.bytes > self.max_bytes):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+        # Le tas garde des doublons pour les clés réécrites ou évincées: le reconstruire
+        # quand il devient trop grand par rapport aux entrées vivantes
+        if len(self._expiry_heap) > 2 * len(self._entries) + 1024:
+            self._expiry_heap = [(e[1], k) for k, e in self._entries.items()]
+            heapq.heapify(self._expiry_heap)
+        return expires_at
+
+    def delete(self, key: str):
+        if key in self._entries:
+            self._remove(key)
+
+    def expire(self) -> int:
+        """
+        ÉTAPE: Supprimer les entrées expirées
+
+        LOGIQUE:
+        - Dépiler tant que le sommet du tas est expiré
+        - Ignorer les éléments dont l'expiration ne correspond plus à l'entrée
+
+        RETURN: nombre d'entrées supprimées
+        """
+        now = time.time()
+        removed = 0
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            expires_at, key = heapq.heappop(self._expiry_heap)
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] == expires_at:
+                self._remove(key)
+                removed += 1
+        self.expirations += removed
+        return removed
+
+    def items(self) -> Iterator[Tuple[str, Tuple[Any, float]]]:
+        """Entrées (clé, (valeur, expiration)) de la moins à la plus récente"""
+        for key, (value, expires_at, _) in self._entries.items():
+            yield key, (value, expires_at)
+
+    def to_dict(self) -> Dict[str, Tuple[Any, float]]:
+        """Copie des entrées (pour la compaction du journal)"""
+        return dict(self.items())
+
+    def _remove(self, key: str):
+        _, _, size = self._entries.pop(key)
+        self.bytes -= size
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retourner les compteurs (pour /metrics)"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
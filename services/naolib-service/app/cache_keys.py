@@ -0,0 +1,175 @@
+"""
+Quantification des clés de cache (espace + temps)
+
+LOGIQUE:
+- Les coordonnées GPS brutes diffèrent à la 6e décimale: une clé construite
+  sur les floats ne se répète presque jamais
+- Une position est ramenée à une cellule: geohash (précision configurable)
+  ou grille métrique (taille de cellule en mètres)
+- Une heure est ramenée au début de son créneau (ex: 15 minutes)
+- Le niveau de quantification fait partie de la clé (changer la config
+  n'entre jamais en collision avec les anciennes entrées) et sert
+  d'étiquette pour le hit ratio
+
+Même module dans chaque service (chaque image ne copie que son app/).
+"""
+
+import math
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_METERS_PER_DEGREE = 111_320.0
+EARTH_RADIUS_M = 6_371_000
+
+
+def geohash_encode(lat: float, lon: float, precision: int) -> str:
+    """Geohash standard (base32) de `precision` caractères"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits, value, even = 0, 0, True
+    while len(chars) < precision:
+        rng, coord = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if coord >= mid:
+            value = (value << 1) | 1
+            rng[0] = mid
+        else:
+            value <<= 1
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits, value = 0, 0
+    return "".join(chars)
+
+
+def geohash_bounds(geohash: str) -> Tuple[float, float, float, float]:
+    """Bornes (lat_min, lat_max, lon_min, lon_max) d'une cellule geohash"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        value = _BASE32.index(char)
+        for shift in range(4, -1, -1):
+            rng = lon_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if (value >> shift) & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+    return lat_range[0], lat_range[1], lon_range[0], lon_range[1]
+
+
+def _haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+class KeyQuantizer:
+    """
+    Schéma de quantification d'un cache
+    """
+
+    def __init__(
+        self,
+        mode: str = "geohash",
+        geohash_precision: int = 7,
+        grid_cell_m: float = 250,
+        time_bucket_minutes: Optional[int] = None
+    ):
+        """
+        ÉTAPE: Initialiser
+
+        LOGIQUE:
+        - mode "geohash": cellule = geohash de `geohash_precision` caractères
+          (6 ≈ 1.2km x 0.6km, 7 ≈ 150m x 150m)
+        - mode "grid": lignes de `grid_cell_m` mètres en latitude, colonnes
+          de `grid_cell_m` mètres mesurées à la latitude de la ligne
+        - time_bucket_minutes: taille des créneaux (None si la clé n'a pas de temps)
+        """
+        if mode not in ("geohash", "grid"):
+            raise ValueError(f"Unknown quantization mode: {mode}")
+        self.mode = mode
+        self.geohash_precision = geohash_precision
+        self.grid_cell_m = grid_cell_m
+        self.time_bucket_minutes = time_bucket_minutes
+        space = f"gh{geohash_precision}" if mode == "geohash" else f"grid{int(grid_cell_m)}m"
+        self.level = f"{space}/{time_bucket_minutes}min" if time_bucket_minutes else space
+
+    def cell(self, lat: float, lon: float) -> str:
+        """Identifiant de la cellule contenant le point (préfixé par le niveau)"""
+        if self.mode == "geohash":
+            return f"gh{self.geohash_precision}:{geohash_encode(lat, lon, self.geohash_precision)}"
+        row, col = self._grid_indices(lat, lon)
+        return f"grid{int(self.grid_cell_m)}m:{row}:{col}"
+
+    def cell_center(self, lat: float, lon: float) -> Tuple[float, float, float]:
+        """
+        ÉTAPE: Point représentatif de la cellule
+
+        RETURN: (lat, lon, demi-diagonale en mètres) - tout point de la
+        cellule est à moins de la demi-diagonale du centre
+        """
+        if self.mode == "geohash":
+            lat_min, lat_max, lon_min, lon_max = geohash_bounds(
+                geohash_encode(lat, lon, self.geohash_precision)
+            )
+        else:
+            row, col = self._grid_indices(lat, lon)
+            step_lat = self.grid_cell_m / _METERS_PER_DEGREE
+            lat_min, lat_max = row * step_lat, (row + 1) * step_lat
+            step_lon = self._grid_step_lon(row)
+            lon_min, lon_max = col * step_lon, (col + 1) * step_lon
+        center_lat = (lat_min + lat_max) / 2
+        center_lon = (lon_min + lon_max) / 2
+        half_diagonal = max(
+            _haversine_m(center_lat, center_lon, corner_lat, corner_lon)
+            for corner_lat in (lat_min, lat_max)
+            for corner_lon in (lon_min, lon_max)
+        )
+        return center_lat, center_lon, half_diagonal
+
+    def time_bucket(self, when: datetime) -> str:
+        """Début du créneau contenant `when` (ex: 20240115T1415 pour 14:23 en 15min)"""
+        minutes = when.hour * 60 + when.minute
+        start = minutes - minutes % self.time_bucket_minutes
+        return f"{when:%Y%m%d}T{start // 60:02d}{start % 60:02d}"
+
+    def _grid_indices(self, lat: float, lon: float) -> Tuple[int, int]:
+        row = math.floor(lat * _METERS_PER_DEGREE / self.grid_cell_m)
+        col = math.floor(lon / self._grid_step_lon(row))
+        return row, col
+
+    def _grid_step_lon(self, row: int) -> float:
+        center_lat = (row + 0.5) * self.grid_cell_m / _METERS_PER_DEGREE
+        return self.grid_cell_m / (_METERS_PER_DEGREE * max(math.cos(math.radians(center_lat)), 1e-6))
+
+
+class LevelHitStats:
+    """
+    Hit ratio par niveau de quantification (et par type de clé)
+    """
+
+    def __init__(self):
+        self._counts: Dict[str, Dict[str, int]] = {}
+
+    def record(self, level: str, hit: bool):
+        counts = self._counts.setdefault(level, {"hits": 0, "misses": 0})
+        counts["hits" if hit else "misses"] += 1
+
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        """Retourner {niveau: {hits, misses, hit_ratio}} (pour /metrics)"""
+        stats = {}
+        for level, counts in self._counts.items():
+            lookups = counts["hits"] + counts["misses"]
+            stats[level] = {
+                **counts,
+                "hit_ratio": round(counts["hits"] / lookups, 3) if lookups else 0.0,
+            }
+        return stats
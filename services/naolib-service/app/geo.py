@@ -0,0 +1,99 @@
+"""
+Distances vectorisées (NumPy) pour les parkings vélos
+
+LOGIQUE:
+- Coordonnées des parkings stockées en tableaux float64 contigus
+  (construits une fois par rafraîchissement des données)
+- Haversine un-vers-plusieurs et plusieurs-vers-plusieurs en un seul appel,
+  sans boucle Python
+- Même formule que _calculate_distance (distance en mètres, R = 6371 km)
+"""
+
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+EARTH_RADIUS_M = 6371000.0
+
+
+def haversine_one_to_many(
+    lat: float,
+    lon: float,
+    lats: np.ndarray,
+    lons: np.ndarray
+) -> np.ndarray:
+    """
+    ÉTAPE: Distances d'un point vers N points
+
+    RETURN: tableau (N,) de distances en mètres
+    """
+    phi1 = np.radians(lat)
+    phi2 = np.radians(lats)
+    dphi = phi2 - phi1
+    dlambda = np.radians(lons - lon)
+    a = np.sin(dphi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def haversine_matrix(
+    lats1: np.ndarray,
+    lons1: np.ndarray,
+    lats2: np.ndarray,
+    lons2: np.ndarray
+) -> np.ndarray:
+    """
+    ÉTAPE: Matrice de distances N x M
+
+    LOGIQUE:
+    - Broadcasting (N, 1) contre (1, M)
+    - cos(lat) calculé une seule fois par point
+
+    RETURN: tableau (N, M) de distances en mètres
+    """
+    phi1 = np.radians(np.asarray(lats1, dtype=np.float64))[:, None]
+    phi2 = np.radians(np.asarray(lats2, dtype=np.float64))[None, :]
+    lambda1 = np.radians(np.asarray(lons1, dtype=np.float64))[:, None]
+    lambda2 = np.radians(np.asarray(lons2, dtype=np.float64))[None, :]
+    a = (
+        np.sin((phi2 - phi1) / 2) ** 2
+        + np.cos(phi1) * np.cos(phi2) * np.sin((lambda2 - lambda1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class ParkingCoordinates:
+    """
+    Coordonnées des parkings en tableaux contigus (ordre = ordre des ids)
+    """
+
+    def __init__(self, parkings: List[dict]):
+        """
+        ÉTAPE: Construire les tableaux
+
+        LOGIQUE:
+        - ids: liste des ids, positions: id -> indice
+        - lats / lons: np.float64 contigus
+        """
+        parkings = [p for p in parkings if p.get("lat") is not None and p.get("lon") is not None]
+        self.ids: List[str] = [p["id"] for p in parkings]
+        self.positions: Dict[str, int] = {pid: i for i, pid in enumerate(self.ids)}
+        self.lats = np.ascontiguousarray([p["lat"] for p in parkings], dtype=np.float64)
+        self.lons = np.ascontiguousarray([p["lon"] for p in parkings], dtype=np.float64)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def select(self, parking_ids: Sequence[str]):
+        """
+        ÉTAPE: Extraire les coordonnées d'un sous-ensemble de parkings
+
+        RETURN: (lats, lons) ; KeyError si un id est inconnu
+        """
+        indices = np.fromiter(
+            (self.positions[pid] for pid in parking_ids), dtype=np.intp, count=len(parking_ids)
+        )
+        return self.lats[indices], self.lons[indices]
+
+    def distances_from(self, lat: float, lon: float) -> np.ndarray:
+        """Distances d'un point vers tous les parkings"""
+        return haversine_one_to_many(lat, lon, self.lats, self.lons)
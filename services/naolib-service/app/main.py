@@ -10,17 +10,28 @@ LOGIQUE GLOBALE:
 PORT: 8003
 """
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.responses import JSONResponse
+import httpx
 import logging
+import numpy as np
 import os
-from typing import Optional, List
+import time
+import uuid
+from typing import Dict, Optional, List
 from datetime import datetime, timedelta
 
 # ÉTAPE: Importer les modules locaux
 # from .models import BikeParking, BikeParkingList
 # from .services.naolib_adapter import NaolibAdapter
-# from .cache import NaolibCache
+from .models import DistanceMatrixRequest
+from .cache import NaolibCache
+from .cache_keys import KeyQuantizer, LevelHitStats
+from .availability import AvailabilityRefresher, AvailabilityTable
+from .geo import ParkingCoordinates, haversine_matrix
+from .snapshot import FetchResult, ParkingSnapshot, SnapshotRefresher
+from .spatial_index import haversine_m
 
 # ÉTAPE: Configuration du logging
 logging.basicConfig(
@@ -29,17 +40,64 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# ÉTAPE: Configuration
+NAOLIB_API_KEY = os.getenv("NAOLIB_API_KEY", "")
+CACHE_TTL_SECONDS = 60  # Cache de 60 secondes
+NAOLIB_API_URL = "https://data.nantesmetropole.fr/api/records/1.0/search/"
+NAOLIB_DATASET = "244400404_parkings-velos-nantes-metropole"
+# Distance max d'une recherche des k plus proches (mètres)
+NEAREST_MAX_DISTANCE_M = 5000
+# Taille max d'une matrice de distances (sources x cibles)
+MAX_MATRIX_CELLS = 1_000_000
+# Période de rafraîchissement des métadonnées (nom, position, capacité: changent rarement)
+SNAPSHOT_REFRESH_SECONDS = float(os.getenv("NAOLIB_REFRESH_SECONDS", "3600"))
+# Période de rafraîchissement de la disponibilité (temps réel)
+AVAILABILITY_REFRESH_SECONDS = float(os.getenv("NAOLIB_AVAILABILITY_REFRESH_SECONDS", "30"))
+NAOLIB_AVAILABILITY_DATASET = os.getenv("NAOLIB_AVAILABILITY_DATASET", NAOLIB_DATASET)
+
+# Bornes du cache mémoire (éviction LRU au-delà)
+CACHE_MAX_ENTRIES = int(os.getenv("NAOLIB_CACHE_MAX_ENTRIES", "10000"))
+CACHE_MAX_BYTES = int(os.getenv("NAOLIB_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+# Quantification des clés /nearby: "geohash" (précision) ou "grid" (mètres)
+CACHE_QUANTIZATION = os.getenv("NAOLIB_CACHE_QUANTIZATION", "geohash")
+CACHE_GEOHASH_PRECISION = int(os.getenv("NAOLIB_CACHE_GEOHASH_PRECISION", "7"))
+CACHE_GRID_CELL_M = float(os.getenv("NAOLIB_CACHE_GRID_CELL_M", "150"))
+
+quantizer = KeyQuantizer(CACHE_QUANTIZATION, CACHE_GEOHASH_PRECISION, CACHE_GRID_CELL_M)
+cache_hits = LevelHitStats()
+cache = NaolibCache(
+    ttl_seconds=CACHE_TTL_SECONDS,
+    max_entries=CACHE_MAX_ENTRIES,
+    max_bytes=CACHE_MAX_BYTES,
+)
+
+
+# ÉTAPE: Cycle de vie de l'application
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    LOGIQUE:
+    - Au démarrage: charger le snapshot puis lancer le rafraîchissement de fond
+    - Lancer la mise à jour de la disponibilité (cadence propre)
+    - À l'arrêt: arrêter les tâches de fond, vider le journal du cache
+    """
+    await refresher.start()
+    await availability.start()
+    yield
+    await availability.stop()
+    await refresher.stop()
+    cache.close()
+
+
 # ÉTAPE: Initialiser l'application FastAPI
 app = FastAPI(
     title="Naolib Mobility Service",
     description="Service de données de mobilité Nantes (parkings vélos)",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
-# ÉTAPE: Configuration
-NAOLIB_API_KEY = os.getenv("NAOLIB_API_KEY", "")
-CACHE_TTL_SECONDS = 60  # Cache de 60 secondes
-
 
 # ÉTAPE: Middleware pour requestId
 @app.middleware("http")
@@ -49,8 +107,46 @@ async def add_request_id(request: Request, call_next):
     - Extraire ou générer X-Request-Id
     - Logger chaque requête
     """
-    # TODO: Implémenter
-    pass
+    request_id = request.headers.get("X-Request-Id") or str(uuid.uuid4())
+    request.state.request_id = request_id
+    start = time.perf_counter()
+    response = await call_next(request)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    response.headers["X-Request-Id"] = request_id
+    logger.info(f"[{request_id}] {request.method} {request.url.path} -> {response.status_code} ({elapsed_ms:.1f}ms)")
+    return response
+
+
+def _current_snapshot() -> ParkingSnapshot:
+    """
+    ÉTAPE HELPER: Obtenir le snapshot courant
+
+    LOGIQUE:
+    - Lecture d'une référence, aucun appel à l'API Naolib
+    - 503 si aucun snapshot n'a encore pu être chargé
+    """
+    snapshot = refresher.snapshot
+    if snapshot is None:
+        raise HTTPException(status_code=503, detail="Naolib data not loaded yet")
+    return snapshot
+
+
+def _current_availability(snapshot: ParkingSnapshot) -> AvailabilityTable:
+    """Tableau de disponibilité aligné sur le snapshot courant"""
+    table = availability.table
+    if table is None or table.metadata_version != snapshot.version:
+        raise HTTPException(status_code=503, detail="Naolib availability not loaded yet")
+    return table
+
+
+def _with_distance(distance: float, parking: dict, available: int) -> dict:
+    """Copier un parking avec la disponibilité temps réel et distance_meters"""
+    return {
+        **parking,
+        "available": available,
+        "status": "open" if available else "closed",
+        "distance_meters": round(distance, 1),
+    }
 
 
 # ÉTAPE: Endpoint de santé
@@ -64,6 +160,23 @@ async def health_check():
     return {"status": "healthy", "service": "naolib-mobility"}
 
 
+# ÉTAPE: Endpoint de monitoring - GET /metrics
+@app.get("/metrics")
+async def get_metrics():
+    """
+    LOGIQUE:
+    - Exposer l'état du snapshot (version, âge, rafraîchissements, 304, échecs)
+    - Exposer les compteurs du cache (hits, misses, évictions, taille)
+      et le hit ratio par niveau de quantification
+    """
+    return {
+        "snapshot": refresher.get_stats(),
+        "availability": availability.get_stats(),
+        "cache": cache.get_stats(),
+        "cache_hit_ratio_by_level": cache_hits.get_stats(),
+    }
+
+
 # ÉTAPE: Endpoint principal - GET /bike-parkings/nearby
 @app.get("/bike-parkings/nearby")
 async def get_nearby_bike_parkings(
@@ -101,42 +214,193 @@ async def get_nearby_bike_parkings(
     """
     
     # ÉTAPE 1.1: Extraire requestId
-    # - request_id = request.headers.get('X-Request-Id')
-    # - Logger: "Searching bike parkings: lat={}, lon={}, radius={}"
-    
+    request_id = request.state.request_id if request else "-"
+    logger.info(f"[{request_id}] Searching bike parkings: lat={lat}, lon={lon}, radius={radius}")
+
     # ÉTAPE 1.2: Vérifier le cache
-    # - cache_key = f"parkings_{lat}_{lon}_{radius}"
-    # - cached = cache.get(cache_key)
-    # - Si valide (timestamp < 60s), retourner cached
-    
-    # ÉTAPE 1.3: Appeler l'API Naolib
-    # - _fetch_naolib_parkings()
-    # - Obtenir tous les parkings vélos de Nantes
-    
-    # ÉTAPE 1.4: Calculer les distances
-    # - Pour chaque parking:
-    #   * Calculer distance avec formule haversine
-    #   * Ajouter champ 'distance_meters'
-    
-    # ÉTAPE 1.5: Filtrer par rayon
-    # - Garder seulement ceux avec distance <= radius
-    
-    # ÉTAPE 1.6: Filtrer par disponibilité
-    # - Si min_available > 0:
-    #   * Garder seulement ceux avec available >= min_available
-    
-    # ÉTAPE 1.7: Trier par distance
-    # - parkings.sort(key=lambda x: x['distance_meters'])
-    
-    # ÉTAPE 1.8: Mettre en cache
-    # - cache.set(cache_key, parkings, ttl=CACHE_TTL_SECONDS)
-    
+    # - Les versions du snapshot et de la disponibilité font partie de la clé:
+    #   une nouvelle version invalide naturellement les anciennes entrées ;
+    #   l'epoch du processus aussi (versions renumérotées à chaque démarrage:
+    #   les positions rejouées depuis le journal ne sont jamais relues)
+    # - Clé = cellule du point (pas les floats bruts): les requêtes voisines
+    #   partagent l'entrée
+    # - Entrée = positions des candidats autour du centre de la cellule, avec
+    #   une marge d'une demi-diagonale: elle contient tous les parkings à moins
+    #   de `radius` de n'importe quel point de la cellule
+    snapshot = _current_snapshot()
+    table = _current_availability(snapshot)
+    index = snapshot.index
+    cache_key = (
+        f"parkings_{table.epoch}.v{snapshot.version}.{table.version}_{quantizer.cell(lat, lon)}"
+        f"_{radius}_{min_available}"
+    )
+    candidates = cache.get(cache_key)
+    cache_hits.record(quantizer.level, candidates is not None)
+
+    if candidates is None:
+        # ÉTAPE 1.3: Index spatial du snapshot courant (jamais d'appel à l'API Naolib)
+        # - Seules les cellules qui intersectent le cercle sont visitées
+        # - Le filtre min_available est appliqué dans chaque cellule (disponibilité temps réel)
+        center_lat, center_lon, margin = quantizer.cell_center(lat, lon)
+        candidates = [
+            position
+            for _, position in index.within_radius(
+                center_lat, center_lon, radius + margin, min_available, table.available
+            )
+        ]
+        cache.set(cache_key, candidates, ttl=CACHE_TTL_SECONDS)
+
+    # ÉTAPE 1.4 à 1.7: Distances exactes depuis le point demandé
+    # - Filtrer par rayon, trier les seuls résultats par distance
+    parkings = []
+    for position in candidates:
+        parking = index.parkings[position]
+        distance = _calculate_distance(lat, lon, parking["lat"], parking["lon"])
+        if distance <= radius:
+            parkings.append((distance, position))
+    parkings.sort()
+    parkings = [
+        _with_distance(distance, index.parkings[position], table.get(position))
+        for distance, position in parkings
+    ]
+
     # ÉTAPE 1.9: Logger et retourner
-    # - Logger: "Found {} bike parkings within {}m"
-    # - Retourner la liste
-    
-    # TODO: Implémenter
-    pass
+    logger.info(f"[{request_id}] Found {len(parkings)} bike parkings within {radius}m")
+    return parkings
+
+
+# ÉTAPE: Endpoint k plus proches - GET /bike-parkings/nearest
+@app.get("/bike-parkings/nearest")
+async def get_nearest_bike_parkings(
+    lat: float = Query(..., description="Latitude du point de recherche"),
+    lon: float = Query(..., description="Longitude du point de recherche"),
+    k: int = Query(5, ge=1, le=50, description="Nombre de parkings à retourner"),
+    min_available: int = Query(0, ge=0, description="Nombre minimum de places disponibles"),
+    max_distance: int = Query(NEAREST_MAX_DISTANCE_M, ge=100, le=NEAREST_MAX_DISTANCE_M,
+                              description="Distance maximale en mètres"),
+    request: Request = None
+):
+    """
+    ÉTAPE: Obtenir les k parkings vélos les plus proches
+
+    LOGIQUE:
+    - Parcours de l'index par anneaux de cellules croissants
+    - Filtre min_available appliqué pendant le parcours
+    - Retourne au plus k parkings triés par distance (même format que /nearby)
+    """
+    request_id = request.state.request_id if request else "-"
+    snapshot = _current_snapshot()
+    table = _current_availability(snapshot)
+    index = snapshot.index
+    parkings = [
+        _with_distance(distance, index.parkings[position], table.get(position))
+        for distance, position in index.nearest(
+            lat, lon, k, min_available, max_distance, table.available
+        )
+    ]
+    logger.info(f"[{request_id}] Found {len(parkings)} nearest bike parkings (k={k})")
+    return parkings
+
+
+# ÉTAPE: Métadonnées statiques - GET /bike-parkings/metadata
+@app.get("/bike-parkings/metadata")
+async def get_bike_parkings_metadata(request: Request = None):
+    """
+    ÉTAPE: Obtenir les métadonnées statiques de tous les parkings
+
+    LOGIQUE:
+    - id, name, lat, lon, capacity (sans disponibilité)
+    - metadata_version: à comparer avec celui du flux de disponibilité,
+      recharger seulement quand il change (ou quand epoch change: service
+      redémarré, versions renumérotées)
+    """
+    snapshot = _current_snapshot()
+    return {
+        "epoch": availability.epoch,
+        "metadata_version": snapshot.version,
+        "parkings": [
+            {key: parking.get(key) for key in ("id", "name", "lat", "lon", "capacity")}
+            for parking in snapshot.index.parkings
+        ],
+    }
+
+
+# ÉTAPE: Flux de disponibilité - GET /bike-parkings/availability
+@app.get("/bike-parkings/availability")
+async def get_bike_parkings_availability(
+    since: int = Query(0, ge=0, description="Dernière version de disponibilité connue"),
+    epoch: Optional[str] = Query(None, description="Epoch de cette version (réponse précédente)"),
+    request: Request = None
+):
+    """
+    ÉTAPE: Changements de disponibilité depuis la version `since`
+
+    LOGIQUE:
+    - since=0: liste complète
+    - Sinon: seulement les parkings dont la disponibilité a changé
+    - full=True: métadonnées rechargées ou service redémarré (epoch
+      différent), le client doit tout remplacer (et recharger
+      /bike-parkings/metadata si metadata_version ou epoch a changé)
+
+    OUTPUT (tableaux parallèles, compacts):
+    - epoch, metadata_version, version, since, full
+    - ids: [id], available: [places disponibles]
+    """
+    request_id = request.state.request_id if request else "-"
+    table = _current_availability(_current_snapshot())
+    delta = table.delta(since, epoch)
+    logger.info(f"[{request_id}] Availability delta since v{since}: {len(delta['ids'])} changes")
+    return delta
+
+
+# ÉTAPE: Endpoint batch - POST /distances/matrix
+@app.post("/distances/matrix")
+async def get_distance_matrix(body: DistanceMatrixRequest, request: Request = None):
+    """
+    ÉTAPE: Matrice de distances (Haversine) en un seul appel
+
+    LOGIQUE:
+    - Sources / cibles = points fournis puis parkings désignés par id
+    - Sans cible explicite: toutes les cibles = tous les parkings
+    - Calcul vectorisé NumPy (pas de boucle par paire)
+    - Ex: parkings origine x parkings destination pour les candidats Type B
+
+    OUTPUT:
+    - source_ids / target_ids: id du parking ou null pour un point libre
+    - distances_meters: matrice [source][cible] en mètres
+    """
+    request_id = request.state.request_id if request else "-"
+    coords = _current_snapshot().coords
+
+    try:
+        source_lats, source_lons, source_ids = _matrix_side(coords, body.sources, body.source_parking_ids)
+        if body.targets or body.target_parking_ids:
+            target_lats, target_lons, target_ids = _matrix_side(coords, body.targets, body.target_parking_ids)
+        else:
+            target_lats, target_lons, target_ids = coords.lats, coords.lons, coords.ids
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=f"Unknown parking id: {e.args[0]}")
+
+    if len(source_lats) == 0:
+        raise HTTPException(status_code=400, detail="At least one source is required")
+    if len(source_lats) * len(target_lats) > MAX_MATRIX_CELLS:
+        raise HTTPException(status_code=400, detail=f"Matrix larger than {MAX_MATRIX_CELLS} cells")
+
+    distances = haversine_matrix(source_lats, source_lons, target_lats, target_lons)
+    logger.info(f"[{request_id}] Distance matrix {distances.shape[0]}x{distances.shape[1]}")
+    return {
+        "source_ids": source_ids,
+        "target_ids": list(target_ids),
+        "distances_meters": distances.round(1).tolist(),
+    }
+
+
+def _matrix_side(coords: ParkingCoordinates, points: list, parking_ids: List[str]):
+    """Assembler les coordonnées d'un côté de la matrice (points puis parkings)"""
+    parking_lats, parking_lons = coords.select(parking_ids)
+    lats = np.concatenate([np.array([p.lat for p in points], dtype=np.float64), parking_lats])
+    lons = np.concatenate([np.array([p.lon for p in points], dtype=np.float64), parking_lons])
+    return lats, lons, [None] * len(points) + list(parking_ids)
 
 
 # ÉTAPE: Endpoint détail - GET /bike-parkings/{parking_id}
@@ -162,7 +426,11 @@ async def get_bike_parking_detail(
     pass
 
 
-async def _fetch_naolib_parkings() -> List[dict]:
+async def _fetch_naolib_parkings(
+    client: httpx.AsyncClient,
+    etag: Optional[str] = None,
+    last_modified: Optional[str] = None
+) -> FetchResult:
     """
     ÉTAPE 2.1: Appeler l'API Naolib pour obtenir tous les parkings
     
@@ -170,8 +438,10 @@ async def _fetch_naolib_parkings() -> List[dict]:
     - URL de l'API Naolib (données open data Nantes)
     - Endpoint: /api/records/1.0/search/
     - Dataset: parkings vélos Nantes
+    - Requête conditionnelle (If-None-Match / If-Modified-Since)
     - Parser la réponse JSON
     - Normaliser vers notre format
+    - Appelé uniquement par le SnapshotRefresher (jamais sur le chemin des requêtes)
     
     API NAOLIB:
     - Base URL: https://data.nantesmetropole.fr
@@ -180,45 +450,92 @@ async def _fetch_naolib_parkings() -> List[dict]:
     """
     
     # ÉTAPE 2.1.1: Construire l'URL de requête
-    # - base_url = "https://data.nantesmetropole.fr/api/records/1.0/search/"
-    # - params:
-    #   * dataset: "244400404_parkings-velos-nantes-metropole"
-    #   * rows: 100 (ou -1 pour tout)
-    #   * apikey: NAOLIB_API_KEY (si requis)
-    
+    params = {"dataset": NAOLIB_DATASET, "rows": -1}
+    if NAOLIB_API_KEY:
+        params["apikey"] = NAOLIB_API_KEY
+
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+
     # ÉTAPE 2.1.2: Envoyer la requête
-    # - async with httpx.AsyncClient() as client:
-    # - response = await client.get(url, params=params, timeout=3.0)
-    
+    # ÉTAPE 2.1.5: Gestion des erreurs
+    # - Timeout / erreur HTTP / JSON invalide: lever, le snapshot courant est conservé
+    response = await client.get(NAOLIB_API_URL, params=params, headers=headers, timeout=10.0)
+    if response.status_code == 304:
+        return FetchResult(not_modified=True, etag=etag, last_modified=last_modified)
+    response.raise_for_status()
+
     # ÉTAPE 2.1.3: Parser la réponse
-    # - data = response.json()
-    # - records = data['records']
-    
+    try:
+        records = response.json()["records"]
+    except (ValueError, KeyError) as e:
+        raise ValueError(f"Invalid Naolib response: {e}")
+
     # ÉTAPE 2.1.4: Normaliser chaque record
-    # - Pour chaque record:
-    #   * Extraire fields
-    #   * Normaliser vers notre format:
-    #     {
-    #       'id': record['recordid'],
-    #       'name': fields['nom'] ou fields['libelle'],
-    #       'lat': fields['geo_point_2d'][0],
-    #       'lon': fields['geo_point_2d'][1],
-    #       'capacity': fields['capacite'] ou 0,
-    #       'available': fields['disponibilite'] ou capacity,
-    #       'status': 'open' si disponible sinon 'closed',
-    #       'updated_at': datetime.now().isoformat()
-    #     }
-    
-    # ÉTAPE 2.1.5: Gestion des erreurs
-    # - Si timeout ou erreur HTTP, logger et raise HTTPException
-    # - Si format JSON invalide, logger et retourner []
-    
+    now = datetime.now().isoformat()
+    parkings_list = []
+    for record in records:
+        fields = record.get("fields", {})
+        geo_point = fields.get("geo_point_2d")
+        if not geo_point:
+            continue
+        capacity = fields.get("capacite") or 0
+        available = fields.get("disponibilite", capacity)
+        parkings_list.append({
+            "id": record["recordid"],
+            "name": fields.get("nom") or fields.get("libelle"),
+            "lat": geo_point[0],
+            "lon": geo_point[1],
+            "capacity": capacity,
+            "available": available,
+            "status": "open" if available else "closed",
+            "updated_at": now,
+        })
+
     # ÉTAPE 2.1.6: Logger et retourner
-    # - Logger: "Fetched {} parkings from Naolib"
-    # - return parkings_list
-    
-    # TODO: Implémenter
-    pass
+    logger.info(f"Fetched {len(parkings_list)} parkings from Naolib")
+    return FetchResult(
+        not_modified=False,
+        parkings=parkings_list,
+        etag=response.headers.get("ETag"),
+        last_modified=response.headers.get("Last-Modified"),
+    )
+
+
+async def _fetch_naolib_availability(client: httpx.AsyncClient) -> Dict[str, int]:
+    """
+    ÉTAPE 2.2: Lire la disponibilité temps réel
+
+    LOGIQUE:
+    - Même API open data, dataset NAOLIB_AVAILABILITY_DATASET
+    - Projection côté API (fields=disponibilite): seuls recordid et
+      disponibilite sont transférés, pas les métadonnées (nom, géométrie,
+      adresse...) déjà dans le snapshot
+    - Pas de normalisation complète
+    - Erreurs levées: la disponibilité courante est conservée
+    """
+    params = {"dataset": NAOLIB_AVAILABILITY_DATASET, "rows": -1, "fields": "disponibilite"}
+    if NAOLIB_API_KEY:
+        params["apikey"] = NAOLIB_API_KEY
+    response = await client.get(NAOLIB_API_URL, params=params, timeout=3.0)
+    response.raise_for_status()
+    return {
+        record["recordid"]: record["fields"]["disponibilite"]
+        for record in response.json()["records"]
+        if "disponibilite" in record.get("fields", {})
+    }
+
+
+# ÉTAPE: Disponibilité temps réel + snapshot des métadonnées, rafraîchis en tâche de fond
+availability = AvailabilityRefresher(_fetch_naolib_availability, AVAILABILITY_REFRESH_SECONDS)
+refresher = SnapshotRefresher(
+    _fetch_naolib_parkings,
+    SNAPSHOT_REFRESH_SECONDS,
+    on_update=availability.on_snapshot
+)
 
 
 def _calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
@@ -235,13 +552,7 @@ def _calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> f
     - d = R * c  (R = 6371 km)
     """
     
-    # ÉTAPE: Implémenter Haversine
-    # - Convertir degrés en radians
-    # - Appliquer la formule
-    # - Retourner distance_meters
-    
-    # TODO: Implémenter
-    pass
+    return haversine_m(lat1, lon1, lat2, lon2)
 
 
 @app.get("/bike-parkings/all")
@@ -0,0 +1,31 @@
+"""
+Modèles de données pour le Naolib Mobility Service
+
+LOGIQUE:
+- Définir les structures Pydantic des requêtes POST
+- Assurer la cohérence avec les contrats REST
+"""
+
+from pydantic import BaseModel, Field
+from typing import List
+
+
+class Point(BaseModel):
+    """Coordonnées d'un point"""
+    lat: float = Field(..., ge=-90, le=90)
+    lon: float = Field(..., ge=-180, le=180)
+
+
+class DistanceMatrixRequest(BaseModel):
+    """
+    Requête de matrice de distances
+
+    LOGIQUE:
+    - Sources: points et/ou ids de parkings
+    - Cibles: points et/ou ids de parkings
+    - Si aucune cible n'est fournie, cibles = tous les parkings
+    """
+    sources: List[Point] = Field(default_factory=list)
+    source_parking_ids: List[str] = Field(default_factory=list)
+    targets: List[Point] = Field(default_factory=list)
+    target_parking_ids: List[str] = Field(default_factory=list)
@@ -0,0 +1,205 @@
+"""
+Snapshot en mémoire des parkings Naolib, rafraîchi en arrière-plan
+
+LOGIQUE:
+- Une seule copie versionnée de tous les parkings (+ index spatial et
+  coordonnées vectorisées construits une fois par version)
+- Une tâche de fond la rafraîchit à intervalle fixe avec des requêtes
+  conditionnelles (If-None-Match / If-Modified-Since) : un 304 ne coûte
+  ni téléchargement ni reconstruction
+- Tant qu'aucun snapshot n'est chargé (échec au démarrage), nouvel essai
+  rapide avec backoff exponentiel (5s, 10s, ... 60s max) au lieu
+  d'attendre l'intervalle complet
+- Remplacement atomique: les requêtes lisent `refresher.snapshot`, une
+  référence vers un objet jamais modifié après construction
+- Les requêtes ne bloquent jamais sur l'API Naolib et le trafic vers
+  l'API ne dépend plus du volume de requêtes
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Awaitable, Callable, List, Optional
+
+import httpx
+
+from .geo import ParkingCoordinates
+from .spatial_index import ParkingIndex
+
+logger = logging.getLogger(__name__)
+
+# Backoff des essais tant qu'aucun snapshot n'est chargé
+RETRY_MIN_SECONDS = 5.0
+RETRY_MAX_SECONDS = 60.0
+
+
+@dataclass
+class FetchResult:
+    """Résultat d'un appel (conditionnel) à l'API Naolib"""
+    not_modified: bool
+    parkings: List[dict] = field(default_factory=list)
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class ParkingSnapshot:
+    """Version immuable des données parkings"""
+    version: int
+    parkings: List[dict]
+    index: ParkingIndex
+    coords: ParkingCoordinates
+    fetched_at: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
+FetchFn = Callable[[httpx.AsyncClient, Optional[str], Optional[str]], Awaitable[FetchResult]]
+
+
+class SnapshotRefresher:
+    """
+    Tâche de fond qui maintient le snapshot à jour
+    """
+
+    def __init__(
+        self,
+        fetch: FetchFn,
+        interval_seconds: float,
+        on_update: Optional[Callable[[ParkingSnapshot], None]] = None
+    ):
+        """
+        ÉTAPE: Initialiser le rafraîchisseur
+
+        LOGIQUE:
+        - fetch(client, etag, last_modified) -> FetchResult
+        - on_update(snapshot): appelé après chaque nouvelle version
+        - Client HTTP longue durée dédié aux appels vers l'API Naolib
+        """
+        self._fetch = fetch
+        self._on_update = on_update
+        self.interval_seconds = interval_seconds
+        self.retry_seconds = RETRY_MIN_SECONDS
+        self.snapshot: Optional[ParkingSnapshot] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._task: Optional[asyncio.Task] = None
+        # Compteurs pour le monitoring
+        self.refreshes = 0
+        self.not_modified = 0
+        self.failures = 0
+        self.last_checked_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    async def start(self):
+        """
+        ÉTAPE: Démarrer (appelé par le lifespan)
+
+        LOGIQUE:
+        - Premier chargement avant d'accepter du trafic
+        - Puis boucle de rafraîchissement en tâche de fond
+        """
+        self._client = httpx.AsyncClient()
+        await self.refresh_once()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """ÉTAPE: Arrêter la tâche de fond et fermer le client"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._client:
+            await self._client.aclose()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self._next_delay())
+            await self.refresh_once()
+
+    def _next_delay(self) -> float:
+        """
+        ÉTAPE: Délai avant le prochain cycle
+
+        LOGIQUE:
+        - Snapshot chargé: intervalle normal (et backoff réinitialisé)
+        - Aucun snapshot: backoff exponentiel, RETRY_MIN_SECONDS doublé
+          jusqu'à RETRY_MAX_SECONDS (jamais plus que l'intervalle normal)
+        """
+        if self.snapshot is not None:
+            self.retry_seconds = RETRY_MIN_SECONDS
+            return self.interval_seconds
+        delay = min(self.retry_seconds, self.interval_seconds)
+        self.retry_seconds = min(self.retry_seconds * 2, RETRY_MAX_SECONDS)
+        return delay
+
+    async def refresh_once(self):
+        """
+        ÉTAPE: Un cycle de rafraîchissement
+
+        LOGIQUE:
+        - Envoyer les validateurs du snapshot courant
+        - 304: garder le snapshot (seulement mettre à jour last_checked_at)
+        - 200: construire index + coordonnées hors boucle d'événements,
+          puis remplacer le snapshot en une affectation
+        - Erreur: garder l'ancien snapshot (servi tel quel)
+        """
+        current = self.snapshot
+        try:
+            result = await self._fetch(
+                self._client,
+                current.etag if current else None,
+                current.last_modified if current else None,
+            )
+        except Exception as e:
+            self.failures += 1
+            self.last_error = str(e)
+            logger.error(f"Naolib snapshot refresh failed: {e}")
+            return
+
+        self.last_checked_at = time.time()
+        if result.not_modified and current is not None:
+            self.not_modified += 1
+            logger.debug(f"Naolib snapshot v{current.version} not modified")
+            return
+
+        index, coords = await asyncio.to_thread(_build_structures, result.parkings)
+        self.snapshot = ParkingSnapshot(
+            version=(current.version + 1) if current else 1,
+            parkings=result.parkings,
+            index=index,
+            coords=coords,
+            fetched_at=datetime.now().isoformat(),
+            etag=result.etag,
+            last_modified=result.last_modified,
+        )
+        self.refreshes += 1
+        self.last_error = None
+        logger.info(f"Naolib snapshot v{self.snapshot.version} loaded ({len(index)} parkings)")
+        if self._on_update:
+            self._on_update(self.snapshot)
+
+    def get_stats(self) -> dict:
+        """Retourner l'état du snapshot (pour /metrics)"""
+        snapshot = self.snapshot
+        return {
+            "version": snapshot.version if snapshot else None,
+            "parkings": len(snapshot.parkings) if snapshot else 0,
+            "fetched_at": snapshot.fetched_at if snapshot else None,
+            "seconds_since_check": (
+                round(time.time() - self.last_checked_at, 1) if self.last_checked_at else None
+            ),
+            "refresh_interval_seconds": self.interval_seconds,
+            "refreshes": self.refreshes,
+            "not_modified": self.not_modified,
+            "failures": self.failures,
+            "last_error": self.last_error,
+        }
+
+
+def _build_structures(parkings: List[dict]):
+    """Construire index spatial et coordonnées (exécuté dans un thread)"""
+    return ParkingIndex(parkings), ParkingCoordinates(parkings)
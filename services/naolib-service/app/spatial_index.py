@@ -0,0 +1,208 @@
+"""
+Index spatial en grille pour les parkings vélos
+
+LOGIQUE:
+- Construit une fois par rafraîchissement des données Naolib
+- Projection locale équirectangulaire (mètres) puis découpage en cellules
+  carrées de CELL_SIZE_M
+- Requête par rayon: ne visite que les cellules qui intersectent le cercle
+- Requête k plus proches: anneaux de cellules croissants, arrêt dès que
+  l'anneau suivant ne peut plus contenir de parking plus proche
+- Filtre min_available poussé dans le parcours des cellules: testé sur le
+  tableau de disponibilité (par position) avant tout calcul de distance.
+  La disponibilité est fournie à la requête, l'index ne dépend que des
+  positions et reste valide entre deux rafraîchissements de métadonnées
+
+COÛT:
+- Construction: O(N log N)
+- Requête: O(cellules visitées + résultats) au lieu de O(N) + tri complet
+"""
+
+import heapq
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+
+EARTH_RADIUS_M = 6371000.0
+CELL_SIZE_M = 250.0
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Distance géodésique (Haversine) en mètres"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+class ParkingIndex:
+    """
+    Index en grille (cellule -> positions des parkings)
+    """
+
+    def __init__(self, parkings: List[dict], cell_size_m: float = CELL_SIZE_M):
+        """
+        ÉTAPE: Construire l'index
+
+        LOGIQUE:
+        - Latitude de référence = moyenne des parkings (Nantes ~47.2°)
+        - Chaque parking est rangé dans la cellule (cx, cy) de sa projection
+        - Position = indice dans self.parkings (clé du tableau de disponibilité)
+        - Les parkings sans coordonnées sont ignorés
+        """
+        self.cell_size_m = cell_size_m
+        self.parkings = [p for p in parkings if p.get("lat") is not None and p.get("lon") is not None]
+        self._by_id = {p["id"]: p for p in self.parkings}
+
+        ref_lat = (
+            sum(p["lat"] for p in self.parkings) / len(self.parkings)
+            if self.parkings else 0.0
+        )
+        self._m_per_deg_lat = math.pi * EARTH_RADIUS_M / 180
+        self._m_per_deg_lon = self._m_per_deg_lat * math.cos(math.radians(ref_lat))
+
+        self._lats = [p["lat"] for p in self.parkings]
+        self._lons = [p["lon"] for p in self.parkings]
+        cells: Dict[Tuple[int, int], List[int]] = {}
+        for position, parking in enumerate(self.parkings):
+            cells.setdefault(self._cell(parking["lat"], parking["lon"]), []).append(position)
+        self._cells = cells
+        # Emprise de la grille (borne des anneaux à parcourir en kNN)
+        self._bounds = (
+            min(cx for cx, _ in cells), max(cx for cx, _ in cells),
+            min(cy for _, cy in cells), max(cy for _, cy in cells),
+        ) if cells else None
+
+    def __len__(self) -> int:
+        return len(self.parkings)
+
+    def get(self, parking_id: str) -> Optional[dict]:
+        """Retrouver un parking par id (O(1))"""
+        return self._by_id.get(parking_id)
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return (
+            math.floor(lon * self._m_per_deg_lon / self.cell_size_m),
+            math.floor(lat * self._m_per_deg_lat / self.cell_size_m),
+        )
+
+    def _cell_candidates(
+        self,
+        cell: Tuple[int, int],
+        min_available: int,
+        available: Optional[Sequence[int]]
+    ):
+        """
+        Positions d'une cellule avec disponibilité >= min_available
+
+        LOGIQUE:
+        - available: disponibilité par position (tableau temps réel)
+        - Sinon, valeur "available" des métadonnées
+        """
+        positions = self._cells.get(cell, ())
+        if min_available <= 0:
+            yield from positions
+        elif available is not None:
+            for position in positions:
+                if available[position] >= min_available:
+                    yield position
+        else:
+            for position in positions:
+                if (self.parkings[position].get("available") or 0) >= min_available:
+                    yield position
+
+    def _ring(self, center: Tuple[int, int], ring: int):
+        """Cellules à distance de Chebyshev exactement `ring` du centre"""
+        cx, cy = center
+        if ring == 0:
+            yield center
+            return
+        for dx in range(-ring, ring + 1):
+            yield (cx + dx, cy - ring)
+            yield (cx + dx, cy + ring)
+        for dy in range(-ring + 1, ring):
+            yield (cx - ring, cy + dy)
+            yield (cx + ring, cy + dy)
+
+    def within_radius(
+        self,
+        lat: float,
+        lon: float,
+        radius_m: float,
+        min_available: int = 0,
+        available: Optional[Sequence[int]] = None
+    ) -> List[Tuple[float, int]]:
+        """
+        ÉTAPE: Parkings dans un rayon, triés par distance
+
+        LOGIQUE:
+        - Visiter les cellules du carré englobant le cercle
+        - Distance exacte (Haversine) seulement pour les candidats
+        - Trier uniquement les résultats
+
+        RETURN: [(distance_m, position)] ; parking = self.parkings[position]
+        """
+        center = self._cell(lat, lon)
+        reach = int(math.ceil(radius_m / self.cell_size_m))
+        results = []
+        for cx in range(center[0] - reach, center[0] + reach + 1):
+            for cy in range(center[1] - reach, center[1] + reach + 1):
+                for position in self._cell_candidates((cx, cy), min_available, available):
+                    distance = haversine_m(lat, lon, self._lats[position], self._lons[position])
+                    if distance <= radius_m:
+                        results.append((distance, position))
+        results.sort()
+        return results
+
+    def nearest(
+        self,
+        lat: float,
+        lon: float,
+        k: int,
+        min_available: int = 0,
+        max_distance_m: Optional[float] = None,
+        available: Optional[Sequence[int]] = None
+    ) -> List[Tuple[float, int]]:
+        """
+        ÉTAPE: k parkings les plus proches
+
+        LOGIQUE:
+        - Parcourir les anneaux de cellules autour du point
+        - Garder un tas des k meilleurs
+        - Un parking de l'anneau r est au moins à (r - 1) * cell_size du point:
+          s'arrêter quand cette borne dépasse le k-ième meilleur
+
+        RETURN: [(distance_m, position)] triés par distance
+        """
+        if k <= 0 or not self._cells:
+            return []
+        center = self._cell(lat, lon)
+        max_ring = self._max_ring(center)
+        heap: List[Tuple[float, int]] = []  # (-distance, position)
+
+        for ring in range(max_ring + 1):
+            lower_bound = max(0, ring - 1) * self.cell_size_m
+            if max_distance_m is not None and lower_bound > max_distance_m:
+                break
+            if len(heap) == k and lower_bound > -heap[0][0]:
+                break
+            for cell in self._ring(center, ring):
+                for position in self._cell_candidates(cell, min_available, available):
+                    distance = haversine_m(lat, lon, self._lats[position], self._lons[position])
+                    if max_distance_m is not None and distance > max_distance_m:
+                        continue
+                    item = (-distance, position)
+                    if len(heap) < k:
+                        heapq.heappush(heap, item)
+                    elif distance < -heap[0][0]:
+                        heapq.heapreplace(heap, item)
+
+        return sorted((-d, position) for d, position in heap)
+
+    def _max_ring(self, center: Tuple[int, int]) -> int:
+        """Anneau au-delà duquel il n'y a plus aucune cellule occupée"""
+        min_x, max_x, min_y, max_y = self._bounds
+        return max(
+            abs(center[0] - min_x), abs(center[0] - max_x),
+            abs(center[1] - min_y), abs(center[1] - max_y),
+        )
@@ -0,0 +1,70 @@
+"""
+Benchmark: Haversine scalaire vs vectorisé (NumPy)
+
+LOGIQUE:
+- Points aléatoires dans l'emprise de Nantes Métropole
+- Un-vers-plusieurs: boucle sur _calculate_distance vs haversine_one_to_many
+- Plusieurs-vers-plusieurs: matrice 50 x N (ex: parkings origine x tous)
+- Vérifie que les deux chemins donnent le même résultat
+
+USAGE (depuis services/naolib-service):
+    python -m benchmarks.bench_distance
+"""
+
+import random
+import time
+
+import numpy as np
+
+from app.geo import haversine_matrix, haversine_one_to_many
+from app.spatial_index import haversine_m
+
+SIZES = [1_000, 10_000, 100_000]
+MATRIX_SOURCES = 50
+REPEATS = 3
+
+
+def _random_points(n: int, rng: random.Random):
+    lats = [47.2184 + rng.uniform(-0.1, 0.1) for _ in range(n)]
+    lons = [-1.5536 + rng.uniform(-0.15, 0.15) for _ in range(n)]
+    return lats, lons
+
+
+def _best_of(fn) -> float:
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    rng = random.Random(42)
+    print(f"{'points':>8} | {'one-to-many scalar':>18} | {'numpy':>9} | {'x':>6} | "
+          f"{MATRIX_SOURCES}xN scalar | {'numpy':>9} | {'x':>6}")
+    for n in SIZES:
+        lats, lons = _random_points(n, rng)
+        lats_np = np.ascontiguousarray(lats, dtype=np.float64)
+        lons_np = np.ascontiguousarray(lons, dtype=np.float64)
+        src_lats, src_lons = lats[:MATRIX_SOURCES], lons[:MATRIX_SOURCES]
+
+        scalar = [haversine_m(47.2184, -1.5536, la, lo) for la, lo in zip(lats, lons)]
+        vector = haversine_one_to_many(47.2184, -1.5536, lats_np, lons_np)
+        assert np.allclose(scalar, vector, atol=1e-6)
+
+        t_scalar = _best_of(lambda: [haversine_m(47.2184, -1.5536, la, lo) for la, lo in zip(lats, lons)])
+        t_vector = _best_of(lambda: haversine_one_to_many(47.2184, -1.5536, lats_np, lons_np))
+        t_m_scalar = _best_of(lambda: [
+            [haversine_m(sla, slo, la, lo) for la, lo in zip(lats, lons)]
+            for sla, slo in zip(src_lats, src_lons)
+        ])
+        t_m_vector = _best_of(lambda: haversine_matrix(
+            np.asarray(src_lats), np.asarray(src_lons), lats_np, lons_np
+        ))
+        print(f"{n:>8} | {t_scalar * 1000:>16.2f}ms | {t_vector * 1000:>7.2f}ms | {t_scalar / t_vector:>5.0f}x | "
+              f"{t_m_scalar * 1000:>10.1f}ms | {t_m_vector * 1000:>7.2f}ms | {t_m_scalar / t_m_vector:>5.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Outil en ligne de commande: convertir un graphe JSON au format binaire
+
+USAGE:
+    python -m app.build_graph extrait_nantes.json data/graph.bin
+
+LOGIQUE:
+- Lire l'extrait pré-traité (format JSON, voir graph.py)
+- Construire les tableaux CSR, poids par profil et index spatial
+- Écrire le fichier binaire versionné (voir graph_format.py) et le relire
+  pour vérification
+"""
+
+import argparse
+import os
+import time
+
+from .graph import DEFAULT_CELL_DEG, StreetGraph
+from .graph_format import read_graph, write_graph
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a memory-mappable street graph file")
+    parser.add_argument("input", help="graph in JSON format (nodes / edges)")
+    parser.add_argument("output", help="binary graph file to write")
+    parser.add_argument("--cell-deg", type=float, default=DEFAULT_CELL_DEG, help="spatial index cell size (degrees)")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    graph = StreetGraph.from_json(args.input, cell_deg=args.cell_deg)
+    built = time.perf_counter()
+    write_graph(graph, args.output)
+    loaded_at = time.perf_counter()
+    check = read_graph(args.output)
+    loaded = time.perf_counter()
+    if (check.node_count, check.edge_count) != (graph.node_count, graph.edge_count):
+        raise SystemExit(f"Verification failed for {args.output}")
+    print(
+        f"{args.output}: {graph.node_count} nodes, {graph.edge_count} edges, "
+        f"{len(graph.cell_keys)} cells, {os.path.getsize(args.output)} bytes "
+        f"(build {(built - started) * 1000:.0f}ms, mmap load {(loaded - loaded_at) * 1000:.1f}ms)"
+    )
+
+
+if __name__ == "__main__":
+    main()
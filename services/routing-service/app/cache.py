@@ -0,0 +1,157 @@
+"""
+Cache des itinéraires calculés par le moteur embarqué
+
+LOGIQUE:
+- Clé = empreinte du graphe, mode, nœud source rattaché, nœud cible
+  rattaché (+ créneau de départ pour transit): deux demandes dont les
+  points tombent sur les mêmes nœuds partagent l'entrée, quelles que soient
+  les coordonnées exactes
+- Valeur = résultat de la recherche entre les deux nœuds (coût, arêtes) ;
+  tronçons d'accès et géométrie sont recalculés pour chaque requête
+- walk / bike ne dépendent pas de l'heure: TTL long (une semaine par
+  défaut) ; transit: TTL court et créneau de départ dans la clé
+- Mémoire bornée (LRUCache: entrées + octets) ; persistance optionnelle en
+  journal append-only (LogStore) quand un chemin de fichier est fourni
+- Plusieurs workers uvicorn: un seul processus (verrou sur path.lock)
+  écrit et compacte le journal, les autres gardent un cache en mémoire
+- Appelé depuis le pool de threads des endpoints: accès sous verrou
+- Hit ratio par mode pour /metrics
+"""
+
+import fcntl
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Optional
+
+from .cache_core import LRUCache
+from .log_store import LogStore
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = "/app/data"
+CACHE_FILE = os.path.join(DATA_DIR, "routing_cache.log")
+MAX_ENTRIES = 50000
+MAX_BYTES = 64 * 1024 * 1024  # Taille approximative (JSON) max en mémoire
+
+
+def route_key(graph_id: str, mode: str, source: int, target: int, departure_bucket: Optional[str] = None) -> str:
+    """Clé d'un itinéraire entre deux nœuds (créneau de départ pour transit)"""
+    key = f"{graph_id}:{mode}:{source}:{target}"
+    return f"{key}:{departure_bucket}" if departure_bucket else key
+
+
+def departure_bucket(when: datetime, bucket_minutes: int) -> str:
+    """Début du créneau contenant `when` (ex: 20240115T1415 pour 14:23 en 15min)"""
+    minutes = when.hour * 60 + when.minute
+    start = minutes - minutes % bucket_minutes
+    return f"{when:%Y%m%d}T{start // 60:02d}{start % 60:02d}"
+
+
+class RouteCache:
+    """
+    Gestionnaire de cache des itinéraires
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: int = 7 * 24 * 3600,
+        path: Optional[str] = None,
+        max_entries: int = MAX_ENTRIES,
+        max_bytes: int = MAX_BYTES
+    ):
+        """
+        ÉTAPE: Initialiser le cache
+
+        LOGIQUE:
+        - Définir TTL et bornes mémoire (entrées + octets, éviction LRU)
+        - path fourni: ouvrir le journal et recharger les entrées encore
+          valides ; sinon cache en mémoire seulement
+        - Journal déjà ouvert par un autre worker: mémoire seulement
+        """
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._journal_lock = self._claim_journal(path) if path else None
+        self._store = LogStore(path) if self._journal_lock else None
+        self._entries = LRUCache(max_entries, max_bytes, ttl_seconds)
+        self._by_mode: Dict[str, Dict[str, int]] = {}
+        if self._store:
+            for key, (value, expires_at) in self._store.replay().items():
+                self._entries.set(key, value, expires_at=expires_at)
+
+
+    @staticmethod
+    def _claim_journal(path: str):
+        """Verrou exclusif du journal pour ce processus (None si un autre worker le tient)"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        lock_file = open(f"{path}.lock", "w")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            logger.info(f"Route cache journal {path} is owned by another worker: memory only")
+            return None
+        return lock_file
+
+
+    def get(self, mode: str, key: str) -> Optional[dict]:
+        """
+        ÉTAPE: Récupérer un itinéraire depuis le cache
+
+        LOGIQUE:
+        - Absent ou expiré: None
+        - Compter le hit / miss pour le mode
+        """
+        with self._lock:
+            value = self._entries.get(key)
+            counts = self._by_mode.setdefault(mode, {"hits": 0, "misses": 0})
+            counts["hits" if value is not None else "misses"] += 1
+        return value
+
+
+    def set(self, key: str, value: dict, ttl: Optional[int] = None):
+        """
+        ÉTAPE: Mettre un itinéraire en cache
+
+        LOGIQUE:
+        - Stocker avec timestamp d'expiration (ttl fourni ou TTL par défaut)
+        - Journaliser si la persistance est activée
+        """
+        with self._lock:
+            expires_at = self._entries.set(key, value, ttl=ttl)
+            if self._store:
+                self._store.append_set(key, value, expires_at)
+                self._store.maybe_compact(len(self._entries), self._entries.to_dict)
+
+
+    def clear_expired(self):
+        """ÉTAPE: Nettoyer les entrées expirées (tas d'expiration)"""
+        with self._lock:
+            return self._entries.expire()
+
+
+    def get_stats(self) -> dict:
+        """Retourner les compteurs du cache, dont le hit ratio par mode (pour /metrics)"""
+        by_mode = {}
+        with self._lock:
+            for mode, counts in self._by_mode.items():
+                lookups = counts["hits"] + counts["misses"]
+                by_mode[mode] = {
+                    **counts,
+                    "hit_ratio": round(counts["hits"] / lookups, 3) if lookups else 0.0,
+                }
+            entries = self._entries.get_stats()
+        return {
+            **entries,
+            "persistent": self._store is not None,
+            "by_mode": by_mode,
+        }
+
+
+    def close(self):
+        """ÉTAPE: Vider le journal sur disque (arrêt du service)"""
+        if self._store:
+            self._store.close()
+        if self._journal_lock:
+            self._journal_lock.close()
@@ -0,0 +1,285 @@
+"""
+Graphe de rues compact (CSR) pour le moteur de routing embarqué
+
+LOGIQUE:
+- Nœuds numérotés 0..N-1: coordonnées en float32 (tableaux lat / lon)
+- Adjacence CSR: les arêtes sortantes du nœud u sont
+  targets[offsets[u]:offsets[u + 1]] ; longueurs (m) et poids par profil
+  (walk, bike) indexés comme targets
+- Poids = temps de parcours en dixièmes de seconde (uint32), arrondi au
+  supérieur: l'heuristique à vol d'oiseau reste admissible ;
+  UNREACHABLE = arête interdite pour le profil
+- CSR inverse (arêtes entrantes) pour la recherche arrière de l'A*
+  bidirectionnel: rev_sources / rev_edges (index dans les tableaux avant)
+- Index spatial en grille pour rattacher un point au nœud le plus proche:
+  clés de cellules triées (int64) + CSR des nœuds de chaque cellule
+- Deux formats sur disque: JSON (extrait pré-traité) et binaire mappé en
+  mémoire (voir graph_format.py) ; StreetGraph.load choisit selon l'extension
+
+FORMAT JSON (extrait OSM pré-traité, ex. la fixture embarquée):
+- nodes: [[lat, lon], ...]
+- edges: [[u, v, longueur_m | null, accès], ...] non orientées, accès:
+  * "all": marche et vélo dans les deux sens
+  * "foot": piétons seulement (vélo interdit)
+  * "oneway": vélo de u vers v seulement, marche dans les deux sens
+"""
+
+import bisect
+import json
+import math
+import zlib
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+EARTH_RADIUS_M = 6371000.0
+UNREACHABLE = 0xFFFFFFFF
+
+# Vitesse de référence de chaque profil (m/s): poids des arêtes et heuristique
+PROFILE_SPEEDS_MPS = {
+    "walk": 5.0 / 3.6,
+    "bike": 15.0 / 3.6,
+}
+ACCESS = ("all", "foot", "oneway")
+DEFAULT_CELL_DEG = 0.005
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Distance à vol d'oiseau (Haversine) en mètres"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def travel_weight(length_m: float, speed_mps: float) -> int:
+    """Poids d'une arête: dixièmes de seconde, arrondis au supérieur"""
+    return math.ceil(length_m / speed_mps * 10)
+
+
+class StreetGraph:
+    """
+    Graphe orienté en tableaux CSR (aucun objet Python par nœud ni par arête)
+    """
+
+    def __init__(
+        self,
+        lat: Sequence[float],
+        lon: Sequence[float],
+        offsets: Sequence[int],
+        targets: Sequence[int],
+        lengths: Sequence[float],
+        weights: Dict[str, Sequence[int]],
+        rev_offsets: Sequence[int],
+        rev_sources: Sequence[int],
+        rev_edges: Sequence[int],
+        cell_deg: float,
+        cell_keys: Sequence[int],
+        cell_offsets: Sequence[int],
+        cell_nodes: Sequence[int],
+        name: str = "",
+        source_format: str = "json"
+    ):
+        """
+        ÉTAPE: Assembler le graphe à partir de ses tableaux
+
+        LOGIQUE:
+        - Les tableaux sont utilisés tels quels (array, memoryview sur un
+          fichier mappé...): aucune copie
+        - Index spatial: cellule cell_keys[i] contient
+          cell_nodes[cell_offsets[i]:cell_offsets[i + 1]]
+        """
+        self.lat = lat
+        self.lon = lon
+        self.offsets = offsets
+        self.targets = targets
+        self.lengths = lengths
+        self.weights = weights
+        self.rev_offsets = rev_offsets
+        self.rev_sources = rev_sources
+        self.rev_edges = rev_edges
+        self.cell_deg = cell_deg
+        self.cell_keys = cell_keys
+        self.cell_offsets = cell_offsets
+        self.cell_nodes = cell_nodes
+        self.name = name
+        self.source_format = source_format
+        self._fingerprint: Optional[str] = None
+
+    @property
+    def node_count(self) -> int:
+        return len(self.lat)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.targets)
+
+    @property
+    def fingerprint(self) -> str:
+        """
+        Empreinte du contenu (CRC32 de la topologie et des poids), calculée
+        une fois: les clés de cache persistées ne survivent pas à un
+        changement de graphe (les numéros de nœuds / arêtes changent)
+        """
+        if self._fingerprint is None:
+            crc = zlib.crc32(memoryview(self.offsets))
+            crc = zlib.crc32(memoryview(self.targets), crc)
+            for profile in sorted(self.weights):
+                crc = zlib.crc32(profile.encode("ascii"), crc)
+                crc = zlib.crc32(memoryview(self.weights[profile]), crc)
+            self._fingerprint = f"{crc:08x}"
+        return self._fingerprint
+
+    @classmethod
+    def load(cls, path: str) -> "StreetGraph":
+        """Charger un graphe: JSON (.json) ou binaire mappé en mémoire"""
+        if path.endswith(".json"):
+            return cls.from_json(path)
+        from .graph_format import read_graph
+        return read_graph(path)
+
+    @classmethod
+    def from_json(cls, path: str, cell_deg: float = DEFAULT_CELL_DEG) -> "StreetGraph":
+        """Charger un graphe au format JSON (voir FORMAT)"""
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(**build_csr(data["nodes"], data["edges"], cell_deg), name=data.get("name", path))
+
+    def _cell_nodes(self, row: int, col: int) -> Sequence[int]:
+        """Nœuds d'une cellule (recherche dichotomique dans cell_keys)"""
+        key = cell_key(row, col)
+        i = bisect.bisect_left(self.cell_keys, key)
+        if i == len(self.cell_keys) or self.cell_keys[i] != key:
+            return ()
+        return self.cell_nodes[self.cell_offsets[i]:self.cell_offsets[i + 1]]
+
+    def nearest(self, lat: float, lon: float, max_distance_m: float) -> Optional[Tuple[int, float]]:
+        """
+        ÉTAPE: Nœud le plus proche d'un point
+
+        LOGIQUE:
+        - Parcourir les anneaux de cellules autour du point, du plus proche
+          au plus lointain
+        - S'arrêter dès que l'anneau suivant est plus loin que le meilleur
+          candidat (ou que max_distance_m)
+
+        RETURN: (nœud, distance_m) ou None si aucun nœud à moins de max_distance_m
+        """
+        row, col = math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg)
+        cell_m = self.cell_deg * 111_320.0 * max(math.cos(math.radians(lat)), 0.1)
+        max_ring = math.ceil(max_distance_m / cell_m) + 1
+        best: Optional[Tuple[int, float]] = None
+        for ring in range(max_ring + 1):
+            if (ring - 1) * cell_m > min(best[1] if best else max_distance_m, max_distance_m):
+                break
+            for r in range(row - ring, row + ring + 1):
+                for c in range(col - ring, col + ring + 1):
+                    if max(abs(r - row), abs(c - col)) != ring:
+                        continue
+                    for node in self._cell_nodes(r, c):
+                        distance = haversine_m(lat, lon, self.lat[node], self.lon[node])
+                        if distance <= max_distance_m and (best is None or distance < best[1]):
+                            best = (node, distance)
+        return best
+
+    def get_stats(self) -> dict:
+        """Taille du graphe (pour /metrics)"""
+        return {
+            "name": self.name,
+            "format": self.source_format,
+            "fingerprint": self.fingerprint,
+            "nodes": self.node_count,
+            "edges": self.edge_count,
+            "profiles": sorted(self.weights),
+        }
+
+
+def cell_key(row: int, col: int) -> int:
+    """Clé int64 d'une cellule de la grille (ligne sur les 32 bits de poids fort)"""
+    return (row << 32) + (col + 0x80000000)
+
+
+def build_csr(
+    nodes: Sequence[Sequence[float]],
+    edges: Iterable[Sequence],
+    cell_deg: float = DEFAULT_CELL_DEG
+) -> dict:
+    """
+    ÉTAPE: Convertir une liste de nœuds / arêtes en tableaux CSR
+
+    LOGIQUE:
+    - Chaque arête non orientée donne deux arêtes orientées
+    - Longueur = max(longueur fournie, vol d'oiseau entre les coordonnées
+      float32): les poids ne sont jamais plus courts que l'heuristique
+    - Poids par profil selon l'accès de l'arête (UNREACHABLE si interdite)
+    - Index spatial: nœuds regroupés par cellule de cell_deg degrés
+    - ValueError si un nœud ou un accès est inconnu
+
+    RETURN: arguments de StreetGraph (sans name)
+    """
+    lat = array("f", (float(node[0]) for node in nodes))
+    lon = array("f", (float(node[1]) for node in nodes))
+    n = len(lat)
+
+    directed: List[Tuple[int, int, float, bool, bool]] = []  # (u, v, longueur, walk, bike)
+    for i, edge in enumerate(edges):
+        u, v, length, access = int(edge[0]), int(edge[1]), edge[2], edge[3] if len(edge) > 3 else "all"
+        if not (0 <= u < n and 0 <= v < n):
+            raise ValueError(f"edge #{i} references an unknown node")
+        if access not in ACCESS:
+            raise ValueError(f"edge #{i} has unknown access {access!r}")
+        length = max(float(length or 0.0), haversine_m(lat[u], lon[u], lat[v], lon[v]))
+        directed.append((u, v, length, True, access != "foot"))
+        directed.append((v, u, length, True, access == "all"))
+    directed.sort(key=lambda e: (e[0], e[1]))
+
+    offsets = array("I", [0] * (n + 1))
+    for u, _, _, _, _ in directed:
+        offsets[u + 1] += 1
+    for u in range(n):
+        offsets[u + 1] += offsets[u]
+    targets = array("I", (e[1] for e in directed))
+    lengths = array("f", (e[2] for e in directed))
+    weights = {}
+    for profile, speed in PROFILE_SPEEDS_MPS.items():
+        allowed = 3 if profile == "walk" else 4
+        weights[profile] = array("I", (
+            travel_weight(e[2], speed) if e[allowed] else UNREACHABLE for e in directed
+        ))
+
+    # CSR inverse: arêtes entrantes de chaque nœud, triées par destination
+    incoming = sorted(range(len(directed)), key=lambda e: (directed[e][1], directed[e][0]))
+    rev_offsets = array("I", [0] * (n + 1))
+    for e in incoming:
+        rev_offsets[directed[e][1] + 1] += 1
+    for v in range(n):
+        rev_offsets[v + 1] += rev_offsets[v]
+    rev_sources = array("I", (directed[e][0] for e in incoming))
+    rev_edges = array("I", incoming)
+
+    # Index spatial: nœuds triés par cellule
+    keys = [cell_key(math.floor(lat[v] / cell_deg), math.floor(lon[v] / cell_deg)) for v in range(n)]
+    by_cell = sorted(range(n), key=lambda v: keys[v])
+    cell_keys = array("q")
+    cell_offsets = array("I")
+    for i, v in enumerate(by_cell):
+        if not cell_keys or cell_keys[-1] != keys[v]:
+            cell_keys.append(keys[v])
+            cell_offsets.append(i)
+    cell_offsets.append(n)
+
+    return {
+        "lat": lat,
+        "lon": lon,
+        "offsets": offsets,
+        "targets": targets,
+        "lengths": lengths,
+        "weights": weights,
+        "rev_offsets": rev_offsets,
+        "rev_sources": rev_sources,
+        "rev_edges": rev_edges,
+        "cell_deg": cell_deg,
+        "cell_keys": cell_keys,
+        "cell_offsets": cell_offsets,
+        "cell_nodes": array("I", by_cell),
+    }
@@ -0,0 +1,145 @@
+"""
+Format binaire du graphe de rues, mappé en mémoire (mmap)
+
+LOGIQUE:
+- Un seul fichier: en-tête versionné + tableaux CSR bruts (little-endian),
+  chacun aligné sur 8 octets
+- Au démarrage, le fichier est mappé en lecture seule et chaque tableau est
+  une memoryview typée sur le mapping: aucune copie, aucun parsing ; le
+  démarrage prend quelques millisecondes quelle que soit la taille du graphe
+- Pages partagées par le cache du noyau: plusieurs workers uvicorn qui
+  mappent le même fichier n'occupent la mémoire physique qu'une fois
+
+EN-TÊTE (v1):
+- magic "HRGRAPH\\0", version (uint16), flags (uint16, réservé)
+- node_count, edge_count, cell_count (uint32), profile_count (uint16)
+- cell_deg (float64), name (64 octets, UTF-8)
+- profile_count noms de profil (16 octets chacun)
+
+SECTIONS (dans cet ordre):
+- lat, lon: float32[N]
+- offsets: uint32[N+1], targets: uint32[M], lengths: float32[M]
+- weights: uint32[M] par profil (ordre de l'en-tête)
+- rev_offsets: uint32[N+1], rev_sources: uint32[M], rev_edges: uint32[M]
+- cell_keys: int64[C], cell_offsets: uint32[C+1], cell_nodes: uint32[N]
+"""
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import BinaryIO, List, Tuple
+
+from .graph import StreetGraph
+
+MAGIC = b"HRGRAPH\0"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<8sHHIIIH2xd64s")
+PROFILE_NAME = struct.Struct("<16s")
+ALIGNMENT = 8
+
+
+def _sections(node_count: int, edge_count: int, cell_count: int, profiles: List[str]) -> List[Tuple[str, str, int]]:
+    """(attribut, type memoryview, nombre d'éléments) de chaque section, dans l'ordre du fichier"""
+    n, m = node_count, edge_count
+    return (
+        [("lat", "f", n), ("lon", "f", n), ("offsets", "I", n + 1), ("targets", "I", m), ("lengths", "f", m)]
+        + [(f"weights.{profile}", "I", m) for profile in profiles]
+        + [("rev_offsets", "I", n + 1), ("rev_sources", "I", m), ("rev_edges", "I", m)]
+        + [("cell_keys", "q", cell_count), ("cell_offsets", "I", cell_count + 1), ("cell_nodes", "I", n)]
+    )
+
+
+def _padding(position: int) -> int:
+    return -position % ALIGNMENT
+
+
+def _check_byte_order():
+    if sys.byteorder != "little":
+        raise ValueError("Binary graph format requires a little-endian host")
+
+
+def write_graph(graph: StreetGraph, path: str):
+    """
+    ÉTAPE: Écrire un graphe au format binaire
+
+    LOGIQUE:
+    - Écriture dans un fichier temporaire puis os.replace (atomique: un
+      service qui démarre ne voit jamais un fichier à moitié écrit)
+    """
+    _check_byte_order()
+    profiles = sorted(graph.weights)
+    header = HEADER.pack(
+        MAGIC, FORMAT_VERSION, 0,
+        graph.node_count, graph.edge_count, len(graph.cell_keys), len(profiles),
+        graph.cell_deg, graph.name.encode("utf-8")[:64],
+    )
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        for profile in profiles:
+            f.write(PROFILE_NAME.pack(profile.encode("ascii")))
+        for attribute, typecode, count in _sections(graph.node_count, graph.edge_count, len(graph.cell_keys), profiles):
+            if attribute.startswith("weights."):
+                values = graph.weights[attribute.split(".", 1)[1]]
+            else:
+                values = getattr(graph, attribute)
+            if len(values) != count:
+                raise ValueError(f"section {attribute} has {len(values)} items, expected {count}")
+            _write_section(f, typecode, values)
+    os.replace(tmp_path, path)
+
+
+def _write_section(f: BinaryIO, typecode: str, values):
+    f.write(b"\0" * _padding(f.tell()))
+    f.write(values.tobytes() if isinstance(values, (array, memoryview)) else array(typecode, values).tobytes())
+
+
+def read_graph(path: str) -> StreetGraph:
+    """
+    ÉTAPE: Mapper un graphe binaire en mémoire
+
+    LOGIQUE:
+    - Vérifier magic, version et taille du fichier (ValueError sinon)
+    - Chaque section devient une memoryview typée sur le mapping
+    """
+    _check_byte_order()
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if len(mapped) < HEADER.size:
+        raise ValueError(f"{path} is too small to be a graph file")
+    magic, version, _, node_count, edge_count, cell_count, profile_count, cell_deg, name = HEADER.unpack_from(mapped, 0)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a graph file (bad magic)")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"{path} has graph format v{version}, expected v{FORMAT_VERSION}")
+
+    position = HEADER.size
+    profiles = []
+    for _ in range(profile_count):
+        profiles.append(PROFILE_NAME.unpack_from(mapped, position)[0].rstrip(b"\0").decode("ascii"))
+        position += PROFILE_NAME.size
+
+    view = memoryview(mapped)
+    arrays = {}
+    weights = {}
+    for attribute, typecode, count in _sections(node_count, edge_count, cell_count, profiles):
+        position += _padding(position)
+        size = count * struct.calcsize(typecode)
+        if position + size > len(mapped):
+            raise ValueError(f"{path} is truncated (section {attribute})")
+        section = view[position:position + size].cast(typecode)
+        position += size
+        if attribute.startswith("weights."):
+            weights[attribute.split(".", 1)[1]] = section
+        else:
+            arrays[attribute] = section
+
+    return StreetGraph(
+        weights=weights,
+        cell_deg=cell_deg,
+        name=name.rstrip(b"\0").decode("utf-8", errors="ignore"),
+        source_format=f"binary v{version}",
+        **arrays,
+    )
@@ -0,0 +1,293 @@
+"""
+Horaires GTFS (Naolib) chargés en tableaux compacts pour RAPTOR
+
+LOGIQUE:
+- Source: dossier ou archive .zip GTFS (agency, stops, routes, trips,
+  stop_times, calendar, calendar_dates)
+- Arrêts numérotés 0..S-1 (arrêts physiques: les stations parentes,
+  location_type=1, sont ignorées) ; coordonnées en float32
+- Patterns ("routes" RAPTOR): trajets d'une même ligne qui desservent
+  exactement la même suite d'arrêts ; trajets d'un pattern triés par
+  départ au premier arrêt
+- Horaires en secondes depuis minuit du jour de service, à plat:
+  horaire du trajet t à la position i = arrivals/departures[trip_time_offsets[t] + i]
+- Index arrêt -> (pattern, position) en CSR pour le balayage RAPTOR
+- Calendrier: services actifs d'une date (calendar + exceptions de
+  calendar_dates), calculés une fois par date
+- Empreinte CRC32 des horaires pour les clés de cache
+"""
+
+import csv
+import io
+import os
+import zipfile
+import zlib
+from array import array
+from datetime import date
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+DEFAULT_TIMEZONE = "Europe/Paris"
+
+
+def parse_gtfs_time(value: str) -> int:
+    """HH:MM:SS GTFS (heures >= 24 autorisées) -> secondes"""
+    hours, minutes, seconds = value.strip().split(":")
+    return int(hours) * 3600 + int(minutes) * 60 + int(seconds)
+
+
+def _parse_date(value: str) -> date:
+    value = value.strip()
+    return date(int(value[:4]), int(value[4:6]), int(value[6:8]))
+
+
+class _Feed:
+    """Lecture des fichiers CSV d'un GTFS (dossier ou zip)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._zip = zipfile.ZipFile(path) if path.endswith(".zip") else None
+
+    def exists(self, name: str) -> bool:
+        if self._zip is not None:
+            return name in self._zip.namelist()
+        return os.path.exists(os.path.join(self.path, name))
+
+    def rows(self, name: str) -> Iterator[Dict[str, str]]:
+        if not self.exists(name):
+            return iter(())
+        if self._zip is not None:
+            f = io.TextIOWrapper(self._zip.open(name), encoding="utf-8-sig")
+        else:
+            f = open(os.path.join(self.path, name), "r", encoding="utf-8-sig", newline="")
+        return self._read(f)
+
+    @staticmethod
+    def _read(f) -> Iterator[Dict[str, str]]:
+        with f:
+            yield from csv.DictReader(f)
+
+
+class Timetable:
+    """
+    Horaires d'un réseau en tableaux compacts (aucun objet Python par passage)
+    """
+
+    def __init__(self):
+        """Tableaux vides: utiliser Timetable.load"""
+        self.name = ""
+        self.timezone = DEFAULT_TIMEZONE
+        # Arrêts
+        self.stop_ids: List[str] = []
+        self.stop_names: List[str] = []
+        self.stop_lat = array("f")
+        self.stop_lon = array("f")
+        # Lignes
+        self.route_ids: List[str] = []
+        self.route_names: List[str] = []
+        self.route_types: List[int] = []
+        # Patterns: arrêts de p = pattern_stops[pattern_stop_offsets[p]:pattern_stop_offsets[p + 1]]
+        self.pattern_route = array("I")
+        self.pattern_headsigns: List[str] = []
+        self.pattern_stop_offsets = array("I", [0])
+        self.pattern_stops = array("I")
+        # Trajets de p = pattern_trip_offsets[p]..pattern_trip_offsets[p + 1] - 1
+        self.pattern_trip_offsets = array("I", [0])
+        self.trip_ids: List[str] = []
+        self.trip_services = array("I")
+        self.trip_time_offsets = array("I")
+        self.arrivals = array("i")
+        self.departures = array("i")
+        # Index arrêt -> (pattern, position)
+        self.stop_pattern_offsets = array("I")
+        self.stop_patterns = array("I")
+        self.stop_positions = array("I")
+        # Calendrier
+        self.service_ids: List[str] = []
+        self._calendar: Dict[int, Tuple[Tuple[bool, ...], date, date]] = {}
+        self._exceptions: Dict[date, Dict[int, bool]] = {}
+        self._active_by_date: Dict[date, Set[int]] = {}
+        self._fingerprint: Optional[str] = None
+
+    @property
+    def stop_count(self) -> int:
+        return len(self.stop_ids)
+
+    @property
+    def pattern_count(self) -> int:
+        return len(self.pattern_route)
+
+    @property
+    def trip_count(self) -> int:
+        return len(self.trip_ids)
+
+    @classmethod
+    def load(cls, path: str) -> "Timetable":
+        """
+        ÉTAPE: Charger un GTFS (dossier ou .zip)
+
+        LOGIQUE:
+        1. Arrêts physiques, lignes, services
+        2. Passages de chaque trajet triés par stop_sequence
+        3. Regrouper les trajets par (ligne, suite d'arrêts) = pattern
+        4. Aplatir les horaires et construire l'index arrêt -> patterns
+        - ValueError si un trajet référence un arrêt ou une ligne inconnus
+        """
+        feed = _Feed(path)
+        timetable = cls()
+        timetable.name = os.path.basename(path.rstrip("/"))
+        for agency in feed.rows("agency.txt"):
+            timetable.timezone = agency.get("agency_timezone") or DEFAULT_TIMEZONE
+            break
+
+        stop_index: Dict[str, int] = {}
+        for row in feed.rows("stops.txt"):
+            if (row.get("location_type") or "0").strip() not in ("", "0"):
+                continue
+            stop_index[row["stop_id"]] = len(timetable.stop_ids)
+            timetable.stop_ids.append(row["stop_id"])
+            timetable.stop_names.append(row.get("stop_name", ""))
+            timetable.stop_lat.append(float(row["stop_lat"]))
+            timetable.stop_lon.append(float(row["stop_lon"]))
+
+        route_index: Dict[str, int] = {}
+        for row in feed.rows("routes.txt"):
+            route_index[row["route_id"]] = len(timetable.route_ids)
+            timetable.route_ids.append(row["route_id"])
+            timetable.route_names.append(row.get("route_short_name") or row.get("route_long_name") or row["route_id"])
+            timetable.route_types.append(int(row.get("route_type") or 3))
+
+        service_index: Dict[str, int] = {}
+
+        def service(service_id: str) -> int:
+            if service_id not in service_index:
+                service_index[service_id] = len(timetable.service_ids)
+                timetable.service_ids.append(service_id)
+            return service_index[service_id]
+
+        for row in feed.rows("calendar.txt"):
+            timetable._calendar[service(row["service_id"])] = (
+                tuple(row[day].strip() == "1" for day in WEEKDAYS),
+                _parse_date(row["start_date"]),
+                _parse_date(row["end_date"]),
+            )
+        for row in feed.rows("calendar_dates.txt"):
+            day = _parse_date(row["date"])
+            timetable._exceptions.setdefault(day, {})[service(row["service_id"])] = row["exception_type"].strip() == "1"
+
+        trips: Dict[str, Tuple[int, int, str]] = {}  # trip_id -> (ligne, service, destination affichée)
+        for row in feed.rows("trips.txt"):
+            if row["route_id"] not in route_index:
+                raise ValueError(f"trip {row['trip_id']} references unknown route {row['route_id']}")
+            trips[row["trip_id"]] = (route_index[row["route_id"]], service(row["service_id"]), row.get("trip_headsign", ""))
+
+        stop_times: Dict[str, List[Tuple[int, int, int, int]]] = {}  # trip_id -> [(séquence, arrêt, arrivée, départ)]
+        for row in feed.rows("stop_times.txt"):
+            if row["stop_id"] not in stop_index:
+                raise ValueError(f"trip {row['trip_id']} references unknown stop {row['stop_id']}")
+            arrival = parse_gtfs_time(row["arrival_time"] or row["departure_time"])
+            departure = parse_gtfs_time(row["departure_time"] or row["arrival_time"])
+            stop_times.setdefault(row["trip_id"], []).append(
+                (int(row["stop_sequence"]), stop_index[row["stop_id"]], arrival, departure)
+            )
+
+        timetable._build_patterns(trips, stop_times)
+        return timetable
+
+    def _build_patterns(
+        self,
+        trips: Dict[str, Tuple[int, int, str]],
+        stop_times: Dict[str, List[Tuple[int, int, int, int]]]
+    ):
+        """
+        ÉTAPE: Regrouper les trajets en patterns et aplatir les horaires
+
+        LOGIQUE:
+        - Clé de pattern = (ligne, suite d'arrêts) ; trajets triés par départ
+        - Trajets sans horaires (ou d'un seul arrêt) ignorés
+        """
+        patterns: Dict[Tuple[int, Tuple[int, ...]], List[Tuple[int, str, List[Tuple[int, int, int, int]]]]] = {}
+        for trip_id, times in stop_times.items():
+            if trip_id not in trips or len(times) < 2:
+                continue
+            times.sort()
+            route, _, _ = trips[trip_id]
+            patterns.setdefault((route, tuple(t[1] for t in times)), []).append((times[0][3], trip_id, times))
+
+        for (route, stops), pattern_trips in sorted(patterns.items()):
+            pattern_trips.sort()
+            self.pattern_route.append(route)
+            self.pattern_headsigns.append(trips[pattern_trips[0][1]][2])
+            self.pattern_stops.extend(stops)
+            self.pattern_stop_offsets.append(len(self.pattern_stops))
+            for _, trip_id, times in pattern_trips:
+                self.trip_ids.append(trip_id)
+                self.trip_services.append(trips[trip_id][1])
+                self.trip_time_offsets.append(len(self.arrivals))
+                self.arrivals.extend(t[2] for t in times)
+                self.departures.extend(t[3] for t in times)
+            self.pattern_trip_offsets.append(len(self.trip_ids))
+
+        by_stop: List[List[Tuple[int, int]]] = [[] for _ in range(self.stop_count)]
+        for pattern in range(self.pattern_count):
+            for position, stop in enumerate(self.stops_of(pattern)):
+                by_stop[stop].append((pattern, position))
+        self.stop_pattern_offsets.append(0)
+        for entries in by_stop:
+            for pattern, position in entries:
+                self.stop_patterns.append(pattern)
+                self.stop_positions.append(position)
+            self.stop_pattern_offsets.append(len(self.stop_patterns))
+
+    def stops_of(self, pattern: int) -> array:
+        """Suite des arrêts d'un pattern (dans l'ordre de desserte)"""
+        return self.pattern_stops[self.pattern_stop_offsets[pattern]:self.pattern_stop_offsets[pattern + 1]]
+
+    def patterns_at(self, stop: int) -> Iterator[Tuple[int, int]]:
+        """(pattern, position) des patterns qui desservent un arrêt"""
+        for i in range(self.stop_pattern_offsets[stop], self.stop_pattern_offsets[stop + 1]):
+            yield self.stop_patterns[i], self.stop_positions[i]
+
+    def active_services(self, day: date) -> Set[int]:
+        """
+        ÉTAPE: Services actifs à une date
+
+        LOGIQUE:
+        - calendar: jour de semaine coché et date dans [début, fin]
+        - calendar_dates: 1 = ajouté, 2 = retiré ce jour-là
+        - Calculé une fois par date
+        """
+        active = self._active_by_date.get(day)
+        if active is None:
+            active = {
+                service for service, (weekdays, start, end) in self._calendar.items()
+                if weekdays[day.weekday()] and start <= day <= end
+            }
+            for service, added in self._exceptions.get(day, {}).items():
+                if added:
+                    active.add(service)
+                else:
+                    active.discard(service)
+            self._active_by_date[day] = active
+        return active
+
+    @property
+    def fingerprint(self) -> str:
+        """Empreinte des horaires (CRC32), calculée une fois"""
+        if self._fingerprint is None:
+            crc = zlib.crc32(memoryview(self.pattern_stops))
+            crc = zlib.crc32(memoryview(self.departures), crc)
+            crc = zlib.crc32(memoryview(self.arrivals), crc)
+            self._fingerprint = f"{crc:08x}"
+        return self._fingerprint
+
+    def get_stats(self) -> dict:
+        """Taille des horaires (pour /metrics)"""
+        return {
+            "name": self.name,
+            "stops": self.stop_count,
+            "routes": len(self.route_ids),
+            "patterns": self.pattern_count,
+            "trips": self.trip_count,
+            "stop_times": len(self.arrivals),
+        }
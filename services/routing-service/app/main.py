@@ -4,22 +4,39 @@
 LOGIQUE GLOBALE:
 - Service REST pour calculer des itinéraires entre 2 points
 - Supporte 3 modes: walk, bike, transit
-- Normalise les réponses de l'API de routing externe
+- walk / bike: moteur embarqué sur un graphe de rues en mémoire
+  (A* bidirectionnel, aucun appel réseau), waypoints et boucles en un appel
+- transit: horaires GTFS Naolib en mémoire (RAPTOR), accès à pied par le
+  graphe de rues ; plages de départ via /transit/journeys ; arrêts
+  suivants d'une ligne et marche pré-calculée via /transit/walk-ahead
 - Fournit distance, durée, géométrie
 
 PORT: 8002
 """
 
+from contextlib import asynccontextmanager
+from datetime import datetime
 from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.responses import JSONResponse
 from enum import Enum
 import logging
+import math
 import os
-from typing import Optional
+import time
+import uuid
+from typing import List, Optional, Tuple
 
 # ÉTAPE: Importer les modules locaux
 # from .models import RouteRequest, RouteResponse
 # from .services.routing_adapter import RoutingAdapter
+from .cache import RouteCache
+from .graph import StreetGraph
+from .gtfs import Timetable
+from .models import MatrixRequest
+from .payload_stats import PayloadStats
+from .routing_engine import NoRoute, RoutingEngine
+from .stop_index import StopIndex
+from .transit_engine import TransitEngine
 
 # ÉTAPE: Configuration du logging
 logging.basicConfig(
@@ -28,11 +45,94 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# ÉTAPE: Configuration
+# Graphe de rues pré-traité (extrait OSM converti hors ligne): fichier binaire
+# mappé en mémoire (python -m app.build_graph) ou JSON. Obligatoire: la
+# fixture app/data/fixture_graph.json (120 nœuds) ne sert qu'aux tests
+GRAPH_FILE = os.getenv("ROUTING_GRAPH_FILE", "")
+if not GRAPH_FILE:
+    raise RuntimeError(
+        "ROUTING_GRAPH_FILE is not set: build the street graph with "
+        "python -m app.build_graph <extract.json> <graph.bin> and point ROUTING_GRAPH_FILE to it"
+    )
+SNAP_MAX_DISTANCE_M = float(os.getenv("ROUTING_SNAP_MAX_DISTANCE_M", "300"))
+# Nombre max de points de passage (via) d'un itinéraire
+MAX_VIA_POINTS = 10
+
+# Cache des itinéraires (clé: mode + nœuds rattachés): walk / bike ne
+# dépendent pas de l'heure, TTL long ; journal sur disque si un fichier est
+# configuré (vide: mémoire seulement)
+CACHE_TTL_SECONDS = int(os.getenv("ROUTING_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+CACHE_MAX_ENTRIES = int(os.getenv("ROUTING_CACHE_MAX_ENTRIES", "50000"))
+CACHE_MAX_BYTES = int(os.getenv("ROUTING_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+CACHE_FILE = os.getenv("ROUTING_CACHE_FILE", "")
+
+# Horaires transit: GTFS Naolib (dossier ou .zip) ; vide (défaut): mode
+# transit désactivé (501). La fixture app/data/gtfs_fixture ne sert qu'aux
+# tests. Les itinéraires transit dépendent de l'heure: créneau de départ
+# dans la clé, TTL court
+GTFS_PATH = os.getenv("ROUTING_GTFS_PATH", "")
+TRANSIT_MAX_ACCESS_MINUTES = float(os.getenv("TRANSIT_MAX_ACCESS_MINUTES", "10"))
+TRANSIT_MAX_TRANSFER_MINUTES = float(os.getenv("TRANSIT_MAX_TRANSFER_MINUTES", "5"))
+TRANSIT_BUCKET_MINUTES = int(os.getenv("TRANSIT_BUCKET_MINUTES", "1"))
+TRANSIT_CACHE_TTL_SECONDS = int(os.getenv("TRANSIT_CACHE_TTL_SECONDS", "300"))
+# Plage max d'une requête /transit/journeys
+MAX_WINDOW_MINUTES = 180
+# Index de marche vers les arrêts suivants (Type A): arrêts retenus par
+# ligne et marche max, pré-calculés au démarrage
+WALK_AHEAD_MAX_STOPS = int(os.getenv("WALK_AHEAD_MAX_STOPS", "5"))
+WALK_AHEAD_MAX_MINUTES = float(os.getenv("WALK_AHEAD_MAX_MINUTES", "20"))
+
+cache = RouteCache(
+    ttl_seconds=CACHE_TTL_SECONDS,
+    path=CACHE_FILE or None,
+    max_entries=CACHE_MAX_ENTRIES,
+    max_bytes=CACHE_MAX_BYTES,
+)
+
+payload_stats = PayloadStats()
+
+_load_started = time.perf_counter()
+engine = RoutingEngine(StreetGraph.load(GRAPH_FILE), SNAP_MAX_DISTANCE_M, cache)
+logger.info(
+    f"Street graph {engine.graph.name} loaded: {engine.graph.node_count} nodes, "
+    f"{engine.graph.edge_count} edges in {(time.perf_counter() - _load_started) * 1000:.0f}ms"
+)
+
+transit: Optional[TransitEngine] = None
+stop_index: Optional[StopIndex] = None
+if GTFS_PATH:
+    transit = TransitEngine(
+        Timetable.load(GTFS_PATH),
+        engine,
+        cache,
+        max_access_minutes=TRANSIT_MAX_ACCESS_MINUTES,
+        max_transfer_minutes=TRANSIT_MAX_TRANSFER_MINUTES,
+        bucket_minutes=TRANSIT_BUCKET_MINUTES,
+        cache_ttl_seconds=TRANSIT_CACHE_TTL_SECONDS,
+    )
+    stop_index = StopIndex(transit, WALK_AHEAD_MAX_STOPS, WALK_AHEAD_MAX_MINUTES)
+
+# ÉTAPE: Cycle de vie de l'application
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    LOGIQUE:
+    - À l'arrêt: vider le journal du cache d'itinéraires
+    """
+    yield
+    cache.close()
+
+
 # ÉTAPE: Initialiser l'application FastAPI
+# Les endpoints de calcul (recherches CPU) sont synchrones: FastAPI les
+# exécute dans son pool de threads, la boucle reste libre pour /health et
+# /metrics ; le parallélisme CPU vient des workers uvicorn (Dockerfile)
 app = FastAPI(
     title="Routing Service",
     description="Service de calcul d'itinéraires multi-modal",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 
@@ -50,10 +150,22 @@ async def add_request_id(request: Request, call_next):
     LOGIQUE:
     - Extraire ou générer X-Request-Id
     - Logger chaque requête
-    - Mesurer le temps de réponse
+    - Mesurer le temps de réponse et la taille du payload
     """
-    # TODO: Implémenter
-    pass
+    request_id = request.headers.get("X-Request-Id") or str(uuid.uuid4())
+    request.state.request_id = request_id
+    start = time.perf_counter()
+    response = await call_next(request)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    response.headers["X-Request-Id"] = request_id
+    size = int(response.headers.get("content-length", 0))
+    if request.scope.get("endpoint") is not None:
+        payload_stats.record(request.url.path, size)
+    logger.info(
+        f"[{request_id}] {request.method} {request.url.path} -> {response.status_code} "
+        f"({elapsed_ms:.1f}ms, {size}B)"
+    )
+    return response
 
 
 # ÉTAPE: Endpoint de santé
@@ -67,15 +179,40 @@ async def health_check():
     return {"status": "healthy", "service": "routing"}
 
 
+# ÉTAPE: Endpoint de monitoring - GET /metrics
+@app.get("/metrics")
+async def get_metrics():
+    """
+    LOGIQUE:
+    - Exposer la taille du graphe et les compteurs du moteur embarqué
+      (itinéraires, matrices, isochrones, boucles, sans itinéraire, nœuds
+      fixés, durées moyennes)
+    - Exposer les compteurs du moteur transit (horaires, requêtes, tours
+      RAPTOR ; null si désactivé) et de l'index des arrêts suivants
+    - Exposer les compteurs du cache d'itinéraires (hit ratio par mode)
+    - Exposer la taille des réponses par endpoint (octets)
+    """
+    return {
+        "engine": engine.get_stats(),
+        "transit": transit.get_stats() if transit else None,
+        "stop_index": stop_index.get_stats() if stop_index else None,
+        "cache": cache.get_stats(),
+        "payload_bytes": payload_stats.get_stats(),
+    }
+
+
 # ÉTAPE: Endpoint principal - GET /route
 @app.get("/route")
-async def get_route(
+def get_route(
     mode: TravelMode = Query(..., description="Mode de transport"),
     from_lat: float = Query(..., alias="from_lat", description="Latitude origine"),
     from_lon: float = Query(..., alias="from_lon", description="Longitude origine"),
     to_lat: float = Query(..., description="Latitude destination"),
     to_lon: float = Query(..., description="Longitude destination"),
     time: Optional[str] = Query("now", description="Heure de départ (ISO 8601 ou 'now')"),
+    via: List[str] = Query([], description="Point de passage 'lat,lon' (répétable, dans l'ordre)"),
+    geometry: bool = Query(True, description="Inclure la géométrie (polyline)"),
+    simplify: float = Query(0, ge=0, le=1000, description="Tolérance de simplification en mètres (0: aucune)"),
     request: Request = None
 ):
     """
@@ -94,166 +231,320 @@ async def get_route(
     - from_lat, from_lon: Coordonnées origine
     - to_lat, to_lon: Coordonnées destination
     - time: Heure de départ
+    - via: points de passage (walk / bike), un seul appel moteur pour
+      tous les tronçons
+    - geometry: false pour omettre les polylines (le client n'affiche pas le tracé)
+    - simplify: tolérance Douglas-Peucker en mètres
     
     OUTPUT:
     - distance_km: Distance totale
     - duration_minutes: Durée totale
-    - segments: Liste de segments
-    - geometry: Polyline (optionnel)
+    - segments: Liste de segments (un par tronçon entre points de passage)
+    - geometry: Polyline encodée (absente si geometry=false)
     """
     
     # ÉTAPE 1.1: Extraire requestId
-    # - request_id = request.headers.get('X-Request-Id')
-    # - Logger: "Routing request: mode={}, from=({},{}), to=({},{})"
-    
+    request_id = request.state.request_id if request else "-"
+    logger.info(
+        f"[{request_id}] Routing request: mode={mode.value}, "
+        f"from=({from_lat},{from_lon}), to=({to_lat},{to_lon})"
+    )
+
     # ÉTAPE 1.2: Valider les coordonnées
-    # - Vérifier -90 <= lat <= 90
-    # - Vérifier -180 <= lon <= 180
-    # - Si invalide, raise HTTPException(400)
-    
+    for lat, lon in ((from_lat, from_lon), (to_lat, to_lon)):
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            raise HTTPException(status_code=400, detail=f"Invalid coordinates: ({lat},{lon})")
+    waypoints = _parse_points(via)
+    if waypoints and mode == TravelMode.TRANSIT:
+        raise HTTPException(status_code=400, detail="Via points are available for walk and bike only")
+    if len(waypoints) > MAX_VIA_POINTS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_VIA_POINTS} via points")
+
     # ÉTAPE 1.3: Sélectionner l'adaptateur selon le mode
-    # - Si mode == WALK: appeler _calculate_walk_route()
-    # - Si mode == BIKE: appeler _calculate_bike_route()
-    # - Si mode == TRANSIT: appeler _calculate_transit_route()
-    
+    calculate = {
+        TravelMode.WALK: _calculate_walk_route,
+        TravelMode.BIKE: _calculate_bike_route,
+        TravelMode.TRANSIT: _calculate_transit_route,
+    }[mode]
+    try:
+        route = calculate(from_lat, from_lon, to_lat, to_lon, time, request_id, geometry, simplify, waypoints)
+    except NoRoute as e:
+        logger.warning(f"[{request_id}] No {mode.value} route: {e}")
+        raise HTTPException(status_code=404, detail=str(e))
+    if route is None:
+        raise HTTPException(status_code=501, detail=f"Mode {mode.value} not available")
+
     # ÉTAPE 1.4: Normaliser la réponse
-    # - Transformer en format standard
-    # - Calculer distance_km et duration_minutes
-    # - Construire segments[]
-    
+    # - Déjà au format standard (distance_km, duration_minutes, segments[], geometry)
+
     # ÉTAPE 1.5: Logger et retourner
-    # - Logger: "Route calculated: {} km, {} minutes"
-    # - Retourner JSON
-    
-    # TODO: Implémenter
-    pass
+    logger.info(f"[{request_id}] Route calculated: {route['distance_km']} km, {route['duration_minutes']} minutes")
+    return route
+
+
+# ÉTAPE: Endpoint matrice - POST /route/matrix
+@app.post("/route/matrix")
+def get_route_matrix(body: MatrixRequest, request: Request = None):
+    """
+    ÉTAPE: Durées / distances entre des sources et des cibles en un appel
+
+    LOGIQUE:
+    - Un seul Dijkstra un-vers-plusieurs par source (pas N x M itinéraires)
+    - Pas de géométrie: seulement les tables
+
+    OUTPUT:
+    - mode
+    - durations_minutes[i][j], distances_km[i][j]: source i -> cible j
+      (null si un point est hors du graphe ou la cible inaccessible)
+    """
+    request_id = request.state.request_id if request else "-"
+    matrix = engine.matrix(
+        body.mode,
+        [(p.lat, p.lon) for p in body.sources],
+        [(p.lat, p.lon) for p in body.targets],
+    )
+    logger.info(f"[{request_id}] Route matrix: {body.mode} {len(body.sources)}x{len(body.targets)}")
+    return {"mode": body.mode, **matrix}
+
+
+# ÉTAPE: Endpoint isochrone - GET /isochrone
+@app.get("/isochrone")
+def get_isochrone(
+    lat: float = Query(..., ge=-90, le=90, description="Latitude du point de départ"),
+    lon: float = Query(..., ge=-180, le=180, description="Longitude du point de départ"),
+    minutes: float = Query(..., gt=0, le=120, description="Budget de temps en minutes"),
+    mode: TravelMode = Query(TravelMode.WALK, description="Mode de transport (walk / bike)"),
+    point: List[str] = Query([], description="Point candidat 'lat,lon' (répétable)"),
+    include_nodes: bool = Query(False, description="Retourner les nœuds atteignables"),
+    request: Request = None
+):
+    """
+    ÉTAPE: Ce qui est atteignable en `minutes` depuis un point
+
+    LOGIQUE:
+    - Un seul Dijkstra borné (pas un itinéraire par candidat)
+    - Les points candidats (ex. parkings) sont marqués atteignables ou non
+      avec leur durée: le planner écarte les candidats hors budget avant
+      de demander le moindre itinéraire
+
+    OUTPUT:
+    - mode, minutes, reachable_nodes
+    - points: [{lat, lon, reachable, duration_minutes}]
+    - nodes: [[lat, lon, minutes]] si include_nodes
+    """
+    request_id = request.state.request_id if request else "-"
+    if mode == TravelMode.TRANSIT:
+        raise HTTPException(status_code=400, detail="Isochrones are available for walk and bike only")
+    candidates = _parse_points(point)
+    try:
+        isochrone = engine.isochrone(mode.value, lat, lon, minutes, candidates, include_nodes)
+    except NoRoute as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    logger.info(
+        f"[{request_id}] Isochrone {mode.value} {minutes}min: {isochrone['reachable_nodes']} nodes, "
+        f"{sum(p['reachable'] for p in isochrone['points'])}/{len(candidates)} points reachable"
+    )
+    return {"mode": mode.value, "minutes": minutes, **isochrone}
 
 
-async def _calculate_walk_route(
+def _parse_points(values: List[str]) -> List[Tuple[float, float]]:
+    """Points 'lat,lon' d'un paramètre répétable (400 si un point est invalide)"""
+    points = []
+    for value in values:
+        try:
+            lat, lon = (float(v) for v in value.split(","))
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid point: {value}")
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            raise HTTPException(status_code=400, detail=f"Invalid point: {value}")
+        points.append((lat, lon))
+    return points
+
+
+def _calculate_walk_route(
     from_lat: float,
     from_lon: float,
     to_lat: float,
     to_lon: float,
     time: str,
-    request_id: str
+    request_id: str,
+    include_geometry: bool = True,
+    simplify_m: float = 0.0,
+    via: List[Tuple[float, float]] = ()
 ) -> dict:
     """
     ÉTAPE 2.1: Calcul d'itinéraire à pied
-    
+
     LOGIQUE:
-    - Appeler l'API externe (ex: OSRM, GraphHopper, Google Directions)
-    - Mode: foot/walking
-    - Parser la réponse
-    - Extraire: distance, durée, steps, geometry
-    
-    API EXTERNE SUGGÉRÉE:
-    - OSRM (gratuit, self-hosted possible)
-    - GraphHopper (gratuit avec limites)
-    - OpenRouteService
+    - Moteur embarqué, profil walk (5 km/h, toutes les rues)
+    - Rattacher les points au graphe, chemin en cache ou A* bidirectionnel
+      (un tronçon par point de passage)
+    - Extraire: distance, durée, geometry (polyline)
+    - Un segment WALK
+    - NoRoute si un point est hors du graphe ou la cible inaccessible
     """
-    
-    # ÉTAPE 2.1.1: Construire la requête API
-    # - URL de l'API externe
-    # - Paramètres: coordinates, profile=foot
-    
-    # ÉTAPE 2.1.2: Envoyer la requête
-    # - httpx.AsyncClient()
-    # - timeout: 2 secondes
-    
-    # ÉTAPE 2.1.3: Parser la réponse
-    # - Extraire routes[0]
-    # - distance (m -> km)
-    # - duration (s -> minutes)
-    # - geometry (polyline)
-    
-    # ÉTAPE 2.1.4: Construire les segments
-    # - Pour marche, typiquement 1 segment
-    # - Mais peut avoir plusieurs steps si l'API le fournit
-    
-    # ÉTAPE 2.1.5: Retourner dict normalisé
-    # TODO: Implémenter
-    pass
+    route = engine.route_via("walk", [(from_lat, from_lon), *via, (to_lat, to_lon)], simplify_m, include_geometry)
+    logger.debug(f"[{request_id}] Walk route: {route['distance_km']} km")
+    return route
 
 
-async def _calculate_bike_route(
+def _calculate_bike_route(
     from_lat: float,
     from_lon: float,
     to_lat: float,
     to_lon: float,
     time: str,
-    request_id: str
+    request_id: str,
+    include_geometry: bool = True,
+    simplify_m: float = 0.0,
+    via: List[Tuple[float, float]] = ()
 ) -> dict:
     """
     ÉTAPE 2.2: Calcul d'itinéraire à vélo
-    
+
     LOGIQUE:
     - Similaire à walk, mais profile=bike
-    - Peut privilégier les pistes cyclables
-    - Vitesse moyenne différente (~15-20 km/h)
+    - Rues piétonnes interdites, sens uniques respectés
+    - Vitesse moyenne différente (15 km/h)
     """
-    
-    # ÉTAPE: Appeler API externe avec profile=bike
-    # - Même structure que _calculate_walk_route
-    # - Adapter les paramètres pour vélo
-    
-    # TODO: Implémenter
-    pass
+    route = engine.route_via("bike", [(from_lat, from_lon), *via, (to_lat, to_lon)], simplify_m, include_geometry)
+    logger.debug(f"[{request_id}] Bike route: {route['distance_km']} km")
+    return route
 
 
-async def _calculate_transit_route(
+def _calculate_transit_route(
     from_lat: float,
     from_lon: float,
     to_lat: float,
     to_lon: float,
     time: str,
-    request_id: str
+    request_id: str,
+    include_geometry: bool = True,
+    simplify_m: float = 0.0,
+    via: List[Tuple[float, float]] = ()
 ) -> dict:
     """
     ÉTAPE 2.3: Calcul d'itinéraire en transports en commun
-    
+
     LOGIQUE:
-    - Utiliser une API de transit (ex: OpenTripPlanner, Google Transit)
-    - Obtenir un itinéraire avec bus/tram/métro
-    - Parser les legs (segments) du trajet
-    - Identifier les attentes (waiting time)
-    
+    - Moteur transit embarqué (horaires GTFS + RAPTOR): plus d'API externe
+    - Heure de départ: 'now' ou ISO 8601, convertie dans le fuseau du réseau
+      (400 si invalide)
+    - Segments WALK / WAIT / TRANSIT ; les segments TRANSIT listent les
+      arrêts desservis (candidats Type A)
+    - Marche seule si elle n'est pas plus lente
+    - None si le mode transit est désactivé (501)
+
     SPÉCIFICITÉ:
     - Dépend fortement de l'heure de départ
-    - Peut retourner plusieurs options
-    - On prend la première/meilleure
+    - On retourne le trajet qui arrive le plus tôt
     """
-    
-    # ÉTAPE 2.3.1: Appeler l'API de transit
-    # - URL de l'API (ex: OpenTripPlanner /plan endpoint)
-    # - Paramètres: from, to, time, mode=TRANSIT
-    
-    # ÉTAPE 2.3.2: Parser la réponse
-    # - Extraire itineraries[0] (meilleur itinéraire)
-    # - Pour chaque leg:
-    #   * mode (WALK, BUS, TRAM, etc.)
-    #   * from/to
-    #   * duration
-    #   * distance
-    
-    # ÉTAPE 2.3.3: Identifier les attentes
-    # - Si gap temporel entre legs, c'est une attente
-    # - Ajouter un segment virtuel "WAIT"
-    
-    # ÉTAPE 2.3.4: Construire segments[]
-    # - Transformer chaque leg en segment
-    # - Normaliser le mode (BUS -> TRANSIT)
-    
-    # ÉTAPE 2.3.5: Retourner dict
-    # TODO: Implémenter
-    pass
+    if transit is None:
+        return None
+    when = _parse_time(time)
+    route = transit.route(from_lat, from_lon, to_lat, to_lon, when, simplify_m, include_geometry)
+    logger.debug(f"[{request_id}] Transit route: {route['duration_minutes']} min, {route['transfers']} transfers")
+    return route
+
+
+def _parse_time(value: Optional[str]) -> datetime:
+    """Heure de départ locale du réseau ('now' ou ISO 8601 ; 400 si invalide)"""
+    try:
+        return transit.local_time(value or "now")
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid time: {value}")
+
+
+# ÉTAPE: Endpoint plage de départ - GET /transit/journeys
+@app.get("/transit/journeys")
+def get_transit_journeys(
+    from_lat: float = Query(..., ge=-90, le=90, description="Latitude origine"),
+    from_lon: float = Query(..., ge=-180, le=180, description="Longitude origine"),
+    to_lat: float = Query(..., ge=-90, le=90, description="Latitude destination"),
+    to_lon: float = Query(..., ge=-180, le=180, description="Longitude destination"),
+    time: Optional[str] = Query("now", description="Début de la plage de départ (ISO 8601 ou 'now')"),
+    window_minutes: int = Query(60, gt=0, le=MAX_WINDOW_MINUTES, description="Durée de la plage en minutes"),
+    geometry: bool = Query(True, description="Inclure la géométrie (polyline)"),
+    simplify: float = Query(0, ge=0, le=1000, description="Tolérance de simplification en mètres (0: aucune)"),
+    request: Request = None
+):
+    """
+    ÉTAPE: Trajets transit pour une plage de départ
+
+    LOGIQUE:
+    - Un seul rRAPTOR pour toute la plage (étiquettes réutilisées d'un
+      départ à l'autre) au lieu d'une requête /route par horaire
+    - Ne garde que les trajets utiles: partir plus tôt doit faire arriver
+      plus tôt
+
+    OUTPUT:
+    - journeys: trajets au format de /route (mode transit), triés par départ
+    """
+    request_id = request.state.request_id if request else "-"
+    if transit is None:
+        raise HTTPException(status_code=501, detail="Mode transit not available")
+    when = _parse_time(time)
+    try:
+        journeys = transit.journeys(from_lat, from_lon, to_lat, to_lon, when, window_minutes, simplify, geometry)
+    except NoRoute as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    logger.info(f"[{request_id}] Transit journeys: {len(journeys)} in {window_minutes}min from {when:%H:%M}")
+    return {"journeys": journeys}
+
+
+# ÉTAPE: Endpoint arrêts suivants - GET /transit/walk-ahead
+@app.get("/transit/walk-ahead")
+def get_walk_ahead(
+    stop_id: str = Query(..., description="Arrêt où l'on attend (stop_id GTFS)"),
+    route_id: str = Query(..., description="Ligne attendue (route_id GTFS)"),
+    trip_id: Optional[str] = Query(None, description="Trajet attendu (horaires de passage, une seule direction)"),
+    to_stop_id: Optional[str] = Query(None, description="Arrêt de descente (segment TRANSIT restant)"),
+    limit: int = Query(2, gt=0, le=20, description="Nombre max d'arrêts suivants"),
+    geometry: bool = Query(True, description="Inclure la géométrie (polyline)"),
+    simplify: float = Query(0, ge=0, le=1000, description="Tolérance de simplification en mètres (0: aucune)"),
+    request: Request = None
+):
+    """
+    ÉTAPE: Arrêts suivants d'une ligne avec la marche depuis l'arrêt courant
+
+    LOGIQUE:
+    - Pour les candidats Type A: une seule recherche par attente au lieu
+      d'un itinéraire marche + un itinéraire transit par arrêt suivant
+    - Marche pré-calculée au démarrage (StopIndex) ; limit plafonné à
+      WALK_AHEAD_MAX_STOPS
+    - 404 si l'arrêt, la ligne, le trajet ou l'arrêt de descente sont
+      inconnus, ou si la ligne ne dessert pas l'arrêt
+
+    OUTPUT:
+    - stop, route_id, route_name
+    - lines: [{headsign, trip_id, departure_time, stops: [{stop_id, name,
+      lat, lon, stops_ahead, walk (segment WALK ou null), arrival_time,
+      ride_minutes, ride (segment TRANSIT jusqu'à to_stop_id)}]}]
+    """
+    request_id = request.state.request_id if request else "-"
+    if stop_index is None:
+        raise HTTPException(status_code=501, detail="Mode transit not available")
+    result = stop_index.walk_ahead(stop_id, route_id, trip_id, to_stop_id, limit, simplify, geometry)
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"Unknown stop {stop_id}, route {route_id}, trip {trip_id} or stop {to_stop_id}")
+    if not result["lines"]:
+        raise HTTPException(status_code=404, detail=f"Route {route_id} does not serve stop {stop_id}")
+    logger.info(
+        f"[{request_id}] Walk-ahead {stop_id} on {route_id}: "
+        f"{sum(len(line['stops']) for line in result['lines'])} stops"
+    )
+    return result
 
 
 @app.get("/route/circular")
-async def get_circular_route(
-    center_lat: float = Query(..., description="Latitude du centre"),
-    center_lon: float = Query(..., description="Longitude du centre"),
-    radius_km: float = Query(..., gt=0, description="Rayon de la boucle en km"),
+def get_circular_route(
+    center_lat: float = Query(..., ge=-90, le=90, description="Latitude du centre"),
+    center_lon: float = Query(..., ge=-180, le=180, description="Longitude du centre"),
+    radius_km: Optional[float] = Query(None, gt=0, le=20, description="Rayon de la boucle en km"),
+    distance_km: Optional[float] = Query(None, gt=0, le=100, description="Longueur visée de la boucle en km"),
     mode: TravelMode = Query(TravelMode.WALK, description="Mode de transport"),
+    geometry: bool = Query(True, description="Inclure la géométrie (polyline)"),
+    simplify: float = Query(0, ge=0, le=1000, description="Tolérance de simplification en mètres (0: aucune)"),
     request: Request = None
 ):
     """
@@ -262,28 +553,34 @@ async def get_circular_route(
     LOGIQUE:
     - Pour les boucles Type C du Health Planner
     - Générer un itinéraire qui revient au point de départ
-    - Distance approximative = radius_km * 2 * pi
+    - Longueur visée = distance_km, sinon radius_km * 2 * pi
     
     STRATÉGIE:
-    - Calculer 4 points cardinaux autour du centre
-    - Demander itinéraire: centre -> N -> E -> S -> W -> centre
-    - Simplifier si l'API supporte les waypoints
+    - Un seul appel au moteur embarqué: centre -> N -> E -> S -> O -> centre
+    - Le moteur ajuste le rayon (quelques essais) pour approcher la
+      longueur visée ; les recherches depuis / vers le centre sont
+      réutilisées d'un tronçon et d'un essai à l'autre
+
+    OUTPUT:
+    - Format de /route (un segment par tronçon)
+    - radius_km: rayon retenu, iterations: essais de rayon
     """
-    
-    # ÉTAPE 1: Calculer les waypoints
-    # - Points à ~radius_km dans 4 directions
-    # - Utiliser formule géographique pour décalage lat/lon
-    
-    # ÉTAPE 2: Appeler l'API avec waypoints
-    # - Certaines APIs supportent waypoints[]
-    # - Sinon, chaîner plusieurs appels
-    
-    # ÉTAPE 3: Assembler les segments
-    # - Combiner tous les segments en un itinéraire
-    
-    # ÉTAPE 4: Retourner
-    # TODO: Implémenter
-    pass
+    request_id = request.state.request_id if request else "-"
+    if mode == TravelMode.TRANSIT:
+        raise HTTPException(status_code=400, detail="Loops are available for walk and bike only")
+    if distance_km is None and radius_km is None:
+        raise HTTPException(status_code=400, detail="radius_km or distance_km is required")
+    target_km = distance_km if distance_km is not None else radius_km * 2 * math.pi
+    try:
+        loop = engine.loop(mode.value, center_lat, center_lon, target_km * 1000, simplify, geometry)
+    except NoRoute as e:
+        logger.warning(f"[{request_id}] No {mode.value} loop: {e}")
+        raise HTTPException(status_code=404, detail=str(e))
+    logger.info(
+        f"[{request_id}] Loop {mode.value}: {loop['distance_km']} km for {target_km:.2f} km requested "
+        f"(radius {loop['radius_km']} km, {loop['iterations']} iterations)"
+    )
+    return loop
 
 
 if __name__ == "__main__":
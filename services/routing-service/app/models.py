@@ -0,0 +1,31 @@
+"""
+Modèles de données pour le Routing Service
+
+LOGIQUE:
+- Définir les structures Pydantic des requêtes POST
+- Assurer la cohérence avec les contrats REST (mêmes modes que GET /route)
+"""
+
+from pydantic import BaseModel, Field
+from typing import List, Literal
+
+MAX_MATRIX_POINTS = 100
+
+
+class Coordinate(BaseModel):
+    """Coordonnées d'un point"""
+    lat: float = Field(..., ge=-90, le=90)
+    lon: float = Field(..., ge=-180, le=180)
+
+
+class MatrixRequest(BaseModel):
+    """
+    Requête de matrice durées / distances
+
+    LOGIQUE:
+    - Modes du moteur embarqué seulement (walk / bike)
+    - Lignes = sources, colonnes = cibles, dans l'ordre de la requête
+    """
+    mode: Literal["walk", "bike"]
+    sources: List[Coordinate] = Field(..., min_length=1, max_length=MAX_MATRIX_POINTS)
+    targets: List[Coordinate] = Field(..., min_length=1, max_length=MAX_MATRIX_POINTS)
@@ -0,0 +1,36 @@
+"""
+Taille des réponses par endpoint (octets JSON)
+
+LOGIQUE:
+- Le middleware enregistre la taille de chaque réponse envoyée
+  (Content-Length) ; un client HTTP peut aussi compter celles qu'il reçoit
+- Compteurs par chemin: réponses, octets cumulés, moyenne, maximum
+- Seules les routes déclarées sont comptées (pas de chemins arbitraires
+  venant de requêtes 404)
+
+Même module dans chaque service (chaque image ne copie que son app/).
+"""
+
+from typing import Dict
+
+
+class PayloadStats:
+    """
+    Octets de réponse par chemin
+    """
+
+    def __init__(self):
+        self._counts: Dict[str, Dict[str, int]] = {}
+
+    def record(self, path: str, size: int):
+        counts = self._counts.setdefault(path, {"responses": 0, "bytes": 0, "max_bytes": 0})
+        counts["responses"] += 1
+        counts["bytes"] += size
+        counts["max_bytes"] = max(counts["max_bytes"], size)
+
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        """Retourner {chemin: {responses, bytes, avg_bytes, max_bytes}} (pour /metrics)"""
+        return {
+            path: {**counts, "avg_bytes": round(counts["bytes"] / counts["responses"], 1)}
+            for path, counts in self._counts.items()
+        }
@@ -0,0 +1,104 @@
+"""
+Polylines encodées (format Google / OSRM, précision 5)
+
+LOGIQUE:
+- Chaque coordonnée est un delta par rapport au point précédent,
+  multiplié par 10^precision, encodé en base64 par blocs de 5 bits
+- Simplification Douglas-Peucker optionnelle avant encodage: les points
+  à moins de `tolerance_m` du tracé simplifié sont retirés
+"""
+
+import math
+from typing import Iterable, List, Sequence, Tuple
+
+METERS_PER_DEGREE = 111_320.0
+
+
+def encode(points: Iterable[Tuple[float, float]], precision: int = 5) -> str:
+    """
+    ÉTAPE: Encoder une liste de (lat, lon) en polyline
+    """
+    factor = 10 ** precision
+    chunks = []
+    prev_lat, prev_lon = 0, 0
+    for lat, lon in points:
+        lat_i, lon_i = round(lat * factor), round(lon * factor)
+        for delta in (lat_i - prev_lat, lon_i - prev_lon):
+            value = ~(delta << 1) if delta < 0 else delta << 1
+            while value >= 0x20:
+                chunks.append(chr((0x20 | (value & 0x1F)) + 63))
+                value >>= 5
+            chunks.append(chr(value + 63))
+        prev_lat, prev_lon = lat_i, lon_i
+    return "".join(chunks)
+
+
+def decode(encoded: str, precision: int = 5) -> List[Tuple[float, float]]:
+    """
+    ÉTAPE: Décoder une polyline en liste de (lat, lon)
+
+    LOGIQUE:
+    - ValueError si la chaîne est tronquée
+    """
+    factor = 10 ** precision
+    points = []
+    index, lat, lon = 0, 0, 0
+    length = len(encoded)
+    while index < length:
+        deltas = []
+        for _ in range(2):
+            result, shift = 0, 0
+            while True:
+                if index >= length:
+                    raise ValueError("Truncated polyline")
+                byte = ord(encoded[index]) - 63
+                index += 1
+                result |= (byte & 0x1F) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += deltas[0]
+        lon += deltas[1]
+        points.append((lat / factor, lon / factor))
+    return points
+
+
+def simplify(points: Sequence[Tuple[float, float]], tolerance_m: float) -> List[Tuple[float, float]]:
+    """
+    ÉTAPE: Simplifier un tracé (Douglas-Peucker)
+
+    LOGIQUE:
+    - Projection équirectangulaire locale (mètres): suffisante à l'échelle
+      d'un itinéraire urbain
+    - Pile de sous-tracés (pas de récursion): pour chaque sous-tracé, garder
+      le point le plus éloigné du segment [début, fin] s'il dépasse la tolérance
+    - Premier et dernier points toujours conservés
+    """
+    if tolerance_m <= 0 or len(points) < 3:
+        return list(points)
+    cos_lat = math.cos(math.radians(points[0][0]))
+    xy = [(lon * METERS_PER_DEGREE * cos_lat, lat * METERS_PER_DEGREE) for lat, lon in points]
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        start, end = stack.pop()
+        farthest, max_distance = -1, tolerance_m
+        for i in range(start + 1, end):
+            distance = _segment_distance(xy[i], xy[start], xy[end])
+            if distance > max_distance:
+                farthest, max_distance = i, distance
+        if farthest >= 0:
+            keep[farthest] = True
+            stack.append((start, farthest))
+            stack.append((farthest, end))
+    return [point for point, kept in zip(points, keep) if kept]
+
+
+def _segment_distance(p: Tuple[float, float], a: Tuple[float, float], b: Tuple[float, float]) -> float:
+    """Distance (m) d'un point projeté au segment [a, b]"""
+    dx, dy = b[0] - a[0], b[1] - a[1]
+    length2 = dx * dx + dy * dy
+    t = 0.0 if length2 == 0 else max(0.0, min(1.0, ((p[0] - a[0]) * dx + (p[1] - a[1]) * dy) / length2))
+    return math.hypot(p[0] - a[0] - t * dx, p[1] - a[1] - t * dy)
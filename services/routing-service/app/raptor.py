@@ -0,0 +1,192 @@
+"""
+RAPTOR (Round-bAsed Public Transit Optimized Router) sur un Timetable
+
+LOGIQUE:
+- Tour k = meilleurs horaires d'arrivée avec k trajets en véhicule
+- Chaque tour ne balaie que les patterns qui desservent un arrêt amélioré
+  au tour précédent, à partir du premier de ces arrêts ; on « monte » dans
+  le trajet le plus tôt qu'on peut encore attraper (recherche dichotomique:
+  trajets d'un pattern triés, sans dépassement)
+- Après le balayage: correspondances à pied (un seul tronçon de marche
+  entre deux véhicules)
+- Élagage: une arrivée n'est gardée que si elle bat le meilleur horaire
+  connu à l'arrêt ET la meilleure arrivée à destination (marche finale
+  comprise)
+- Requêtes par plage (rRAPTOR): plusieurs départs traités du plus tard au
+  plus tôt en conservant les étiquettes ; chaque départ qui améliore
+  l'arrivée donne un trajet Pareto-optimal (départ plus tard, arrivée plus tôt)
+- Étiquettes par tour et par arrêt pour reconstruire le trajet:
+  ("access",) / ("trip", pattern, trajet, position montée, position descente)
+  / ("walk", arrêt de départ, secondes)
+"""
+
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from .gtfs import Timetable
+
+INF = 2 ** 31 - 1
+
+
+class Raptor:
+    """
+    Recherche RAPTOR pour une date (services actifs fixés)
+    """
+
+    def __init__(
+        self,
+        timetable: Timetable,
+        active_services: Set[int],
+        transfer_offsets: Sequence[int],
+        transfer_stops: Sequence[int],
+        transfer_seconds: Sequence[int],
+        max_rounds: int = 5,
+        transfer_slack_s: int = 60
+    ):
+        """
+        ÉTAPE: Initialiser les étiquettes
+
+        LOGIQUE:
+        - Correspondances à pied en CSR: arrêts atteignables depuis s =
+          transfer_stops[transfer_offsets[s]:transfer_offsets[s + 1]]
+        - max_rounds: nombre max de trajets en véhicule
+        - transfer_slack_s: marge minimale pour monter après un autre véhicule
+        """
+        self.timetable = timetable
+        self.active_services = active_services
+        self.transfer_offsets = transfer_offsets
+        self.transfer_stops = transfer_stops
+        self.transfer_seconds = transfer_seconds
+        self.max_rounds = max_rounds
+        self.transfer_slack_s = transfer_slack_s
+        stop_count = timetable.stop_count
+        self.arrivals: List[List[int]] = [[INF] * stop_count]
+        self.labels: List[List[Optional[tuple]]] = [[None] * stop_count]
+        self.best = [INF] * stop_count
+        self.target_best = INF
+        self.scanned_patterns = 0
+
+    def run(self, sources: Dict[int, int], targets: Dict[int, int]) -> Optional[Tuple[int, int, int]]:
+        """
+        ÉTAPE: Une recherche depuis des arrêts de départ
+
+        INPUT:
+        - sources: {arrêt: horaire d'arrivée à pied (s)}
+        - targets: {arrêt: marche jusqu'à la destination (s)}
+
+        LOGIQUE:
+        - Les étiquettes des appels précédents sont conservées (rRAPTOR):
+          seuls les arrêts de départ améliorés sont marqués
+
+        RETURN: (arrivée à destination, tour, arrêt de descente) si cet appel
+        améliore l'arrivée à destination, sinon None
+        """
+        timetable = self.timetable
+        best = self.best
+        improved: Optional[Tuple[int, int, int]] = None
+        marked: Set[int] = set()
+        for stop, seconds in sources.items():
+            if seconds < self.arrivals[0][stop]:
+                self.arrivals[0][stop] = seconds
+                self.labels[0][stop] = ("access",)
+                best[stop] = min(best[stop], seconds)
+                marked.add(stop)
+
+        for k in range(1, self.max_rounds + 1):
+            if not marked:
+                break
+            if len(self.arrivals) <= k:
+                self.arrivals.append([INF] * timetable.stop_count)
+                self.labels.append([None] * timetable.stop_count)
+            previous, current, labels = self.arrivals[k - 1], self.arrivals[k], self.labels[k]
+            slack = self.transfer_slack_s if k > 1 else 0
+
+            # ÉTAPE: Patterns à balayer, depuis leur premier arrêt marqué
+            queue: Dict[int, int] = {}
+            for stop in marked:
+                for pattern, position in timetable.patterns_at(stop):
+                    if position < queue.get(pattern, INF):
+                        queue[pattern] = position
+            marked = set()
+
+            # ÉTAPE: Balayer chaque pattern
+            for pattern, start in queue.items():
+                self.scanned_patterns += 1
+                stops = timetable.stops_of(pattern)
+                first_trip = timetable.pattern_trip_offsets[pattern]
+                trip, board = -1, -1
+                for position in range(start, len(stops)):
+                    stop = stops[position]
+                    if trip >= 0:
+                        arrival = timetable.arrivals[timetable.trip_time_offsets[trip] + position]
+                        if arrival < best[stop] and arrival < self.target_best:
+                            current[stop] = arrival
+                            best[stop] = arrival
+                            labels[stop] = ("trip", pattern, trip, board, position)
+                            marked.add(stop)
+                    ready = previous[stop]
+                    if ready == INF:
+                        continue
+                    ready += slack
+                    limit = trip if trip >= 0 else timetable.pattern_trip_offsets[pattern + 1]
+                    if trip < 0 or ready <= timetable.departures[timetable.trip_time_offsets[trip] + position]:
+                        earlier = self._earliest_trip(first_trip, limit, position, ready)
+                        if earlier >= 0:
+                            trip, board = earlier, position
+
+            # ÉTAPE: Correspondances à pied (depuis les arrivées en véhicule)
+            for stop in list(marked):
+                if labels[stop][0] != "trip":
+                    continue
+                for i in range(self.transfer_offsets[stop], self.transfer_offsets[stop + 1]):
+                    other = self.transfer_stops[i]
+                    arrival = current[stop] + self.transfer_seconds[i]
+                    if arrival < best[other] and arrival < self.target_best:
+                        current[other] = arrival
+                        best[other] = arrival
+                        labels[other] = ("walk", stop, self.transfer_seconds[i])
+                        marked.add(other)
+
+            # ÉTAPE: Meilleure arrivée à destination
+            for stop, egress in targets.items():
+                if current[stop] < INF and current[stop] + egress < self.target_best:
+                    self.target_best = current[stop] + egress
+                    improved = (self.target_best, k, stop)
+        return improved
+
+    def _earliest_trip(self, first: int, limit: int, position: int, ready: int) -> int:
+        """Premier trajet actif de [first, limit) qui part de `position` à `ready` ou après (-1 sinon)"""
+        timetable = self.timetable
+        low, high = first, limit
+        while low < high:
+            mid = (low + high) // 2
+            if timetable.departures[timetable.trip_time_offsets[mid] + position] < ready:
+                low = mid + 1
+            else:
+                high = mid
+        for trip in range(low, limit):
+            if timetable.trip_services[trip] in self.active_services:
+                return trip
+        return -1
+
+    def journey(self, k: int, stop: int) -> Tuple[int, List[tuple]]:
+        """
+        ÉTAPE: Reconstruire le trajet qui arrive à `stop` au tour k
+
+        RETURN: (arrêt de départ, tronçons dans l'ordre) avec tronçons
+        ("trip", pattern, trajet, montée, descente) / ("walk", de, vers, secondes)
+        """
+        legs: List[tuple] = []
+        while True:
+            label = self.labels[k][stop]
+            if label[0] == "access":
+                break
+            if label[0] == "walk":
+                legs.append(("walk", label[1], stop, label[2]))
+                stop = label[1]
+                continue
+            _, pattern, trip, board, alight = label
+            legs.append(("trip", pattern, trip, board, alight))
+            stop = self.timetable.stops_of(pattern)[board]
+            k -= 1
+        legs.reverse()
+        return stop, legs
@@ -0,0 +1,479 @@
+"""
+Moteur de routing embarqué (marche / vélo) sur le graphe de rues en mémoire
+
+LOGIQUE:
+- Plus d'appel réseau vers une API externe sur le chemin critique: les
+  itinéraires walk / bike sont calculés localement (A* bidirectionnel)
+- Origine / destination rattachées au nœud le plus proche ; le tronçon
+  d'accès (point -> nœud) est compté à vol d'oiseau
+- Réponse normalisée identique pour tous les modes:
+  distance_km, duration_minutes, segments[], geometry (polyline, simplifiée
+  à la tolérance demandée, omise si le client n'en a pas besoin)
+- Matrices sources x cibles: un seul Dijkstra un-vers-plusieurs par source
+  (au lieu de N x M requêtes point à point)
+- Isochrones: un seul Dijkstra borné donne tout ce qui est atteignable en
+  T minutes (nœuds et points candidats, ex. parkings)
+- Cache optionnel des chemins nœud -> nœud (RouteCache): le même trajet
+  entre un arrêt et un parking populaires n'est calculé qu'une fois
+- Waypoints et boucles en un seul appel: un segment par tronçon ; les
+  boucles ajustent leur rayon pour viser une distance et réutilisent les
+  arbres de recherche du centre d'un tronçon et d'un essai à l'autre (les
+  tronçons entre waypoints restent des A* indépendants, en cache)
+"""
+
+import logging
+import math
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from . import polyline
+from .cache import RouteCache, route_key
+from .graph import EARTH_RADIUS_M, PROFILE_SPEEDS_MPS, StreetGraph
+from .search import ShortestPathTree, bidirectional_astar, bounded_dijkstra, one_to_many
+
+logger = logging.getLogger(__name__)
+
+# Boucles: écart relatif accepté sur la distance visée, nombre max d'essais de rayon
+LOOP_TOLERANCE = 0.1
+LOOP_MAX_ITERATIONS = 5
+# Waypoints d'une boucle: N, E, S, O (décalages en latitude / longitude)
+LOOP_DIRECTIONS = ((1, 0), (0, 1), (-1, 0), (0, -1))
+
+
+class NoRoute(Exception):
+    """Aucun itinéraire: point trop loin du graphe ou cible inaccessible"""
+    pass
+
+
+class RoutingEngine:
+    """
+    Itinéraires walk / bike sur un StreetGraph
+    """
+
+    def __init__(
+        self,
+        graph: StreetGraph,
+        snap_max_distance_m: float = 300,
+        cache: Optional[RouteCache] = None
+    ):
+        """
+        ÉTAPE: Initialiser
+
+        LOGIQUE:
+        - snap_max_distance_m: distance max entre un point et son nœud
+          (au-delà, le point est hors de la zone couverte par le graphe)
+        - cache: chemins déjà calculés entre deux nœuds (None: pas de cache)
+        """
+        self.graph = graph
+        self.snap_max_distance_m = snap_max_distance_m
+        self.cache = cache
+        self.queries = 0
+        self.searches = 0
+        self.matrix_queries = 0
+        self.matrix_cells = 0
+        self.no_route = 0
+        self.settled = 0
+        self.total_ms = 0.0
+        self.matrix_ms = 0.0
+        self.isochrone_queries = 0
+        self.isochrone_ms = 0.0
+        self.loop_queries = 0
+        self.loop_iterations = 0
+        self.loop_ms = 0.0
+
+    def snap(self, lat: float, lon: float) -> Tuple[int, float]:
+        """Nœud le plus proche et distance d'accès (NoRoute si hors zone)"""
+        nearest = self.graph.nearest(lat, lon, self.snap_max_distance_m)
+        if nearest is None:
+            raise NoRoute(f"({lat},{lon}) is more than {self.snap_max_distance_m}m away from the street graph")
+        return nearest
+
+    def route(
+        self,
+        profile: str,
+        from_lat: float,
+        from_lon: float,
+        to_lat: float,
+        to_lon: float,
+        simplify_m: float = 0.0,
+        include_geometry: bool = True
+    ) -> dict:
+        """
+        ÉTAPE: Itinéraire entre deux points pour un profil (walk / bike)
+
+        LOGIQUE:
+        1. Rattacher origine et destination au graphe
+        2. Chemin entre les deux nœuds: cache, sinon A* bidirectionnel
+        3. Distance = tronçons d'accès + longueurs des arêtes ;
+           durée = accès à la vitesse du profil + poids des arêtes
+        4. Géométrie: origine, nœuds du chemin, destination ; simplifiée
+           (Douglas-Peucker, simplify_m mètres) ou omise si not include_geometry
+
+        RETURN: dict normalisé (voir _build_route)
+        """
+        return self.route_via(profile, [(from_lat, from_lon), (to_lat, to_lon)], simplify_m, include_geometry)
+
+    def route_via(
+        self,
+        profile: str,
+        waypoints: Sequence[Tuple[float, float]],
+        simplify_m: float = 0.0,
+        include_geometry: bool = True
+    ) -> dict:
+        """
+        ÉTAPE: Itinéraire passant par une suite de points, en un seul appel
+
+        LOGIQUE:
+        1. Rattacher chaque point au graphe une seule fois
+        2. Un chemin par paire de nœuds consécutifs (cache, sinon A*
+           bidirectionnel) ; les points intermédiaires sont traversés à leur
+           nœud (pas d'aller-retour jusqu'à la coordonnée exacte)
+        3. Tronçons d'accès au départ et à l'arrivée seulement
+
+        Chaque tronçon est une recherche indépendante (mise en cache par
+        paire de nœuds) : aucun état n'est repris d'un tronçon à l'autre,
+        contrairement aux boucles dont tous les tronçons partent du centre
+        ou y reviennent (voir loop)
+
+        RETURN: dict normalisé, un segment par tronçon (voir _build_route)
+        """
+        started = time.perf_counter()
+        self.queries += 1
+        try:
+            snapped = [self.snap(lat, lon) for lat, lon in waypoints]
+            nodes = [node for node, _ in snapped]
+            legs = [(source, target, *self._path(profile, source, target)) for source, target in zip(nodes, nodes[1:])]
+        except NoRoute:
+            self.no_route += 1
+            raise
+        finally:
+            self.total_ms += (time.perf_counter() - started) * 1000
+        return self._build_route(
+            profile, waypoints[0], waypoints[-1], snapped[0][1], snapped[-1][1], legs, simplify_m, include_geometry
+        )
+
+    def loop(
+        self,
+        profile: str,
+        lat: float,
+        lon: float,
+        distance_m: float,
+        simplify_m: float = 0.0,
+        include_geometry: bool = True
+    ) -> dict:
+        """
+        ÉTAPE: Boucle qui revient au point de départ, d'une longueur visée
+
+        LOGIQUE:
+        1. Rattacher le centre ; deux arbres de recherche incrémentaux
+           enracinés sur son nœud (depuis / vers le centre): premier et
+           dernier tronçon de chaque essai y sont lus, la recherche reprend
+           là où elle s'était arrêtée au lieu de repartir de zéro
+        2. Rayon initial = distance / 2π ; waypoints N, E, S, O rattachés au
+           graphe (ignorés si hors zone)
+        3. Longueur obtenue L: rayon *= distance / L, jusqu'à LOOP_TOLERANCE
+           près ou LOOP_MAX_ITERATIONS essais ; l'essai le plus proche gagne
+        4. Essai impossible (waypoints hors zone ou inaccessibles): rayon / 2
+
+        RETURN: dict normalisé (un segment par tronçon) + radius_km, iterations
+        """
+        started = time.perf_counter()
+        self.loop_queries += 1
+        trees: List[ShortestPathTree] = []
+        iterations = 0
+        try:
+            center, access = self.snap(lat, lon)
+            weights = self.graph.weights[profile]
+            trees = [
+                ShortestPathTree(self.graph, weights, center),
+                ShortestPathTree(self.graph, weights, center, reverse=True),
+            ]
+            radius_m = distance_m / (2 * math.pi)
+            best: Optional[Tuple[float, float, List[tuple]]] = None  # (écart, rayon, tronçons)
+            while iterations < LOOP_MAX_ITERATIONS:
+                iterations += 1
+                legs = self._loop_legs(profile, center, lat, lon, radius_m, trees[0], trees[1])
+                if legs is None:
+                    radius_m /= 2
+                    continue
+                length_m = 2 * access + sum(self.graph.lengths[e] for leg in legs for e in leg[3])
+                error = abs(length_m - distance_m) / distance_m
+                if best is None or error < best[0]:
+                    best = (error, radius_m, legs)
+                if error <= LOOP_TOLERANCE:
+                    break
+                radius_m *= distance_m / max(length_m, 1.0)
+            if best is None:
+                raise NoRoute(f"No {profile} loop of {distance_m:.0f}m around ({lat},{lon})")
+        except NoRoute:
+            self.no_route += 1
+            raise
+        finally:
+            self.settled += sum(len(tree.settled) for tree in trees)
+            self.loop_iterations += iterations
+            self.loop_ms += (time.perf_counter() - started) * 1000
+
+        route = self._build_route(profile, (lat, lon), (lat, lon), access, access, best[2], simplify_m, include_geometry)
+        route["radius_km"] = round(best[1] / 1000, 3)
+        route["iterations"] = iterations
+        return route
+
+    def _loop_legs(
+        self,
+        profile: str,
+        center: int,
+        lat: float,
+        lon: float,
+        radius_m: float,
+        outbound: ShortestPathTree,
+        inbound: ShortestPathTree
+    ) -> Optional[List[tuple]]:
+        """
+        ÉTAPE: Tronçons centre -> N -> E -> S -> O -> centre pour un rayon
+
+        RETURN: [(source, cible, coût, arêtes)] ou None si moins de deux
+        waypoints distincts sont rattachés ou si un tronçon est inaccessible
+        """
+        dlat = math.degrees(radius_m / EARTH_RADIUS_M)
+        dlon = dlat / max(math.cos(math.radians(lat)), 0.1)
+        nodes = [center]
+        for north, east in LOOP_DIRECTIONS:
+            snapped = self.graph.nearest(lat + north * dlat, lon + east * dlon, self.snap_max_distance_m)
+            if snapped is not None and snapped[0] not in (center, nodes[-1]):
+                nodes.append(snapped[0])
+        if len(nodes) < 3:
+            return None
+
+        first, last = nodes[1], nodes[-1]
+        first_cost, last_cost = outbound.cost(first), inbound.cost(last)
+        if first_cost is None or last_cost is None:
+            return None
+        legs = [(center, first, first_cost, outbound.path(first))]
+        try:
+            legs += [(source, target, *self._path(profile, source, target)) for source, target in zip(nodes[1:], nodes[2:])]
+        except NoRoute:
+            return None
+        legs.append((last, center, last_cost, inbound.path(last)))
+        return legs
+
+    def _path(self, profile: str, source: int, target: int) -> Tuple[int, List[int]]:
+        """
+        ÉTAPE: Chemin entre deux nœuds, via le cache si disponible
+
+        LOGIQUE:
+        - Hit: (coût, arêtes) relus tels quels, aucune recherche
+        - Miss: A* bidirectionnel puis mise en cache (TTL par défaut du cache:
+          walk / bike ne dépendent pas de l'heure)
+        - NoRoute si la cible est inaccessible (non mis en cache)
+        """
+        key = route_key(self.graph.fingerprint, profile, source, target)
+        if self.cache is not None:
+            cached = self.cache.get(profile, key)
+            if cached is not None:
+                return cached["cost"], cached["edges"]
+
+        self.searches += 1
+        result = bidirectional_astar(
+            self.graph, self.graph.weights[profile], source, target, PROFILE_SPEEDS_MPS[profile]
+        )
+        if result is None:
+            raise NoRoute(f"No {profile} path between nodes {source} and {target}")
+        cost, edges, settled = result
+        self.settled += settled
+        if self.cache is not None:
+            self.cache.set(key, {"cost": cost, "edges": edges})
+        return cost, edges
+
+    def matrix(
+        self,
+        profile: str,
+        sources: Sequence[Tuple[float, float]],
+        targets: Sequence[Tuple[float, float]]
+    ) -> dict:
+        """
+        ÉTAPE: Matrice durées / distances sources x cibles
+
+        LOGIQUE:
+        1. Rattacher chaque point au graphe une seule fois (hors zone: None)
+        2. Un Dijkstra par nœud source distinct, arrêté quand tous les nœuds
+           cibles sont fixés
+        3. Cellule = tronçons d'accès + chemin ; None si inaccessible
+
+        RETURN: {"durations_minutes": [[...]], "distances_km": [[...]]}
+        """
+        started = time.perf_counter()
+        self.matrix_queries += 1
+        self.matrix_cells += len(sources) * len(targets)
+        speed = PROFILE_SPEEDS_MPS[profile]
+        weights = self.graph.weights[profile]
+        snapped_sources = [self.graph.nearest(lat, lon, self.snap_max_distance_m) for lat, lon in sources]
+        snapped_targets = [self.graph.nearest(lat, lon, self.snap_max_distance_m) for lat, lon in targets]
+        target_nodes = {snapped[0] for snapped in snapped_targets if snapped is not None}
+
+        rows: Dict[int, Dict[int, Tuple[int, float]]] = {}
+        durations: List[List[Optional[int]]] = []
+        distances: List[List[Optional[float]]] = []
+        for snapped_source in snapped_sources:
+            duration_row: List[Optional[int]] = []
+            distance_row: List[Optional[float]] = []
+            if snapped_source is not None and snapped_source[0] not in rows:
+                rows[snapped_source[0]] = one_to_many(self.graph, weights, snapped_source[0], target_nodes)
+            for snapped_target in snapped_targets:
+                cell = None
+                if snapped_source is not None and snapped_target is not None:
+                    cell = rows[snapped_source[0]].get(snapped_target[0])
+                if cell is None:
+                    duration_row.append(None)
+                    distance_row.append(None)
+                    continue
+                access = snapped_source[1] + snapped_target[1]
+                duration_row.append(round((cell[0] / 10 + access / speed) / 60))
+                distance_row.append(round((cell[1] + access) / 1000, 3))
+            durations.append(duration_row)
+            distances.append(distance_row)
+        self.matrix_ms += (time.perf_counter() - started) * 1000
+        return {"durations_minutes": durations, "distances_km": distances}
+
+    def isochrone(
+        self,
+        profile: str,
+        lat: float,
+        lon: float,
+        minutes: float,
+        points: Sequence[Tuple[float, float]] = (),
+        include_nodes: bool = False
+    ) -> dict:
+        """
+        ÉTAPE: Zone atteignable en `minutes` depuis un point
+
+        LOGIQUE:
+        1. Rattacher l'origine au graphe (NoRoute si hors zone) ; le tronçon
+           d'accès consomme une partie du budget
+        2. Un Dijkstra borné par le budget restant
+        3. Chaque point candidat est atteignable si son nœud l'est et que
+           son propre tronçon d'accès tient dans le budget
+
+        RETURN:
+        - reachable_nodes: nombre de nœuds atteignables
+        - points: [{lat, lon, reachable, duration_minutes}] (ordre de la requête)
+        - nodes: [[lat, lon, minutes]] si include_nodes
+        """
+        started = time.perf_counter()
+        self.isochrone_queries += 1
+        speed = PROFILE_SPEEDS_MPS[profile]
+        source, access = self.snap(lat, lon)
+        budget = int(minutes * 600 - access / speed * 10)
+        reached = bounded_dijkstra(self.graph, self.graph.weights[profile], source, budget) if budget >= 0 else {}
+
+        results = []
+        for point_lat, point_lon in points:
+            snapped = self.graph.nearest(point_lat, point_lon, self.snap_max_distance_m)
+            duration = None
+            if snapped is not None and snapped[0] in reached:
+                seconds = reached[snapped[0]] / 10 + (access + snapped[1]) / speed
+                if seconds <= minutes * 60:
+                    duration = round(seconds / 60)
+            results.append({
+                "lat": point_lat,
+                "lon": point_lon,
+                "reachable": duration is not None,
+                "duration_minutes": duration,
+            })
+
+        response = {"reachable_nodes": len(reached), "points": results}
+        if include_nodes:
+            graph = self.graph
+            response["nodes"] = [
+                [round(graph.lat[node], 6), round(graph.lon[node], 6), round((cost / 10 + access / speed) / 60, 1)]
+                for node, cost in reached.items()
+            ]
+        self.isochrone_ms += (time.perf_counter() - started) * 1000
+        return response
+
+    def get_stats(self) -> dict:
+        """Compteurs du moteur (pour /metrics)"""
+        return {
+            "graph": self.graph.get_stats(),
+            "queries": self.queries,
+            "searches": self.searches,
+            "matrix_queries": self.matrix_queries,
+            "matrix_cells": self.matrix_cells,
+            "no_route": self.no_route,
+            "avg_settled_nodes": round(self.settled / self.searches, 1) if self.searches else 0.0,
+            "avg_query_ms": round(self.total_ms / self.queries, 2) if self.queries else 0.0,
+            "avg_matrix_ms": round(self.matrix_ms / self.matrix_queries, 2) if self.matrix_queries else 0.0,
+            "isochrone_queries": self.isochrone_queries,
+            "avg_isochrone_ms": round(self.isochrone_ms / self.isochrone_queries, 2) if self.isochrone_queries else 0.0,
+            "loop_queries": self.loop_queries,
+            "avg_loop_iterations": round(self.loop_iterations / self.loop_queries, 2) if self.loop_queries else 0.0,
+            "avg_loop_ms": round(self.loop_ms / self.loop_queries, 2) if self.loop_queries else 0.0,
+        }
+
+    def _build_route(
+        self,
+        profile: str,
+        start: Tuple[float, float],
+        end: Tuple[float, float],
+        access_from: float,
+        access_to: float,
+        legs: List[tuple],
+        simplify_m: float,
+        include_geometry: bool
+    ) -> dict:
+        """
+        ÉTAPE: Réponse normalisée, un segment par tronçon
+
+        LOGIQUE:
+        - legs: [(nœud source, nœud cible, coût, arêtes)]
+        - Distance = longueurs des arêtes (+ accès au premier / dernier
+          tronçon) ; durée = poids des arêtes + accès à la vitesse du profil
+        - Géométrie par segment et d'ensemble: origine, nœuds des chemins,
+          destination ; simplifiée (Douglas-Peucker, simplify_m mètres) ou
+          omise si not include_geometry (clés absentes: payload minimal)
+
+        OUTPUT:
+        - mode, distance_km, duration_minutes, geometry
+        - segments: [{mode, from, to, duration_minutes, distance_km, geometry}]
+        """
+        graph = self.graph
+        speed = PROFILE_SPEEDS_MPS[profile]
+        segments = []
+        route_points: List[Tuple[float, float]] = []
+        total_m = total_s = 0.0
+        for i, (source, _, cost, edges) in enumerate(legs):
+            points = [(round(graph.lat[source], 6), round(graph.lon[source], 6))]
+            points += [(round(graph.lat[graph.targets[e]], 6), round(graph.lon[graph.targets[e]], 6)) for e in edges]
+            distance_m = sum(graph.lengths[e] for e in edges)
+            duration_s = cost / 10
+            if i == 0:
+                points.insert(0, start)
+                distance_m += access_from
+                duration_s += access_from / speed
+            if i == len(legs) - 1:
+                points.append(end)
+                distance_m += access_to
+                duration_s += access_to / speed
+            segment = {
+                "mode": profile.upper(),
+                "from": {"lat": points[0][0], "lon": points[0][1]},
+                "to": {"lat": points[-1][0], "lon": points[-1][1]},
+                "duration_minutes": round(duration_s / 60),
+                "distance_km": round(distance_m / 1000, 3),
+            }
+            if include_geometry:
+                segment["geometry"] = polyline.encode(polyline.simplify(points, simplify_m))
+            segments.append(segment)
+            route_points += points[1:] if route_points else points
+            total_m += distance_m
+            total_s += duration_s
+
+        route = {
+            "mode": profile,
+            "distance_km": round(total_m / 1000, 3),
+            "duration_minutes": round(total_s / 60),
+            "segments": segments,
+        }
+        if include_geometry:
+            route["geometry"] = polyline.encode(polyline.simplify(route_points, simplify_m))
+        return route
+
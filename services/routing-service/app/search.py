@@ -0,0 +1,294 @@
+"""
+Algorithmes de plus court chemin sur le graphe CSR
+
+LOGIQUE:
+- A* bidirectionnel: recherche avant depuis la source et arrière depuis la
+  cible, potentiel moyen p(v) = (h(v, cible) - h(source, v)) / 2 (cohérent
+  dans les deux sens) ; arrêt quand min(clé avant) + min(clé arrière) >= meilleur
+  chemin connu
+- h = distance à vol d'oiseau / vitesse du profil (admissible: les poids
+  sont arrondis au supérieur et les longueurs >= vol d'oiseau)
+- Un-vers-plusieurs (matrices): un seul Dijkstra par source, arrêté quand
+  toutes les cibles sont fixées
+- Isochrones: Dijkstra borné par un budget de temps
+- Arbres incrémentaux (boucles, waypoints): un Dijkstra depuis / vers une
+  racine, repris là où il s'était arrêté à chaque nouvelle cible
+- Tas binaires (heapq) avec suppression paresseuse, distances en dicts:
+  seuls les nœuds atteints sont alloués
+"""
+
+import heapq
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from .graph import UNREACHABLE, StreetGraph, haversine_m
+
+INF = float("inf")
+
+
+def bidirectional_astar(
+    graph: StreetGraph,
+    weights: Sequence[int],
+    source: int,
+    target: int,
+    speed_mps: float
+) -> Optional[Tuple[int, List[int], int]]:
+    """
+    ÉTAPE: Plus court chemin source -> cible
+
+    INPUT:
+    - weights: poids du profil (dixièmes de seconde)
+    - speed_mps: vitesse max du profil (heuristique)
+
+    RETURN: (coût, arêtes du chemin dans l'ordre, nœuds fixés) ou None si
+    la cible est inaccessible
+    """
+    if source == target:
+        return 0, [], 0
+    lat, lon = graph.lat, graph.lon
+    offsets, targets = graph.offsets, graph.targets
+    rev_offsets, rev_sources, rev_edges = graph.rev_offsets, graph.rev_sources, graph.rev_edges
+    s_lat, s_lon, t_lat, t_lon = lat[source], lon[source], lat[target], lon[target]
+    scale = 10.0 / speed_mps
+    potentials: Dict[int, float] = {}
+
+    def potential(v: int) -> float:
+        p = potentials.get(v)
+        if p is None:
+            p = (haversine_m(lat[v], lon[v], t_lat, t_lon) - haversine_m(s_lat, s_lon, lat[v], lon[v])) * scale / 2
+            potentials[v] = p
+        return p
+
+    dist_f: Dict[int, int] = {source: 0}
+    dist_r: Dict[int, int] = {target: 0}
+    edge_f: Dict[int, int] = {}  # nœud -> arête par laquelle il est atteint (avant)
+    edge_r: Dict[int, int] = {}  # nœud -> arête qui en part vers la cible (arrière)
+    heap_f = [(potential(source), source)]
+    heap_r = [(-potential(target), target)]
+    settled_f = set()
+    settled_r = set()
+    best = INF
+    meeting = -1
+
+    while heap_f and heap_r:
+        if heap_f[0][0] + heap_r[0][0] >= best:
+            break
+        if heap_f[0][0] <= heap_r[0][0]:
+            _, u = heapq.heappop(heap_f)
+            if u in settled_f:
+                continue
+            settled_f.add(u)
+            du = dist_f[u]
+            for e in range(offsets[u], offsets[u + 1]):
+                w = weights[e]
+                if w == UNREACHABLE:
+                    continue
+                v = targets[e]
+                dv = du + w
+                if dv < dist_f.get(v, INF):
+                    dist_f[v] = dv
+                    edge_f[v] = e
+                    heapq.heappush(heap_f, (dv + potential(v), v))
+                    total = dv + dist_r.get(v, INF)
+                    if total < best:
+                        best, meeting = total, v
+        else:
+            _, u = heapq.heappop(heap_r)
+            if u in settled_r:
+                continue
+            settled_r.add(u)
+            du = dist_r[u]
+            for i in range(rev_offsets[u], rev_offsets[u + 1]):
+                e = rev_edges[i]
+                w = weights[e]
+                if w == UNREACHABLE:
+                    continue
+                v = rev_sources[i]
+                dv = du + w
+                if dv < dist_r.get(v, INF):
+                    dist_r[v] = dv
+                    edge_r[v] = e
+                    heapq.heappush(heap_r, (dv - potential(v), v))
+                    total = dv + dist_f.get(v, INF)
+                    if total < best:
+                        best, meeting = total, v
+
+    if meeting < 0:
+        return None
+
+    # Reconstruire: source -> rencontre (arêtes avant), rencontre -> cible (arrière)
+    path: List[int] = []
+    node = meeting
+    while node != source:
+        e = edge_f[node]
+        path.append(e)
+        node = _edge_source(graph, e)
+    path.reverse()
+    node = meeting
+    while node != target:
+        e = edge_r[node]
+        path.append(e)
+        node = targets[e]
+    return int(best), path, len(settled_f) + len(settled_r)
+
+
+def _edge_source(graph: StreetGraph, edge: int) -> int:
+    """Nœud de départ d'une arête (recherche dichotomique dans offsets)"""
+    offsets = graph.offsets
+    low, high = 0, graph.node_count - 1
+    while low < high:
+        mid = (low + high + 1) // 2
+        if offsets[mid] <= edge:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+
+def one_to_many(
+    graph: StreetGraph,
+    weights: Sequence[int],
+    source: int,
+    targets: Set[int],
+    max_cost: Optional[int] = None
+) -> Dict[int, Tuple[int, float]]:
+    """
+    ÉTAPE: Dijkstra depuis une source vers un ensemble de cibles
+
+    LOGIQUE:
+    - Une seule recherche sert toutes les cibles (ligne d'une matrice)
+    - Arrêt dès que toutes les cibles sont fixées (ou graphe épuisé, ou
+      coût > max_cost: cibles plus lointaines absentes du résultat)
+    - La longueur du meilleur chemin est propagée avec son coût
+
+    RETURN: {cible: (coût, longueur_m)} pour les cibles accessibles
+    """
+    offsets, node_targets, lengths = graph.offsets, graph.targets, graph.lengths
+    dist: Dict[int, int] = {source: 0}
+    length: Dict[int, float] = {source: 0.0}
+    heap = [(0, source)]
+    remaining = set(targets)
+    found: Dict[int, Tuple[int, float]] = {}
+    while heap and remaining:
+        du, u = heapq.heappop(heap)
+        if max_cost is not None and du > max_cost:
+            break
+        if du > dist[u]:
+            continue
+        if u in remaining:
+            remaining.discard(u)
+            found[u] = (du, length[u])
+        for e in range(offsets[u], offsets[u + 1]):
+            w = weights[e]
+            if w == UNREACHABLE:
+                continue
+            v = node_targets[e]
+            dv = du + w
+            if dv < dist.get(v, INF):
+                dist[v] = dv
+                length[v] = length[u] + lengths[e]
+                heapq.heappush(heap, (dv, v))
+    return found
+
+
+def bounded_dijkstra(
+    graph: StreetGraph,
+    weights: Sequence[int],
+    source: int,
+    max_cost: int
+) -> Dict[int, int]:
+    """
+    ÉTAPE: Tous les nœuds atteignables depuis la source avec un coût <= max_cost
+
+    LOGIQUE:
+    - Dijkstra classique, arrêté dès que le prochain nœud dépasse le budget
+    - Le travail est proportionnel à la zone atteignable, pas au graphe
+
+    RETURN: {nœud: coût}
+    """
+    offsets, node_targets = graph.offsets, graph.targets
+    dist: Dict[int, int] = {source: 0}
+    settled: Dict[int, int] = {}
+    heap = [(0, source)]
+    while heap:
+        du, u = heapq.heappop(heap)
+        if du > max_cost:
+            break
+        if u in settled:
+            continue
+        settled[u] = du
+        for e in range(offsets[u], offsets[u + 1]):
+            w = weights[e]
+            if w == UNREACHABLE:
+                continue
+            v = node_targets[e]
+            dv = du + w
+            if dv <= max_cost and dv < dist.get(v, INF):
+                dist[v] = dv
+                heapq.heappush(heap, (dv, v))
+    return settled
+
+
+class ShortestPathTree:
+    """
+    Dijkstra incrémental enraciné sur un nœud (avant: depuis la racine,
+    arrière: vers la racine)
+    """
+
+    def __init__(self, graph: StreetGraph, weights: Sequence[int], root: int, reverse: bool = False):
+        """
+        ÉTAPE: Initialiser la recherche (rien n'est exploré avant la première cible)
+
+        LOGIQUE:
+        - parent[v] = (nœud voisin côté racine, arête orientée entre les deux)
+        """
+        self.graph = graph
+        self.weights = weights
+        self.root = root
+        self.reverse = reverse
+        self.dist: Dict[int, int] = {root: 0}
+        self.parent: Dict[int, Tuple[int, int]] = {}
+        self.settled: Set[int] = set()
+        self._heap = [(0, root)]
+
+    def cost(self, node: int) -> Optional[int]:
+        """
+        ÉTAPE: Coût racine <-> nœud
+
+        LOGIQUE:
+        - Déjà fixé: lecture directe
+        - Sinon reprendre le Dijkstra jusqu'à fixer le nœud (ou épuiser le graphe)
+
+        RETURN: coût ou None si inaccessible
+        """
+        graph, weights, heap = self.graph, self.weights, self._heap
+        if self.reverse:
+            offsets, neighbours, edge_ids = graph.rev_offsets, graph.rev_sources, graph.rev_edges
+        else:
+            offsets, neighbours, edge_ids = graph.offsets, graph.targets, None
+        while node not in self.settled and heap:
+            du, u = heapq.heappop(heap)
+            if u in self.settled:
+                continue
+            self.settled.add(u)
+            for i in range(offsets[u], offsets[u + 1]):
+                e = edge_ids[i] if edge_ids is not None else i
+                w = weights[e]
+                if w == UNREACHABLE:
+                    continue
+                v = neighbours[i]
+                dv = du + w
+                if dv < self.dist.get(v, INF):
+                    self.dist[v] = dv
+                    self.parent[v] = (u, e)
+                    heapq.heappush(heap, (dv, v))
+        return self.dist[node] if node in self.settled else None
+
+    def path(self, node: int) -> List[int]:
+        """Arêtes du chemin dans le sens de parcours (racine -> nœud, ou nœud -> racine en arrière)"""
+        edges: List[int] = []
+        while node != self.root:
+            node, e = self.parent[node]
+            edges.append(e)
+        if not self.reverse:
+            edges.reverse()
+        return edges
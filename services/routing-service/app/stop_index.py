@@ -0,0 +1,203 @@
+"""
+Index des arrêts pour la marche « en avance » le long d'une ligne (Type A)
+
+LOGIQUE:
+- Question du planner pour chaque attente: « au lieu d'attendre à l'arrêt
+  A, puis-je marcher jusqu'à un arrêt suivant de la ligne et y prendre le
+  même véhicule ? » -> une seule recherche dans l'index, aucun itinéraire
+- Construit une fois au démarrage: pour chaque arrêt, marche (durée,
+  distance) vers les max_stops arrêts suivants de chaque pattern qui le
+  dessert ; un Dijkstra un-vers-plusieurs par arrêt, borné à
+  max_walk_minutes ; rangé en CSR
+- Identifiants GTFS -> index (arrêts, lignes, trajets) résolus une fois
+- Avec un trajet: horaire de passage du véhicule à chaque arrêt suivant et
+  segment TRANSIT restant jusqu'à l'arrêt de descente, prêts à remplacer
+  l'attente dans l'itinéraire de référence
+- Géométrie de la marche seulement si demandée (moteur de rues, cache walk)
+"""
+
+import bisect
+import logging
+import time
+from array import array
+from typing import Dict, Optional, Set
+
+from .search import one_to_many
+from .transit_engine import TransitEngine, format_clock
+
+logger = logging.getLogger(__name__)
+
+
+class StopIndex:
+    """
+    Marche pré-calculée entre chaque arrêt et les arrêts suivants de ses lignes
+    """
+
+    def __init__(self, transit: TransitEngine, max_stops: int = 5, max_walk_minutes: float = 20):
+        """
+        ÉTAPE: Construire l'index
+
+        LOGIQUE:
+        - max_stops: arrêts suivants retenus par pattern
+        - max_walk_minutes: au-delà, l'arrêt est listé sans marche (null)
+        - Arrêt hors du graphe de rues: aucun arrêt suivant à pied
+        """
+        started = time.perf_counter()
+        self.transit = transit
+        self.max_stops = max_stops
+        self.max_walk_minutes = max_walk_minutes
+        self.lookups = 0
+        timetable = transit.timetable
+        graph = transit.streets.graph
+        speed = transit.speed
+        self.stop_by_id: Dict[str, int] = {stop_id: i for i, stop_id in enumerate(timetable.stop_ids)}
+        self.route_by_id: Dict[str, int] = {route_id: i for i, route_id in enumerate(timetable.route_ids)}
+        self.trip_by_id: Dict[str, int] = {trip_id: i for i, trip_id in enumerate(timetable.trip_ids)}
+
+        # Arrêts suivants de s = ahead_stops[ahead_offsets[s]:ahead_offsets[s + 1]] (triés)
+        self.ahead_offsets = array("I", [0])
+        self.ahead_stops = array("I")
+        self.ahead_seconds = array("I")
+        self.ahead_meters = array("f")
+        for stop in range(timetable.stop_count):
+            downstream: Set[int] = set()
+            for pattern, position in timetable.patterns_at(stop):
+                downstream.update(timetable.stops_of(pattern)[position + 1:position + 1 + max_stops])
+            downstream.discard(stop)
+            source = transit.stop_nodes[stop]
+            if source >= 0 and downstream:
+                reached = one_to_many(
+                    graph, graph.weights["walk"], source,
+                    {transit.stop_nodes[other] for other in downstream if transit.stop_nodes[other] >= 0},
+                    int(max_walk_minutes * 600),
+                )
+                for other in sorted(downstream):
+                    cell = reached.get(transit.stop_nodes[other])
+                    if cell is None:
+                        continue
+                    access = transit.stop_access[stop] + transit.stop_access[other]
+                    seconds = round(cell[0] / 10 + access / speed)
+                    if seconds <= max_walk_minutes * 60:
+                        self.ahead_stops.append(other)
+                        self.ahead_seconds.append(seconds)
+                        self.ahead_meters.append(cell[1] + access)
+            self.ahead_offsets.append(len(self.ahead_stops))
+        logger.info(
+            f"Stop index: {len(self.ahead_stops)} walk-ahead pairs for {timetable.stop_count} stops "
+            f"in {(time.perf_counter() - started) * 1000:.0f}ms"
+        )
+
+    def _walk(self, stop: int, other: int) -> Optional[int]:
+        """Position de (stop -> other) dans le CSR (None si pas de marche retenue)"""
+        start, end = self.ahead_offsets[stop], self.ahead_offsets[stop + 1]
+        i = bisect.bisect_left(self.ahead_stops, other, start, end)
+        return i if i < end and self.ahead_stops[i] == other else None
+
+    def walk_ahead(
+        self,
+        stop_id: str,
+        route_id: str,
+        trip_id: Optional[str] = None,
+        to_stop_id: Optional[str] = None,
+        limit: Optional[int] = None,
+        simplify_m: float = 0.0,
+        include_geometry: bool = True
+    ) -> Optional[dict]:
+        """
+        ÉTAPE: Arrêts suivants d'une ligne depuis un arrêt, avec la marche
+
+        LOGIQUE:
+        1. Patterns de la ligne qui desservent l'arrêt (le pattern du trajet
+           si trip_id est fourni: une seule direction)
+        2. Arrêts suivants (au plus `limit`, jamais au-delà de to_stop_id)
+        3. Pour chacun: segment WALK depuis l'arrêt (index) ; avec un trajet:
+           arrival_time, ride_minutes (départ de l'arrêt -> passage) et, si
+           to_stop_id est fourni, segment TRANSIT restant (ride)
+
+        RETURN: None si l'arrêt, la ligne, le trajet ou l'arrêt de descente
+        sont inconnus ;
+        sinon {stop, route_id, route_name, lines: [{headsign, trip_id, stops}]}
+        (lines vide si la ligne ne dessert pas l'arrêt)
+        """
+        self.lookups += 1
+        transit, timetable = self.transit, self.transit.timetable
+        stop = self.stop_by_id.get(stop_id)
+        route = self.route_by_id.get(route_id)
+        trip = self.trip_by_id.get(trip_id) if trip_id else None
+        to_stop = self.stop_by_id.get(to_stop_id) if to_stop_id else None
+        if stop is None or route is None or (trip_id and trip is None) or (to_stop_id and to_stop is None):
+            return None
+        limit = min(limit or self.max_stops, self.max_stops)
+
+        # Positions de l'arrêt dans les patterns de la ligne (un pattern en
+        # boucle dessert l'arrêt plusieurs fois: une entrée par passage)
+        trip_pattern = bisect.bisect_right(timetable.pattern_trip_offsets, trip) - 1 if trip is not None else None
+        lines = []
+        for pattern, position in timetable.patterns_at(stop):
+            if timetable.pattern_route[pattern] != route or trip_pattern not in (None, pattern):
+                continue
+            stops = timetable.stops_of(pattern)
+            end = min(len(stops), position + 1 + limit)
+            alight = stops.index(to_stop, position + 1) if to_stop is not None and to_stop in stops[position + 1:] else None
+            if alight is not None:
+                end = min(end, alight)
+            entries = []
+            for i in range(position + 1, end):
+                entries.append(self._entry(pattern, trip, stop, position, i, alight, simplify_m, include_geometry))
+            line = {"headsign": timetable.pattern_headsigns[pattern], "stops": entries}
+            if trip is not None:
+                line["trip_id"] = trip_id
+                line["departure_time"] = format_clock(timetable.departures[timetable.trip_time_offsets[trip] + position])
+            lines.append(line)
+        return {
+            "stop": transit.stop_location(stop),
+            "route_id": route_id,
+            "route_name": timetable.route_names[route],
+            "lines": lines,
+        }
+
+    def _entry(
+        self,
+        pattern: int,
+        trip: Optional[int],
+        stop: int,
+        position: int,
+        i: int,
+        alight: Optional[int],
+        simplify_m: float,
+        include_geometry: bool
+    ) -> dict:
+        """Arrêt suivant n°i du pattern: position, marche depuis l'arrêt, passage du trajet"""
+        transit, timetable = self.transit, self.transit.timetable
+        other = timetable.stops_of(pattern)[i]
+        entry = {**transit.stop_location(other), "stops_ahead": i - position, "walk": None}
+        walk = self._walk(stop, other)
+        if walk is not None:
+            segment = {
+                "mode": "WALK",
+                "from": transit.stop_location(stop),
+                "to": transit.stop_location(other),
+                "duration_minutes": round(self.ahead_seconds[walk] / 60),
+                "distance_km": round(self.ahead_meters[walk] / 1000, 3),
+            }
+            if include_geometry:
+                (from_lat, from_lon), (to_lat, to_lon) = transit.stop_point(stop), transit.stop_point(other)
+                route = transit.streets.route("walk", from_lat, from_lon, to_lat, to_lon, simplify_m, True)
+                segment["geometry"] = route["geometry"]
+            entry["walk"] = segment
+        if trip is not None:
+            offset = timetable.trip_time_offsets[trip]
+            entry["arrival_time"] = format_clock(timetable.arrivals[offset + i])
+            entry["ride_minutes"] = round((timetable.arrivals[offset + i] - timetable.departures[offset + position]) / 60)
+            if alight is not None:
+                entry["ride"] = transit.transit_segment(pattern, trip, i, alight, include_geometry)
+        return entry
+
+    def get_stats(self) -> dict:
+        """Taille de l'index et nombre de recherches (pour /metrics)"""
+        return {
+            "walk_ahead_pairs": len(self.ahead_stops),
+            "max_stops": self.max_stops,
+            "max_walk_minutes": self.max_walk_minutes,
+            "lookups": self.lookups,
+        }
@@ -0,0 +1,511 @@
+"""
+Moteur transit embarqué: horaires GTFS (Timetable) + RAPTOR + graphe de rues
+
+LOGIQUE:
+- Plus d'API de transit externe: les itinéraires transit sont calculés
+  localement sur les horaires Naolib chargés au démarrage
+- Une fois au démarrage: chaque arrêt est rattaché au graphe de rues et
+  ses correspondances à pied (arrêts à moins de max_transfer_minutes) sont
+  calculées par Dijkstra borné, rangées en CSR
+- Par requête: arrêts accessibles à pied depuis l'origine et vers la
+  destination (Dijkstra borné, profil walk supposé symétrique), puis RAPTOR
+  sur les services actifs du jour
+- Réponse au format de /route: segments WALK / WAIT / TRANSIT ; les
+  segments TRANSIT listent les arrêts desservis (intermediate_stops) pour
+  les candidats Type A ; tronçons à pied tracés par le moteur de rues
+- Marche seule si elle n'est pas plus lente (ou si aucun trajet transit)
+- Cache (RouteCache): structure du trajet par (nœuds rattachés, créneau de
+  départ) ; l'heure de recherche est arrondie au créneau suivant pour que
+  toutes les requêtes d'un créneau partagent le même résultat
+- Journée de service de la date de départ seulement (les trajets > 24:00
+  de la veille ne sont pas pris en compte)
+"""
+
+import logging
+import math
+import time
+from array import array
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from . import polyline
+from .cache import RouteCache, departure_bucket, route_key
+from .graph import PROFILE_SPEEDS_MPS, haversine_m
+from .gtfs import Timetable
+from .raptor import Raptor
+from .routing_engine import NoRoute, RoutingEngine
+from .search import bounded_dijkstra
+
+logger = logging.getLogger(__name__)
+
+# route_type GTFS -> mode affiché
+TRANSIT_MODES = {0: "TRAM", 1: "SUBWAY", 2: "RAIL", 3: "BUS", 4: "FERRY", 7: "FUNICULAR"}
+
+
+def format_clock(seconds: int) -> str:
+    """Secondes depuis minuit -> HH:MM (heures >= 24 conservées, comme GTFS)"""
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}"
+
+
+class TransitEngine:
+    """
+    Itinéraires transit sur un Timetable, accès à pied par un RoutingEngine
+    """
+
+    def __init__(
+        self,
+        timetable: Timetable,
+        streets: RoutingEngine,
+        cache: Optional[RouteCache] = None,
+        max_access_minutes: float = 10,
+        max_transfer_minutes: float = 5,
+        max_rounds: int = 5,
+        transfer_slack_s: int = 60,
+        bucket_minutes: int = 1,
+        cache_ttl_seconds: int = 300
+    ):
+        """
+        ÉTAPE: Initialiser et pré-calculer les correspondances
+
+        LOGIQUE:
+        - max_access_minutes: marche max jusqu'au premier arrêt / depuis le dernier
+        - max_transfer_minutes: marche max d'une correspondance
+        - max_rounds: nombre max de véhicules (max_rounds - 1 correspondances)
+        - transfer_slack_s: marge pour monter après un autre véhicule
+        - bucket_minutes / cache_ttl_seconds: créneau et TTL du cache
+        """
+        started = time.perf_counter()
+        self.timetable = timetable
+        self.streets = streets
+        self.cache = cache
+        self.max_access_minutes = max_access_minutes
+        self.max_transfer_minutes = max_transfer_minutes
+        self.max_rounds = max_rounds
+        self.transfer_slack_s = transfer_slack_s
+        self.bucket_minutes = bucket_minutes
+        self.cache_ttl_seconds = cache_ttl_seconds
+        try:
+            self.timezone: Optional[ZoneInfo] = ZoneInfo(timetable.timezone)
+        except ZoneInfoNotFoundError:
+            logger.warning(f"Unknown timezone {timetable.timezone}: departure times are taken as local")
+            self.timezone = None
+        self.speed = PROFILE_SPEEDS_MPS["walk"]
+        self.queries = 0
+        self.range_queries = 0
+        self.walk_only = 0
+        self.no_route = 0
+        self.rounds = 0
+        self.scanned_patterns = 0
+        self.total_ms = 0.0
+
+        # ÉTAPE: Rattacher les arrêts au graphe de rues (-1: hors zone)
+        graph = streets.graph
+        self.stop_nodes = array("i")
+        self.stop_access = array("f")
+        self.node_stops: Dict[int, List[int]] = {}
+        for stop in range(timetable.stop_count):
+            snapped = graph.nearest(timetable.stop_lat[stop], timetable.stop_lon[stop], streets.snap_max_distance_m)
+            node, access = snapped if snapped is not None else (-1, 0.0)
+            self.stop_nodes.append(node)
+            self.stop_access.append(access)
+            if node >= 0:
+                self.node_stops.setdefault(node, []).append(stop)
+
+        # ÉTAPE: Correspondances à pied en CSR (un Dijkstra borné par nœud d'arrêt)
+        self.transfer_offsets = array("I", [0])
+        self.transfer_stops = array("I")
+        self.transfer_seconds = array("I")
+        reached_by_node: Dict[int, Dict[int, int]] = {}
+        for stop in range(timetable.stop_count):
+            node = self.stop_nodes[stop]
+            if node >= 0:
+                if node not in reached_by_node:
+                    reached_by_node[node] = self._walkable_stops(node, max_transfer_minutes * 60)
+                for other, seconds in reached_by_node[node].items():
+                    seconds += math.ceil(self.stop_access[stop] / self.speed)
+                    if other != stop and seconds <= max_transfer_minutes * 60:
+                        self.transfer_stops.append(other)
+                        self.transfer_seconds.append(seconds)
+            self.transfer_offsets.append(len(self.transfer_stops))
+        logger.info(
+            f"Transit timetable {timetable.name}: {timetable.stop_count} stops, {timetable.pattern_count} patterns, "
+            f"{timetable.trip_count} trips, {len(self.transfer_stops)} walking transfers "
+            f"in {(time.perf_counter() - started) * 1000:.0f}ms"
+        )
+
+    def _walkable_stops(self, node: int, max_seconds: float) -> Dict[int, int]:
+        """
+        Arrêts atteignables à pied depuis un nœud en max_seconds
+        (Dijkstra borné + tronçon arrêt -> nœud) -> {arrêt: secondes}
+        """
+        reached = bounded_dijkstra(self.streets.graph, self.streets.graph.weights["walk"], node, int(max_seconds * 10))
+        stops: Dict[int, int] = {}
+        for reached_node, cost in reached.items():
+            for stop in self.node_stops.get(reached_node, ()):
+                seconds = math.ceil(cost / 10 + self.stop_access[stop] / self.speed)
+                if seconds <= max_seconds:
+                    stops[stop] = seconds
+        return stops
+
+    def local_time(self, value: str = "now") -> datetime:
+        """
+        ÉTAPE: Heure de départ dans le fuseau du réseau
+
+        LOGIQUE:
+        - "now": heure courante du réseau
+        - ISO 8601 avec fuseau: convertie dans le fuseau du réseau
+        - ISO 8601 sans fuseau: déjà heure locale
+        - ValueError si le format est invalide
+        """
+        if not value or value == "now":
+            when = datetime.now(self.timezone)
+        else:
+            when = datetime.fromisoformat(value)
+            if when.tzinfo is not None and self.timezone is not None:
+                when = when.astimezone(self.timezone)
+        return when.replace(tzinfo=None)
+
+    def route(
+        self,
+        from_lat: float,
+        from_lon: float,
+        to_lat: float,
+        to_lon: float,
+        when: datetime,
+        simplify_m: float = 0.0,
+        include_geometry: bool = True
+    ) -> dict:
+        """
+        ÉTAPE: Itinéraire transit le plus tôt arrivé
+
+        LOGIQUE:
+        1. Rattacher origine et destination (NoRoute si hors zone)
+        2. Départ arrondi au créneau suivant ; structure du trajet en cache
+           par (nœuds, créneau), sinon RAPTOR
+        3. Construire la réponse (marche tracée sur le graphe de rues)
+
+        RETURN: dict au format de /route (mode transit) + departure_time,
+        arrival_time, transfers
+        """
+        started = time.perf_counter()
+        self.queries += 1
+        try:
+            origin, _ = self.streets.snap(from_lat, from_lon)
+            destination, _ = self.streets.snap(to_lat, to_lon)
+            departure = self._bucket_start(when)
+            key = route_key(
+                self.timetable.fingerprint, "transit", origin, destination,
+                departure_bucket(departure, self.bucket_minutes)
+            )
+            journey = self.cache.get("transit", key) if self.cache is not None else None
+            if journey is None:
+                journey = self._search(origin, destination, departure, from_lat, from_lon, to_lat, to_lon)
+                if self.cache is not None:
+                    self.cache.set(key, journey, ttl=self.cache_ttl_seconds)
+        except NoRoute:
+            self.no_route += 1
+            raise
+        finally:
+            self.total_ms += (time.perf_counter() - started) * 1000
+        return self._build_route(journey, (from_lat, from_lon), (to_lat, to_lon), simplify_m, include_geometry)
+
+    def journeys(
+        self,
+        from_lat: float,
+        from_lon: float,
+        to_lat: float,
+        to_lon: float,
+        when: datetime,
+        window_minutes: int,
+        simplify_m: float = 0.0,
+        include_geometry: bool = True
+    ) -> List[dict]:
+        """
+        ÉTAPE: Tous les trajets intéressants d'une plage de départ (rRAPTOR)
+
+        LOGIQUE:
+        1. Départs candidats = horaires de passage aux arrêts d'accès dans
+           la plage (moins la marche d'accès) ; traités du plus tard au plus tôt
+        2. Un seul Raptor dont les étiquettes sont conservées d'un départ à
+           l'autre: seules les améliorations sont recalculées
+        3. Chaque départ qui améliore l'arrivée donne un trajet (Pareto:
+           partir plus tôt n'a d'intérêt que pour arriver plus tôt)
+
+        RETURN: trajets triés par départ (format de route())
+        """
+        started = time.perf_counter()
+        self.range_queries += 1
+        timetable = self.timetable
+        try:
+            origin, _ = self.streets.snap(from_lat, from_lon)
+            destination, _ = self.streets.snap(to_lat, to_lon)
+            start = self._bucket_start(when)
+            day_start = datetime(start.year, start.month, start.day)
+            first = int((start - day_start).total_seconds())
+            last = first + window_minutes * 60
+            sources = self._access_stops(origin, from_lat, from_lon)
+            targets = self._access_stops(destination, to_lat, to_lon)
+            active = timetable.active_services(start.date())
+
+            departures = set()
+            for stop, access in sources.items():
+                for pattern, position in timetable.patterns_at(stop):
+                    for trip in range(timetable.pattern_trip_offsets[pattern], timetable.pattern_trip_offsets[pattern + 1]):
+                        leave = timetable.departures[timetable.trip_time_offsets[trip] + position] - access
+                        if first <= leave <= last and timetable.trip_services[trip] in active:
+                            departures.add(leave)
+
+            raptor = self._raptor(active)
+            found = []
+            for leave in sorted(departures, reverse=True):
+                result = raptor.run({stop: leave + access for stop, access in sources.items()}, targets)
+                if result is not None:
+                    found.append(self._journey(raptor, result, leave, sources))
+            self._count(raptor)
+        finally:
+            self.total_ms += (time.perf_counter() - started) * 1000
+        return [
+            self._build_route(journey, (from_lat, from_lon), (to_lat, to_lon), simplify_m, include_geometry, day_start)
+            for journey in reversed(found)
+        ]
+
+    def _bucket_start(self, when: datetime) -> datetime:
+        """Heure arrondie au début du créneau suivant (inchangée si déjà au début)"""
+        step = self.bucket_minutes * 60
+        seconds = when.hour * 3600 + when.minute * 60 + when.second + (1 if when.microsecond else 0)
+        rounded = -(-seconds // step) * step
+        return datetime(when.year, when.month, when.day) + timedelta(seconds=rounded)
+
+    def _access_stops(self, node: int, lat: float, lon: float) -> Dict[int, int]:
+        """Arrêts à moins de max_access_minutes à pied d'un point -> {arrêt: secondes}"""
+        _, access = self.streets.snap(lat, lon)
+        budget = self.max_access_minutes * 60 - access / self.speed
+        if budget < 0:
+            return {}
+        offset = math.ceil(access / self.speed)
+        return {stop: seconds + offset for stop, seconds in self._walkable_stops(node, budget).items()}
+
+    def _raptor(self, active) -> Raptor:
+        return Raptor(
+            self.timetable, active, self.transfer_offsets, self.transfer_stops, self.transfer_seconds,
+            self.max_rounds, self.transfer_slack_s
+        )
+
+    def _count(self, raptor: Raptor):
+        self.rounds += len(raptor.arrivals) - 1
+        self.scanned_patterns += raptor.scanned_patterns
+
+    def _search(
+        self,
+        origin: int,
+        destination: int,
+        departure: datetime,
+        from_lat: float,
+        from_lon: float,
+        to_lat: float,
+        to_lon: float
+    ) -> dict:
+        """
+        ÉTAPE: Recherche RAPTOR pour un départ
+
+        LOGIQUE:
+        - Services actifs du jour de départ
+        - Marche seule si aucun trajet transit ou si elle n'est pas plus
+          lente (durée sur le graphe de rues, calculée seulement quand la
+          distance à vol d'oiseau ne l'exclut pas)
+
+        RETURN: structure JSON du trajet (mise en cache):
+        {"date", "departure", "arrival", "legs": [...]} ou {"walk_only": true}
+        """
+        day_start = datetime(departure.year, departure.month, departure.day)
+        leave = int((departure - day_start).total_seconds())
+        sources = self._access_stops(origin, from_lat, from_lon)
+        targets = self._access_stops(destination, to_lat, to_lon)
+        raptor = self._raptor(self.timetable.active_services(departure.date()))
+        result = raptor.run({stop: leave + seconds for stop, seconds in sources.items()}, targets)
+        self._count(raptor)
+        if result is None:
+            return {"walk_only": True}
+        if haversine_m(from_lat, from_lon, to_lat, to_lon) / self.speed <= result[0] - leave:
+            walk = self.streets.route("walk", from_lat, from_lon, to_lat, to_lon, include_geometry=False)
+            if walk["duration_minutes"] * 60 <= result[0] - leave:
+                return {"walk_only": True}
+        return {"date": f"{departure:%Y-%m-%d}", **self._journey(raptor, result, leave, sources)}
+
+    def _journey(
+        self,
+        raptor: Raptor,
+        result: Tuple[int, int, int],
+        leave: int,
+        sources: Dict[int, int]
+    ) -> dict:
+        """
+        Trajet reconstruit -> structure JSON:
+        legs = [["trip", pattern, trajet, montée, descente], ["walk", de, vers, secondes]]
+        """
+        arrival, k, stop = result
+        access_stop, legs = raptor.journey(k, stop)
+        return {
+            "departure": leave,
+            "arrival": arrival,
+            "access_stop": access_stop,
+            "access_seconds": sources[access_stop],
+            "egress_stop": stop,
+            "legs": [list(leg) for leg in legs],
+        }
+
+    def _build_route(
+        self,
+        journey: dict,
+        start: Tuple[float, float],
+        end: Tuple[float, float],
+        simplify_m: float,
+        include_geometry: bool,
+        day_start: Optional[datetime] = None
+    ) -> dict:
+        """
+        ÉTAPE: Réponse normalisée d'un trajet
+
+        LOGIQUE:
+        - WALK: origine -> premier arrêt, correspondances, dernier arrêt ->
+          destination (moteur de rues, cache walk) ; omis si de longueur nulle
+        - WAIT: entre l'arrivée à un arrêt et le départ du véhicule (from = arrêt)
+        - TRANSIT: ligne, trajet, horaires, arrêts desservis ; géométrie =
+          suite des arrêts ; distance à vol d'oiseau entre arrêts
+
+        OUTPUT:
+        - mode, distance_km, duration_minutes, segments[], geometry
+        - departure_time, arrival_time (HH:MM), transfers
+        """
+        if journey.get("walk_only"):
+            self.walk_only += 1
+            route = self.streets.route("walk", start[0], start[1], end[0], end[1], simplify_m, include_geometry)
+            route["transfers"] = 0
+            return route
+
+        timetable = self.timetable
+        if day_start is None:
+            day_start = datetime.fromisoformat(journey["date"])
+        segments: List[dict] = []
+        points: List[Tuple[float, float]] = []
+        total_m = 0.0
+
+        def add_walk(origin: Tuple[float, float], target: Tuple[float, float]):
+            nonlocal total_m
+            walk = self.streets.route("walk", origin[0], origin[1], target[0], target[1], simplify_m, include_geometry)
+            if walk["distance_km"] == 0:
+                return
+            for segment in walk["segments"]:
+                segments.append(segment)
+                total_m += segment["distance_km"] * 1000
+            if include_geometry:
+                points.extend(polyline.decode(walk["geometry"]))
+
+        clock = journey["departure"]
+        stop = journey["access_stop"]
+        add_walk(start, self.stop_point(stop))
+        clock += journey["access_seconds"]
+        transfers = -1
+        for leg in journey["legs"]:
+            if leg[0] == "walk":
+                _, source, target, seconds = leg
+                add_walk(self.stop_point(source), self.stop_point(target))
+                clock += seconds
+                continue
+            _, pattern, trip, board, alight = leg
+            transfers += 1
+            stops = timetable.stops_of(pattern)
+            offset = timetable.trip_time_offsets[trip]
+            leave = timetable.departures[offset + board]
+            if leave > clock:
+                segments.append({
+                    "mode": "WAIT",
+                    "from": self.stop_location(stops[board]),
+                    "to": self.stop_location(stops[board]),
+                    "duration_minutes": round((leave - clock) / 60),
+                    "distance_km": 0.0,
+                    "departure_time": format_clock(leave),
+                })
+            clock = timetable.arrivals[offset + alight]
+            segment = self.transit_segment(pattern, trip, board, alight, include_geometry)
+            total_m += segment["distance_km"] * 1000
+            if include_geometry:
+                points.extend(polyline.decode(segment["geometry"]))
+            segments.append(segment)
+        add_walk(self.stop_point(journey["egress_stop"]), end)
+
+        route = {
+            "mode": "transit",
+            "distance_km": round(total_m / 1000, 3),
+            "duration_minutes": round((journey["arrival"] - journey["departure"]) / 60),
+            "departure_time": (day_start + timedelta(seconds=journey["departure"])).isoformat(timespec="minutes"),
+            "arrival_time": (day_start + timedelta(seconds=journey["arrival"])).isoformat(timespec="minutes"),
+            "transfers": max(transfers, 0),
+            "segments": segments,
+        }
+        if include_geometry:
+            route["geometry"] = polyline.encode(polyline.simplify(points, simplify_m))
+        return route
+
+    def transit_segment(self, pattern: int, trip: int, board: int, alight: int, include_geometry: bool = True) -> dict:
+        """
+        ÉTAPE: Segment TRANSIT d'un trajet entre deux positions de son pattern
+
+        LOGIQUE:
+        - Ligne, destination affichée, trajet, horaires de montée / descente
+        - intermediate_stops: arrêts desservis entre les deux (heure de passage)
+        - Distance à vol d'oiseau entre arrêts ; géométrie = suite des arrêts
+        """
+        timetable = self.timetable
+        stops = timetable.stops_of(pattern)
+        offset = timetable.trip_time_offsets[trip]
+        leave, arrive = timetable.departures[offset + board], timetable.arrivals[offset + alight]
+        ride = [self.stop_point(stops[i]) for i in range(board, alight + 1)]
+        distance_m = sum(haversine_m(*a, *b) for a, b in zip(ride, ride[1:]))
+        route = timetable.pattern_route[pattern]
+        segment = {
+            "mode": "TRANSIT",
+            "transit_mode": TRANSIT_MODES.get(timetable.route_types[route], "BUS"),
+            "route_id": timetable.route_ids[route],
+            "route_name": timetable.route_names[route],
+            "headsign": timetable.pattern_headsigns[pattern],
+            "trip_id": timetable.trip_ids[trip],
+            "from": self.stop_location(stops[board]),
+            "to": self.stop_location(stops[alight]),
+            "departure_time": format_clock(leave),
+            "arrival_time": format_clock(arrive),
+            "duration_minutes": round((arrive - leave) / 60),
+            "distance_km": round(distance_m / 1000, 3),
+            "intermediate_stops": [
+                {**self.stop_location(stops[i]), "arrival_time": format_clock(timetable.arrivals[offset + i])}
+                for i in range(board + 1, alight)
+            ],
+        }
+        if include_geometry:
+            segment["geometry"] = polyline.encode(ride)
+        return segment
+
+    def stop_point(self, stop: int) -> Tuple[float, float]:
+        """(lat, lon) d'un arrêt, arrondis à 5 décimales (~1 m, précision des float32 stockés)"""
+        return round(self.timetable.stop_lat[stop], 5), round(self.timetable.stop_lon[stop], 5)
+
+    def stop_location(self, stop: int) -> dict:
+        """Position d'un arrêt au format des segments (lat, lon, stop_id, name)"""
+        lat, lon = self.stop_point(stop)
+        return {"lat": lat, "lon": lon, "stop_id": self.timetable.stop_ids[stop], "name": self.timetable.stop_names[stop]}
+
+    def get_stats(self) -> dict:
+        """Compteurs du moteur transit (pour /metrics)"""
+        searches = self.queries + self.range_queries
+        return {
+            "timetable": {**self.timetable.get_stats(), "fingerprint": self.timetable.fingerprint},
+            "walking_transfers": len(self.transfer_stops),
+            "queries": self.queries,
+            "range_queries": self.range_queries,
+            "walk_only": self.walk_only,
+            "no_route": self.no_route,
+            "avg_rounds": round(self.rounds / searches, 2) if searches else 0.0,
+            "avg_scanned_patterns": round(self.scanned_patterns / searches, 1) if searches else 0.0,
+            "avg_query_ms": round(self.total_ms / searches, 2) if searches else 0.0,
+        }
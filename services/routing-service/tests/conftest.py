@@ -0,0 +1,18 @@
+"""
+Configuration des tests du Routing Service
+
+LOGIQUE:
+- Le dossier du service sur le chemin d'import (package app)
+- Fixtures embarquées (app/data) à la place du graphe de production, avant
+  tout import de app.main
+"""
+
+import os
+import sys
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(SERVICE_DIR, "app", "data")
+
+sys.path.insert(0, SERVICE_DIR)
+os.environ["ROUTING_GRAPH_FILE"] = os.path.join(DATA_DIR, "fixture_graph.json")
+os.environ["ROUTING_GTFS_PATH"] = os.path.join(DATA_DIR, "gtfs_fixture")
@@ -0,0 +1,87 @@
+"""
+Tests du cache LRU + TTL (cache_core)
+
+LOGIQUE:
+- Éviction LRU par nombre d'entrées et par taille (octets JSON)
+- Expiration par le tas: get, set et expire() retirent les entrées périmées
+"""
+
+import pytest
+
+from app import cache_core
+from app.cache_core import LRUCache, approximate_size
+
+
+class Clock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_core.time, "time", clock)
+    return clock
+
+
+def test_evicts_least_recently_used_by_entries(clock):
+    cache = LRUCache(max_entries=3, max_bytes=10 ** 6, default_ttl=60)
+    for key in ("a", "b", "c"):
+        cache.set(key, key)
+    assert cache.get("a") == "a"
+    cache.set("d", "d")
+    assert cache.get("b") is None
+    assert [key for key, _ in cache.items()] == ["c", "a", "d"]
+    assert cache.evictions == 1
+
+
+def test_evicts_by_bytes(clock):
+    value = "x" * 100
+    size = approximate_size("k0", value)
+    cache = LRUCache(max_entries=100, max_bytes=3 * size, default_ttl=60)
+    for i in range(5):
+        cache.set(f"k{i}", value)
+    assert [key for key, _ in cache.items()] == ["k2", "k3", "k4"]
+    assert cache.bytes == 3 * size
+    assert cache.evictions == 2
+
+    cache.set("k5", "x" * 250)
+    assert cache.bytes <= cache.max_bytes
+    assert "k5" in dict(cache.items())
+
+
+def test_replacing_an_entry_keeps_byte_count(clock):
+    cache = LRUCache(max_entries=10, max_bytes=10 ** 6, default_ttl=60)
+    cache.set("k", "short")
+    cache.set("k", "a much longer value")
+    assert len(cache) == 1
+    assert cache.bytes == approximate_size("k", "a much longer value")
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = LRUCache(max_entries=10, max_bytes=10 ** 6, default_ttl=60)
+    cache.set("short", 1, ttl=10)
+    cache.set("long", 2)
+    clock.now += 11
+    assert cache.get("short") is None
+    assert cache.get("long") == 2
+    assert cache.expirations == 1
+
+    cache.set("other", 3, ttl=10)
+    clock.now += 50
+    assert cache.expire() == 2
+    assert len(cache) == 0
+    assert cache.bytes == 0
+
+
+def test_rewritten_key_is_not_expired_by_its_old_deadline(clock):
+    cache = LRUCache(max_entries=10, max_bytes=10 ** 6, default_ttl=60)
+    cache.set("k", 1, ttl=10)
+    cache.set("k", 2, ttl=100)
+    clock.now += 20
+    assert cache.expire() == 0
+    assert cache.get("k") == 2
+    assert cache.peek("k") == 2
@@ -0,0 +1,71 @@
+"""
+Tests du journal append-only (log_store)
+
+LOGIQUE:
+- Rejeu: la dernière écriture gagne, suppressions et entrées expirées
+  retirées, ligne tronquée ignorée
+- Compaction: le journal réécrit ne garde que les entrées vivantes et le
+  rejeu redonne le même état, écritures postérieures comprises
+"""
+
+import time
+
+from app import log_store
+from app.log_store import LogStore
+
+
+def _lines(path) -> int:
+    with open(path, encoding="utf-8") as f:
+        return sum(1 for _ in f)
+
+
+def test_replay_applies_writes_and_deletes_in_order(tmp_path):
+    path = str(tmp_path / "cache.log")
+    later = time.time() + 3600
+    store = LogStore(path)
+    store.append_set("a", {"v": 1}, later)
+    store.append_set("b", [1, 2], later)
+    store.append_set("a", {"v": 2}, later)
+    store.append_delete("b")
+    store.append_set("old", 1, time.time() - 1)
+    store.close()
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"k": "trunc')
+
+    replayed = LogStore(path)
+    assert replayed.replay() == {"a": ({"v": 2}, later)}
+    replayed.close()
+
+
+def test_replay_after_compaction(tmp_path, monkeypatch):
+    monkeypatch.setattr(log_store, "COMPACT_MIN_LINES", 0)
+    path = str(tmp_path / "cache.log")
+    later = time.time() + 3600
+    live = {}
+    store = LogStore(path)
+    for i in range(20):
+        key = f"k{i % 4}"
+        live[key] = (i, later)
+        store.append_set(key, i, later)
+    store.append_delete("k3")
+    del live["k3"]
+    store.maybe_compact(len(live), lambda: dict(live))
+    store.append_set("after", "x", later)
+    live["after"] = ("x", later)
+    store.close()
+
+    assert _lines(path) == len(live)
+    replayed = LogStore(path)
+    assert replayed.replay() == live
+    replayed.close()
+
+
+def test_no_compaction_below_threshold(tmp_path):
+    path = str(tmp_path / "cache.log")
+    later = time.time() + 3600
+    store = LogStore(path)
+    for i in range(10):
+        store.append_set("k", i, later)
+    store.maybe_compact(1, lambda: {"k": (9, later)})
+    store.close()
+    assert _lines(path) == 10
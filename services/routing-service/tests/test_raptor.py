@@ -0,0 +1,142 @@
+"""
+Tests du moteur transit (RAPTOR) sur la fixture GTFS
+
+LOGIQUE:
+- Arrivée au plus tôt comparée à un balayage exhaustif des connexions
+  (connection scan, correspondances illimitées)
+- Exception calendar_dates du 11/11/2026: service du week-end un mercredi
+- Arrêt parent (location_type=1) écarté au chargement
+- /transit/journeys: seulement des trajets Pareto-optimaux
+"""
+
+import random
+from datetime import date, datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from app.raptor import INF, Raptor
+
+ILE = {"from_lat": 47.2070, "from_lon": -1.5600}
+JAR = {"to_lat": 47.2166, "to_lon": -1.5536}
+GAR_TO_GSN = {"from_lat": 47.2130, "from_lon": -1.5680, "to_lat": 47.2130, "to_lon": -1.5520}
+
+
+@pytest.fixture(scope="module")
+def transit():
+    return main.transit
+
+
+@pytest.fixture(scope="module")
+def client():
+    return TestClient(main.app)
+
+
+def _scan(transit, active, sources, targets) -> int:
+    """Arrivée au plus tôt par balayage de toutes les connexions du jour"""
+    timetable = transit.timetable
+    connections = []
+    for pattern in range(timetable.pattern_count):
+        stops = timetable.stops_of(pattern)
+        for trip in range(timetable.pattern_trip_offsets[pattern], timetable.pattern_trip_offsets[pattern + 1]):
+            if timetable.trip_services[trip] not in active:
+                continue
+            offset = timetable.trip_time_offsets[trip]
+            for i in range(len(stops) - 1):
+                connections.append((
+                    timetable.departures[offset + i], timetable.arrivals[offset + i + 1],
+                    stops[i], stops[i + 1], trip,
+                ))
+    connections.sort()
+    arrivals = [INF] * timetable.stop_count
+
+    def reach(stop, seconds):
+        if seconds < arrivals[stop]:
+            arrivals[stop] = seconds
+            for i in range(transit.transfer_offsets[stop], transit.transfer_offsets[stop + 1]):
+                other = transit.transfer_stops[i]
+                arrivals[other] = min(arrivals[other], seconds + transit.transfer_seconds[i])
+
+    for stop, seconds in sources.items():
+        arrivals[stop] = min(arrivals[stop], seconds)
+    boarded = set()
+    for departure, arrival, stop, next_stop, trip in connections:
+        if trip in boarded or arrivals[stop] <= departure:
+            boarded.add(trip)
+            reach(next_stop, arrival)
+    return min((arrivals[stop] + egress for stop, egress in targets.items() if arrivals[stop] < INF), default=INF)
+
+
+def test_earliest_arrival_matches_connection_scan(transit):
+    timetable = transit.timetable
+    rng = random.Random(1)
+    for _ in range(300):
+        active = timetable.active_services(date(2026, 10, rng.choice([17, 18, 19, 20])))
+        origin, destination = rng.sample(range(timetable.stop_count), 2)
+        leave = rng.randint(5 * 3600, 23 * 3600)
+        raptor = Raptor(
+            timetable, active, transit.transfer_offsets, transit.transfer_stops, transit.transfer_seconds,
+            max_rounds=8, transfer_slack_s=0,
+        )
+        result = raptor.run({origin: leave}, {destination: 0})
+        expected = _scan(transit, active, {origin: leave}, {destination: 0})
+        assert (result[0] if result else INF) == expected, (origin, destination, leave)
+        if result:
+            assert raptor.journey(result[1], result[2])[0] == origin
+
+
+def test_armistice_day_runs_the_weekend_service(transit, client):
+    timetable = transit.timetable
+    weekday, weekend = timetable.service_ids.index("SEM"), timetable.service_ids.index("WE")
+    assert timetable.active_services(date(2026, 11, 11)) == {weekend}
+    assert timetable.active_services(date(2026, 11, 12)) == {weekday}
+
+    def trips(day):
+        route = client.get("/route", params={
+            "mode": "transit", **GAR_TO_GSN, "time": f"{day}T08:55:00", "geometry": "false",
+        }).json()
+        return [s["trip_id"] for s in route["segments"] if s["mode"] == "TRANSIT"]
+
+    assert [trip.split("-")[1] for trip in trips("2026-11-11")] == ["WE"]
+    assert [trip.split("-")[1] for trip in trips("2026-11-12")] == ["SEM"]
+
+
+def test_parent_station_is_skipped(transit):
+    timetable = transit.timetable
+    assert "S_COM" not in timetable.stop_ids
+    assert "COM" in timetable.stop_ids
+    assert timetable.stop_count == 13
+
+
+def _clock(value: str) -> datetime:
+    return datetime.fromisoformat(value)
+
+
+def test_journeys_are_pareto_optimal(client):
+    start = datetime(2026, 10, 19, 8, 0)
+    window = 60
+    journeys = client.get("/transit/journeys", params={
+        **ILE, **JAR, "time": start.isoformat(), "window_minutes": window, "geometry": "false",
+    }).json()["journeys"]
+    assert journeys
+    departures = [_clock(j["departure_time"]) for j in journeys]
+    arrivals = [_clock(j["arrival_time"]) for j in journeys]
+    # Partir plus tard fait toujours arriver plus tard (sinon le trajet est dominé)
+    assert departures == sorted(set(departures))
+    assert arrivals == sorted(set(arrivals))
+
+    # Aucun départ de la plage ne domine un trajet retenu
+    for minute in range(window + 1):
+        leave = start + timedelta(minutes=minute)
+        route = client.get("/route", params={
+            "mode": "transit", **ILE, **JAR, "time": leave.isoformat(), "geometry": "false",
+        }).json()
+        arrival = _clock(route["arrival_time"]) if "arrival_time" in route else leave + timedelta(
+            minutes=route["duration_minutes"]
+        )
+        for departure, journey_arrival in zip(departures, arrivals):
+            if departure <= leave:
+                assert arrival >= journey_arrival, (leave, departure)
+            if departure == leave:
+                assert arrival == journey_arrival
@@ -0,0 +1,51 @@
+"""
+Tests des plus courts chemins sur la fixture (centre de Nantes, 120 nœuds)
+
+LOGIQUE:
+- A* bidirectionnel comparé à un Dijkstra complet, pour chaque profil et
+  chaque couple (source, cible)
+- Le chemin renvoyé est continu et son coût est la somme de ses poids
+"""
+
+import os
+
+import pytest
+
+from app.graph import PROFILE_SPEEDS_MPS, StreetGraph
+from app.search import bidirectional_astar, bounded_dijkstra
+
+GRAPH_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app", "data", "fixture_graph.json")
+
+
+@pytest.fixture(scope="module")
+def graph() -> StreetGraph:
+    return StreetGraph.from_json(GRAPH_FILE)
+
+
+def _edge_source(graph: StreetGraph, edge: int) -> int:
+    for node in range(graph.node_count):
+        if graph.offsets[node] <= edge < graph.offsets[node + 1]:
+            return node
+    raise AssertionError(f"edge {edge} out of range")
+
+
+@pytest.mark.parametrize("profile", sorted(PROFILE_SPEEDS_MPS))
+def test_bidirectional_astar_matches_dijkstra(graph, profile):
+    weights = graph.weights[profile]
+    speed = PROFILE_SPEEDS_MPS[profile]
+    for source in range(graph.node_count):
+        expected = bounded_dijkstra(graph, weights, source, 2 ** 62)
+        for target in range(graph.node_count):
+            result = bidirectional_astar(graph, weights, source, target, speed)
+            if target not in expected:
+                assert result is None, (profile, source, target)
+                continue
+            assert result is not None, (profile, source, target)
+            cost, edges, _ = result
+            assert cost == expected[target], (profile, source, target)
+            node = source
+            for edge in edges:
+                assert _edge_source(graph, edge) == node
+                node = graph.targets[edge]
+            assert node == target
+            assert sum(weights[edge] for edge in edges) == cost
@@ -0,0 +1,27 @@
+"""
+Modules copiés dans chaque service (chaque image ne copie que son app/)
+
+LOGIQUE:
+- Les copies doivent rester identiques: une correction faite dans un
+  service doit être reportée dans les autres
+"""
+
+import glob
+import os
+
+import pytest
+
+SERVICES_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.mark.parametrize("module", ["cache_core.py", "log_store.py"])
+def test_copies_are_identical(module):
+    paths = sorted(glob.glob(os.path.join(SERVICES_DIR, "*", "app", module)))
+    if len(paths) < 2:
+        pytest.skip(f"only one copy of {module} in this tree")
+    contents = {}
+    for path in paths:
+        with open(path, "rb") as f:
+            contents[os.path.relpath(path, SERVICES_DIR)] = f.read()
+    reference = next(iter(contents.values()))
+    assert [name for name, data in contents.items() if data != reference] == []
@@ -0,0 +1,70 @@
+"""
+Tests de l'index des arrêts suivants (walk-ahead)
+
+LOGIQUE:
+- Ligne en boucle (un arrêt desservi deux fois par le même pattern): les
+  arrêts suivants partent de chaque passage, pas seulement du premier
+- Arrêt de descente inconnu: None (404), comme un arrêt ou un trajet inconnu
+"""
+
+from app import main
+from app.cache import RouteCache
+from app.gtfs import Timetable
+from app.stop_index import StopIndex
+from app.transit_engine import TransitEngine
+
+# Boucle GAR -> MED -> COM -> GAR -> CHA (arrêts de la fixture)
+FILES = {
+    "agency.txt": "agency_id,agency_name,agency_url,agency_timezone\nNAO,Naolib,https://naolib.fr,Europe/Paris\n",
+    "stops.txt": (
+        "stop_id,stop_name,stop_lat,stop_lon,location_type,parent_station\n"
+        "GAR,Gare Maritime,47.2130,-1.5680,0,\n"
+        "MED,Médiathèque,47.2130,-1.5648,0,\n"
+        "COM,Commerce,47.2130,-1.5616,0,\n"
+        "CHA,Chantiers,47.2082,-1.5664,0,\n"
+    ),
+    "routes.txt": "route_id,agency_id,route_short_name,route_long_name,route_type\nL,NAO,L,Boucle,3\n",
+    "calendar.txt": (
+        "service_id,monday,tuesday,wednesday,thursday,friday,saturday,sunday,start_date,end_date\n"
+        "ALL,1,1,1,1,1,1,1,20260101,20271231\n"
+    ),
+    "trips.txt": "route_id,service_id,trip_id,trip_headsign,direction_id\nL,ALL,L-1,Chantiers,0\n",
+    "stop_times.txt": (
+        "trip_id,arrival_time,departure_time,stop_id,stop_sequence\n"
+        "L-1,08:00:00,08:00:00,GAR,1\n"
+        "L-1,08:02:00,08:02:00,MED,2\n"
+        "L-1,08:04:00,08:04:00,COM,3\n"
+        "L-1,08:08:00,08:08:00,GAR,4\n"
+        "L-1,08:11:00,08:11:00,CHA,5\n"
+    ),
+}
+
+
+def _index(tmp_path):
+    for name, content in FILES.items():
+        (tmp_path / name).write_text(content, encoding="utf-8")
+    transit = TransitEngine(Timetable.load(str(tmp_path)), main.engine, RouteCache())
+    return StopIndex(transit, max_stops=5, max_walk_minutes=20)
+
+
+def test_loop_pattern_lists_stops_after_each_visit(tmp_path):
+    index = _index(tmp_path)
+
+    result = index.walk_ahead("GAR", "L", trip_id="L-1", include_geometry=False)
+    lines = [
+        (line["departure_time"], [stop["stop_id"] for stop in line["stops"]])
+        for line in result["lines"]
+    ]
+    assert lines == [("08:00", ["MED", "COM", "GAR", "CHA"]), ("08:08", ["CHA"])]
+
+    second_visit = result["lines"][1]["stops"][0]
+    assert second_visit["stops_ahead"] == 1
+    assert second_visit["arrival_time"] == "08:11"
+    assert second_visit["ride_minutes"] == 3
+
+
+def test_unknown_to_stop_is_rejected(tmp_path):
+    index = _index(tmp_path)
+
+    assert index.walk_ahead("GAR", "L", trip_id="L-1", to_stop_id="XXX", include_geometry=False) is None
+    assert index.walk_ahead("GAR", "L", trip_id="L-1", to_stop_id="CHA", include_geometry=False) is not None
@@ -1,73 +1,100 @@
 """
-Cache pour les données météo (persistance JSON)
+Cache pour les données météo (persistance en journal append-only)
 
 LOGIQUE:
 - Cache moyen (5min) pour équilibrer fraîcheur et performance
-- Sauvegarder sur disque pour survie aux redémarrages
+- Sauvegarder sur disque pour survie aux redémarrages (LogStore:
+  une ligne par écriture, thread dédié, compaction périodique)
 - TTL adaptatif selon l'heure (prévisions plus stables loin dans le futur)
 """
 
-import json
 import os
-from datetime import datetime, timedelta
-from typing import Dict, Optional
+from typing import Optional
+
+from .cache_core import LRUCache
+from .log_store import LogStore
 
 DATA_DIR = "/app/data"
-CACHE_FILE = os.path.join(DATA_DIR, "weather_cache.json")
+CACHE_FILE = os.path.join(DATA_DIR, "weather_cache.log")
+TILES_FILE = os.path.join(DATA_DIR, "weather_tiles.log")
+MAX_ENTRIES = 10000
+MAX_BYTES = 32 * 1024 * 1024  # Taille approximative (JSON) max en mémoire
 
 
 class WeatherCache:
     """
     Gestionnaire de cache pour les données météo
     """
-    
-    def __init__(self, ttl_seconds: int = 300):
+
+    def __init__(
+        self,
+        ttl_seconds: int = 300,
+        path: str = CACHE_FILE,
+        max_entries: int = MAX_ENTRIES,
+        max_bytes: int = MAX_BYTES
+    ):
         """
         ÉTAPE: Initialiser le cache
-        
+
         LOGIQUE:
         - Créer le dossier data s'il n'existe pas
-        - Définir TTL par défaut
-        - Charger le cache existant
+        - Définir TTL et bornes mémoire (entrées + octets, éviction LRU)
+        - Charger le cache existant (rejeu du journal, bornes appliquées)
         """
         self.ttl_seconds = ttl_seconds
-        # TODO: Implémenter
-        pass
-    
-    
+        self._store = LogStore(path)
+        self._entries = LRUCache(max_entries, max_bytes, ttl_seconds)
+        for key, (value, expires_at) in self._store.replay().items():
+            self._entries.set(key, value, expires_at=expires_at)
+
+
     def get(self, key: str) -> Optional[dict]:
         """
         ÉTAPE: Récupérer une décision météo depuis le cache
-        
+
         LOGIQUE:
         - Vérifier existence
         - Vérifier TTL
         - Retourner valeur ou None
         """
-        # TODO: Implémenter
-        pass
-    
-    
+        return self._entries.get(key)
+
+
+    def peek(self, key: str) -> Optional[dict]:
+        """Lire sans compter de hit ni rafraîchir la récence (tâches de fond)"""
+        return self._entries.peek(key)
+
+
     def set(self, key: str, value: dict, ttl: Optional[int] = None):
         """
         ÉTAPE: Mettre une décision en cache
-        
+
         LOGIQUE:
-        - Stocker avec timestamp
-        - Utiliser TTL adaptatif
-        - Sauvegarder
+        - Stocker avec timestamp d'expiration
+        - Utiliser TTL adaptatif (ttl fourni par l'appelant) ou TTL par défaut
+        - Journaliser (ajout d'une ligne, hors boucle d'événements)
         """
-        # TODO: Implémenter
-        pass
-    
-    
+        expires_at = self._entries.set(key, value, ttl=ttl)
+        self._store.append_set(key, value, expires_at)
+        self._store.maybe_compact(len(self._entries), self._entries.to_dict)
+
+
     def clear_expired(self):
         """
         ÉTAPE: Nettoyer les entrées expirées
-        
+
         LOGIQUE:
-        - Supprimer les entrées périmées
-        - Optimiser la taille du cache
+        - Dépiler le tas d'expiration (coût = entrées expirées seulement)
+        - Pas de réécriture: la compaction du journal ignore les entrées expirées
         """
-        # TODO: Implémenter
-        pass
+        return self._entries.expire()
+
+
+    def get_stats(self) -> dict:
+        """Retourner les compteurs du cache (pour /metrics)"""
+        return self._entries.get_stats()
+
+
+    def close(self):
+        """ÉTAPE: Vider le journal sur disque (arrêt du service)"""
+        self._store.close()
@@ -0,0 +1,113 @@
+"""
+Disjoncteur (circuit breaker) autour des appels à l'API météo
+
+LOGIQUE:
+- FERMÉ: les appels passent ; succès / échecs comptés sur une fenêtre glissante
+- Taux d'échec >= seuil (avec un minimum d'appels) -> OUVERT: les appels
+  échouent immédiatement (CircuitOpen) au lieu d'attendre le timeout
+- Après open_seconds -> SEMI-OUVERT: un seul appel d'essai ; succès ->
+  FERMÉ, échec -> OUVERT à nouveau
+"""
+
+import time
+from collections import deque
+from typing import Deque, Optional, Tuple
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpen(Exception):
+    """Appel refusé: le disjoncteur est ouvert"""
+    pass
+
+
+class CircuitBreaker:
+    """
+    Disjoncteur à fenêtre glissante
+    """
+
+    def __init__(
+        self,
+        failure_ratio: float = 0.5,
+        min_calls: int = 5,
+        window_seconds: float = 30,
+        open_seconds: float = 15
+    ):
+        self.failure_ratio = failure_ratio
+        self.min_calls = min_calls
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        self._calls: Deque[Tuple[float, bool]] = deque()
+        self._opened_at: Optional[float] = None
+        self._probe_started_at: Optional[float] = None
+        self.rejected = 0
+        self.opened = 0
+
+    def allow(self) -> bool:
+        """
+        ÉTAPE: Un appel peut-il partir ?
+
+        LOGIQUE:
+        - OUVERT depuis plus de open_seconds: passer SEMI-OUVERT, laisser un essai
+        - SEMI-OUVERT: un seul essai à la fois (un essai sans résultat après
+          open_seconds, ex. annulé, n'empêche pas le suivant)
+        """
+        now = time.monotonic()
+        if self.state == OPEN and now - self._opened_at >= self.open_seconds:
+            self.state = HALF_OPEN
+            self._probe_started_at = None
+        if self.state == CLOSED:
+            return True
+        if self.state == HALF_OPEN and (
+            self._probe_started_at is None or now - self._probe_started_at >= self.open_seconds
+        ):
+            self._probe_started_at = now
+            return True
+        self.rejected += 1
+        return False
+
+    def check(self):
+        """allow() ou CircuitOpen"""
+        if not self.allow():
+            raise CircuitOpen("Weather API circuit open")
+
+    def record_success(self):
+        if self.state == HALF_OPEN:
+            self.state = CLOSED
+            self._calls.clear()
+        self._record(True)
+
+    def record_failure(self):
+        if self.state == HALF_OPEN:
+            self._open()
+            return
+        self._record(False)
+        failures = sum(1 for _, ok in self._calls if not ok)
+        if len(self._calls) >= self.min_calls and failures / len(self._calls) >= self.failure_ratio:
+            self._open()
+
+    def _record(self, ok: bool):
+        now = time.monotonic()
+        self._calls.append((now, ok))
+        while self._calls and self._calls[0][0] < now - self.window_seconds:
+            self._calls.popleft()
+
+    def _open(self):
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self._probe_started_at = None
+        self.opened += 1
+
+    def get_stats(self) -> dict:
+        """Retourner l'état du disjoncteur (pour /metrics)"""
+        failures = sum(1 for _, ok in self._calls if not ok)
+        return {
+            "state": self.state,
+            "window_calls": len(self._calls),
+            "window_failures": failures,
+            "opened": self.opened,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,256 @@
+"""
+Cache des prévisions brutes par tuile spatiale et créneau de 3h
+
+LOGIQUE:
+- Une prévision appartient à une zone (tuile de 0.05° ≈ 5.5km x 3.8km à
+  Nantes) et à un créneau de 3h, pas à un trajet
+- Un appel à l'API météo (au centre de la tuile) rapporte tous les créneaux
+  de la tuile: ils sont stockés ensemble sous la clé de la tuile
+- Les décisions sont assemblées à partir des créneaux en cache: le nombre
+  d'appels à l'API suit le nombre de tuiles couvertes, pas le nombre de trajets
+- Les chargements concurrents d'une même tuile sont fusionnés (un seul appel)
+- Chaque appel à l'API prend un jeton du token bucket (limite de l'API)
+- Stale-while-revalidate: une tuile expirée mais encore conservée est servie
+  immédiatement (marquée stale) pendant qu'un seul rechargement tourne en
+  tâche de fond ; la latence ne dépend plus de l'état de l'API
+- Disjoncteur autour des appels à l'API: une API en panne fait échouer
+  immédiatement les chargements (CircuitOpen) au lieu d'attendre le timeout
+"""
+
+import asyncio
+import logging
+import math
+import time
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from .cache import WeatherCache
+from .circuit_breaker import CircuitBreaker, CircuitOpen
+from .rate_limit import RateLimited, TokenBucket
+
+logger = logging.getLogger(__name__)
+
+SLOT_SECONDS = 3 * 3600
+
+# fetch(lat, lon, request_id) -> {créneau: période normalisée}
+SeriesFetchFn = Callable[[float, float, str], Awaitable[Dict[int, dict]]]
+
+
+def slot_of(timestamp: float) -> int:
+    """Numéro du créneau de 3h (aligné sur les créneaux UTC de l'API)"""
+    return int(timestamp // SLOT_SECONDS)
+
+
+class ForecastTileCache:
+    """
+    Séries de prévisions par tuile
+    """
+
+    def __init__(
+        self,
+        fetch_series: SeriesFetchFn,
+        store: WeatherCache,
+        tile_deg: float = 0.05,
+        ttl_seconds: int = 1800,
+        stale_seconds: int = 6 * 3600,
+        rate_limiter: Optional[TokenBucket] = None,
+        rate_limit_wait_seconds: float = 1.0,
+        breaker: Optional[CircuitBreaker] = None
+    ):
+        """
+        ÉTAPE: Initialiser
+
+        LOGIQUE:
+        - store: cache LRU + journal dédié aux tuiles
+        - ttl_seconds: durée de validité d'une série (l'API publie ses
+          prévisions toutes les quelques heures)
+        - stale_seconds: durée pendant laquelle une série expirée peut encore
+          être servie (stale) si le rechargement échoue
+        - rate_limiter: jetons pour l'API ; une requête utilisateur attend
+          au plus rate_limit_wait_seconds
+        - breaker: disjoncteur vérifié avant chaque appel à l'API
+        """
+        self._fetch_series = fetch_series
+        self._store = store
+        self.tile_deg = tile_deg
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.rate_limiter = rate_limiter
+        self.rate_limit_wait_seconds = rate_limit_wait_seconds
+        self.breaker = breaker
+        self._loading: Dict[Tuple[int, int], asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.stale_served = 0
+        self.revalidations = 0
+        self.revalidation_failures = 0
+        self.upstream_calls = 0
+
+    def tile_of(self, lat: float, lon: float) -> Tuple[int, int]:
+        return math.floor(lat / self.tile_deg), math.floor(lon / self.tile_deg)
+
+    def tile_center(self, tile: Tuple[int, int]) -> Tuple[float, float]:
+        return (tile[0] + 0.5) * self.tile_deg, (tile[1] + 0.5) * self.tile_deg
+
+    def _key(self, tile: Tuple[int, int]) -> str:
+        return f"tile_{self.tile_deg}_{tile[0]}_{tile[1]}"
+
+    def peek(self, tile: Tuple[int, int]) -> Optional[dict]:
+        """Entrée en cache de la tuile ({"fetched_at", "slots"}) ou None, sans compter de hit"""
+        return self._store.peek(self._key(tile))
+
+    async def get_slots(self, lat: float, lon: float, request_id: str) -> Tuple[Dict[int, dict], bool]:
+        """
+        ÉTAPE: Créneaux de prévision de la tuile contenant le point
+
+        LOGIQUE:
+        - Fraîche (âge < ttl): retour immédiat
+        - Expirée mais conservée: retour immédiat marqué stale + un seul
+          rechargement en tâche de fond
+        - Absente: un seul chargement par tuile, les appelants concurrents
+          attendent le même résultat ; un chargement déjà en cours (lancé
+          par le préchargement ou une revalidation, sans échéance) n'est
+          attendu que rate_limit_wait_seconds: RateLimited au-delà, le
+          chargement continue en tâche de fond
+
+        RETURN: ({créneau: période}, stale)
+        """
+        tile = self.tile_of(lat, lon)
+        entry = self._store.get(self._key(tile))
+        if entry is not None:
+            slots = _decode_slots(entry["slots"])
+            if time.time() - entry["fetched_at"] < self.ttl_seconds:
+                self.hits += 1
+                return slots, False
+            self.stale_served += 1
+            self._revalidate(tile, request_id)
+            return slots, True
+        self.misses += 1
+
+        joined = tile in self._loading
+        task = self._shared_load(tile, request_id, self.rate_limit_wait_seconds)
+        # shield: un appelant annulé n'annule pas le chargement partagé
+        if not joined:
+            return await asyncio.shield(task), False
+        self.coalesced += 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), self.rate_limit_wait_seconds), False
+        except asyncio.TimeoutError:
+            raise RateLimited(f"Forecast tile {tile} not loaded within {self.rate_limit_wait_seconds}s")
+
+    async def prefetch(self, tile: Tuple[int, int], request_id: str, reserve: int = 0) -> Dict[int, dict]:
+        """
+        ÉTAPE: Chargement d'une tuile par le préchargement
+
+        LOGIQUE:
+        - Passe par le chargement partagé: si une requête utilisateur ou une
+          revalidation charge déjà la tuile, on attend son résultat (aucun
+          second appel ni second jeton) ; sinon les requêtes qui arrivent
+          pendant le préchargement le rejoignent
+        - reserve: jetons laissés aux requêtes utilisateur
+        """
+        if tile in self._loading:
+            self.coalesced += 1
+        return await asyncio.shield(self._shared_load(tile, request_id, None, reserve))
+
+    def _shared_load(
+        self,
+        tile: Tuple[int, int],
+        request_id: str,
+        timeout: Optional[float],
+        reserve: int = 0
+    ) -> asyncio.Task:
+        """Tâche de chargement de la tuile (créée une seule fois par tuile en cours)"""
+        task = self._loading.get(tile)
+        if task is None:
+            task = asyncio.create_task(self._load_and_release(tile, request_id, timeout, reserve))
+            self._loading[tile] = task
+        return task
+
+    async def _load_and_release(self, tile: Tuple[int, int], request_id: str, timeout: Optional[float], reserve: int):
+        try:
+            return await self.load(tile, request_id, reserve=reserve, timeout=timeout)
+        finally:
+            self._loading.pop(tile, None)
+
+    def _revalidate(self, tile: Tuple[int, int], request_id: str):
+        """ÉTAPE: Rechargement en tâche de fond d'une tuile servie stale (un seul à la fois)"""
+        if tile in self._loading:
+            return
+        self.revalidations += 1
+        self._shared_load(tile, request_id, None).add_done_callback(self._revalidated)
+
+    def _revalidated(self, task: asyncio.Task):
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is None:
+            return
+        self.revalidation_failures += 1
+        if isinstance(error, CircuitOpen):
+            logger.debug("Forecast tile revalidation skipped: weather API circuit open")
+        else:
+            logger.warning(f"Forecast tile revalidation failed: {error!r}")
+
+    async def load(
+        self,
+        tile: Tuple[int, int],
+        request_id: str,
+        reserve: int = 0,
+        timeout: Optional[float] = None
+    ) -> Dict[int, dict]:
+        """
+        ÉTAPE: Appeler l'API pour le centre de la tuile et stocker la série
+
+        LOGIQUE:
+        - CircuitOpen si le disjoncteur refuse l'appel (aucun jeton consommé)
+        - Prendre un jeton (reserve / timeout: voir TokenBucket.acquire)
+        - RateLimited si aucun jeton avant l'échéance
+        - Succès / échec de l'appel comptés par le disjoncteur
+        """
+        if self.breaker is not None:
+            self.breaker.check()
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire(reserve=reserve, timeout=timeout)
+        center_lat, center_lon = self.tile_center(tile)
+        self.upstream_calls += 1
+        try:
+            slots = await self._fetch_series(center_lat, center_lon, request_id)
+        except Exception:
+            if self.breaker is not None:
+                self.breaker.record_failure()
+            raise
+        if self.breaker is not None:
+            self.breaker.record_success()
+        self._store.set(
+            self._key(tile),
+            {"fetched_at": time.time(), "slots": {str(slot): period for slot, period in slots.items()}},
+            ttl=self.ttl_seconds + self.stale_seconds,
+        )
+        logger.debug(f"[{request_id}] Forecast tile {tile} loaded ({len(slots)} slots)")
+        return slots
+
+    def close(self):
+        self._store.close()
+
+    def get_stats(self) -> dict:
+        """Retourner les compteurs (pour /metrics)"""
+        lookups = self.hits + self.stale_served + self.misses
+        return {
+            "tile_deg": self.tile_deg,
+            "ttl_seconds": self.ttl_seconds,
+            "stale_seconds": self.stale_seconds,
+            "hits": self.hits,
+            "stale_served": self.stale_served,
+            "misses": self.misses,
+            "hit_ratio": round((self.hits + self.stale_served) / lookups, 3) if lookups else 0.0,
+            "coalesced": self.coalesced,
+            "revalidations": self.revalidations,
+            "revalidation_failures": self.revalidation_failures,
+            "upstream_calls": self.upstream_calls,
+            "store": self._store.get_stats(),
+        }
+
+
+def _decode_slots(slots: Dict[str, dict]) -> Dict[int, dict]:
+    return {int(slot): period for slot, period in slots.items()}
@@ -0,0 +1,203 @@
+"""
+Persistance des caches en journal append-only (JSON lines)
+
+LOGIQUE:
+- Chaque écriture ajoute une ligne au journal: coût O(entrée), pas de
+  réécriture du fichier complet
+- Les écritures sont mises en file et faites par un thread dédié: aucune
+  I/O disque sur la boucle d'événements
+- Compaction périodique: quand le journal contient trop de lignes mortes,
+  il est réécrit avec les seules entrées vivantes (fichier temporaire
+  puis renommage atomique)
+- Au démarrage, rejeu ligne par ligne (lecture en flux, pas de gros json.load)
+- Valeur non sérialisable: ligne ignorée (loggée), le thread continue ;
+  si le thread s'arrête (erreur disque...), le journal est désactivé et
+  les écritures suivantes sont abandonnées au lieu de s'accumuler en file
+
+FORMAT D'UNE LIGNE:
+- {"k": clé, "v": valeur, "e": expiration (timestamp)}  -> écriture
+- {"k": clé, "d": 1}                                      -> suppression
+"""
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Compacter quand lignes du journal > COMPACT_RATIO * entrées vivantes + COMPACT_MIN_LINES
+COMPACT_RATIO = 2
+COMPACT_MIN_LINES = 1000
+
+_CLOSE = object()
+
+
+class LogStore:
+    """
+    Journal append-only d'un cache clé -> (valeur, expiration)
+    """
+
+    def __init__(self, path: str):
+        """
+        ÉTAPE: Ouvrir le journal
+
+        LOGIQUE:
+        - Créer le dossier s'il n'existe pas
+        - Le thread d'écriture démarre immédiatement
+        """
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.lines = 0
+        self.dropped = 0
+        self.disabled = False
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread = threading.Thread(target=self._writer, name=f"log-store-{os.path.basename(path)}", daemon=True)
+        self._thread.start()
+
+    def replay(self) -> Dict[str, Tuple[Any, float]]:
+        """
+        ÉTAPE: Relire le journal au démarrage
+
+        LOGIQUE:
+        - Appliquer les lignes dans l'ordre (la dernière écriture gagne)
+        - Ignorer les entrées expirées et une éventuelle dernière ligne tronquée
+        """
+        entries: Dict[str, Tuple[Any, float]] = {}
+        if not os.path.exists(self.path):
+            return entries
+        lines = 0
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    logger.warning(f"Skipping corrupted line in {self.path}")
+                    continue
+                lines += 1
+                if record.get("d"):
+                    entries.pop(record["k"], None)
+                else:
+                    entries[record["k"]] = (record["v"], record["e"])
+        now = time.time()
+        entries = {k: entry for k, entry in entries.items() if entry[1] > now}
+        self.lines = lines
+        logger.info(f"Replayed {lines} log lines from {self.path} ({len(entries)} live entries)")
+        return entries
+
+    def append_set(self, key: str, value: Any, expires_at: float):
+        """Journaliser une écriture (non bloquant)"""
+        self._enqueue({"k": key, "v": value, "e": expires_at})
+
+    def append_delete(self, key: str):
+        """Journaliser une suppression (non bloquant)"""
+        self._enqueue({"k": key, "d": 1})
+
+    def _enqueue(self, record: dict):
+        if self.disabled:
+            self.dropped += 1
+            return
+        self.lines += 1
+        self._queue.put(record)
+
+    def maybe_compact(self, live_entries: int, snapshot: Callable[[], Dict[str, Tuple[Any, float]]]):
+        """
+        ÉTAPE: Demander une compaction si le journal est trop long
+
+        LOGIQUE:
+        - Appelé par le cache après ses écritures (coût amorti O(1))
+        - snapshot() n'est appelé que si la compaction a lieu
+        - La copie des entrées vivantes est mise en file: toutes les lignes
+          déjà en file y sont reflétées, les suivantes seront ajoutées
+          après la réécriture
+        """
+        if self.disabled or self.lines <= COMPACT_RATIO * live_entries + COMPACT_MIN_LINES:
+            return
+        self.lines = live_entries
+        self._queue.put(("compact", snapshot()))
+
+    def close(self, timeout: Optional[float] = 5.0):
+        """ÉTAPE: Vider la file et arrêter le thread (arrêt du service)"""
+        self._queue.put(_CLOSE)
+        self._thread.join(timeout)
+
+    def _writer(self):
+        """
+        ÉTAPE: Thread d'écriture
+
+        LOGIQUE:
+        - Regrouper les lignes disponibles en un seul write + flush
+        - Traiter les compactions dans l'ordre de la file
+        - Ligne non sérialisable: ignorée, les autres sont écrites
+        - Toute autre erreur arrête le thread: journal désactivé, file vidée
+        """
+        f = None
+        try:
+            f = open(self.path, "a", encoding="utf-8")
+            while True:
+                item = self._queue.get()
+                batch = []
+                while True:
+                    if item is _CLOSE or isinstance(item, tuple):
+                        break
+                    line = self._dumps(item)
+                    if line is not None:
+                        batch.append(line)
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        item = None
+                        break
+                if batch:
+                    f.write("\n".join(batch) + "\n")
+                    f.flush()
+                if item is _CLOSE:
+                    return
+                if isinstance(item, tuple):
+                    f.close()
+                    self._compact(item[1])
+                    f = open(self.path, "a", encoding="utf-8")
+        except Exception as e:
+            self.disabled = True
+            logger.error(f"Log store writer stopped for {self.path}, persistence disabled: {e!r}")
+            self._drain()
+        finally:
+            if f is not None:
+                f.close()
+
+    def _dumps(self, record: dict) -> Optional[str]:
+        """Ligne JSON d'un enregistrement (None si la valeur n'est pas sérialisable)"""
+        try:
+            return json.dumps(record, ensure_ascii=False)
+        except (TypeError, ValueError) as e:
+            self.dropped += 1
+            logger.warning(f"Skipping unserializable log record for key {record.get('k')!r}: {e}")
+            return None
+
+    def _drain(self):
+        """Vider la file après l'arrêt du thread (enregistrements abandonnés)"""
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if isinstance(item, dict):
+                self.dropped += 1
+
+    def _compact(self, entries: Dict[str, Tuple[Any, float]]):
+        """Réécrire le journal avec les entrées vivantes (renommage atomique)"""
+        now = time.time()
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for key, (value, expires_at) in entries.items():
+                if expires_at > now:
+                    line = self._dumps({"k": key, "v": value, "e": expires_at})
+                    if line is not None:
+                        f.write(line + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        logger.info(f"Compacted {self.path} to {len(entries)} entries")
@@ -10,19 +10,35 @@ LOGIQUE GLOBALE:
 PORT: 8004
 """
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.responses import JSONResponse
 from enum import Enum
+import asyncio
 import logging
 import os
-from typing import Optional, List
+import time
+import uuid
+from collections import Counter
+from typing import Dict, Optional, List
 from datetime import datetime, timedelta
 
+import httpx
+
 # ÉTAPE: Importer les modules locaux
 # from .models import WeatherDecision, WeatherResponse
 # from .services.weather_adapter import WeatherAdapter
 # from .services.decision_engine import WeatherDecisionEngine
-# from .cache import WeatherCache
+from .cache import TILES_FILE, WeatherCache
+from .cache_keys import KeyQuantizer, LevelHitStats
+from .circuit_breaker import CircuitBreaker, CircuitOpen
+from .forecast_tiles import ForecastTileCache, slot_of
+from . import polyline
+from .models import BatchWeatherRequest, RouteSegmentInput, RouteWeatherRequest
+from .prefetcher import ForecastPrefetcher
+from .rate_limit import RateLimited, TokenBucket
+from .route_sampling import sample_segment
+from .rules_engine import DECISIONS, RulesEngine
 
 # ÉTAPE: Configuration du logging
 logging.basicConfig(
@@ -31,17 +47,105 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# ÉTAPE: Configuration
+WEATHER_API_KEY = os.getenv("WEATHER_API_KEY", "")
+WEATHER_API_URL = os.getenv("WEATHER_API_URL", "https://api.openweathermap.org/data/2.5/forecast")
+WEATHER_API_TIMEOUT_SECONDS = float(os.getenv("WEATHER_API_TIMEOUT_SECONDS", "3.0"))
+FORECAST_PERIOD_HOURS = 3  # Pas des prévisions OpenWeatherMap
+CACHE_TTL_SECONDS = 300  # Cache de 5 minutes
+# Quantification des clés de décision: "geohash" (précision) ou "grid" (mètres)
+# + créneaux de départ/arrivée (les prévisions ne varient pas à 100m ni à la minute près)
+CACHE_QUANTIZATION = os.getenv("WEATHER_CACHE_QUANTIZATION", "geohash")
+CACHE_GEOHASH_PRECISION = int(os.getenv("WEATHER_CACHE_GEOHASH_PRECISION", "6"))
+CACHE_GRID_CELL_M = float(os.getenv("WEATHER_CACHE_GRID_CELL_M", "1000"))
+CACHE_TIME_BUCKET_MINUTES = int(os.getenv("WEATHER_CACHE_TIME_BUCKET_MINUTES", "15"))
+# Bornes du cache mémoire (éviction LRU au-delà)
+CACHE_MAX_ENTRIES = int(os.getenv("WEATHER_CACHE_MAX_ENTRIES", "10000"))
+CACHE_MAX_BYTES = int(os.getenv("WEATHER_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+# Tuiles de prévisions brutes: taille (degrés) et durée de validité d'une série
+FORECAST_TILE_DEG = float(os.getenv("WEATHER_TILE_DEG", "0.05"))
+FORECAST_TILE_TTL_SECONDS = int(os.getenv("WEATHER_TILE_TTL_SECONDS", "1800"))
+# Série expirée encore servie (stale) pendant son rechargement en tâche de fond
+FORECAST_TILE_STALE_SECONDS = int(os.getenv("WEATHER_TILE_STALE_SECONDS", str(6 * 3600)))
+# Limite de l'API météo (OpenWeatherMap gratuit: 60 appels/minute)
+WEATHER_API_RATE_PER_SECOND = float(os.getenv("WEATHER_API_RATE_PER_SECOND", "1.0"))
+WEATHER_API_BURST = int(os.getenv("WEATHER_API_BURST", "10"))
+WEATHER_API_MAX_WAIT_SECONDS = float(os.getenv("WEATHER_API_MAX_WAIT_SECONDS", "1.0"))
+# Disjoncteur de l'API météo: ouvert au-delà du taux d'échec sur la fenêtre glissante
+BREAKER_FAILURE_RATIO = float(os.getenv("WEATHER_BREAKER_FAILURE_RATIO", "0.5"))
+BREAKER_MIN_CALLS = int(os.getenv("WEATHER_BREAKER_MIN_CALLS", "5"))
+BREAKER_WINDOW_SECONDS = float(os.getenv("WEATHER_BREAKER_WINDOW_SECONDS", "30"))
+BREAKER_OPEN_SECONDS = float(os.getenv("WEATHER_BREAKER_OPEN_SECONDS", "15"))
+# Préchargement de la zone (lat_min,lon_min,lat_max,lon_max: Nantes Métropole par défaut)
+PREFETCH_ENABLED = os.getenv("WEATHER_PREFETCH_ENABLED", "true").lower() == "true"
+PREFETCH_BBOX = tuple(
+    float(v) for v in os.getenv("WEATHER_PREFETCH_BBOX", "47.10,-1.80,47.35,-1.40").split(",")
+)
+PREFETCH_INTERVAL_SECONDS = float(os.getenv("WEATHER_PREFETCH_INTERVAL_SECONDS", "60"))
+PREFETCH_REFRESH_AHEAD_SECONDS = float(os.getenv("WEATHER_PREFETCH_REFRESH_AHEAD_SECONDS", "300"))
+PREFETCH_TOKEN_RESERVE = int(os.getenv("WEATHER_PREFETCH_TOKEN_RESERVE", "3"))
+# Règles de décision (rechargées à chaud quand le fichier change)
+RULES_FILE = os.getenv("WEATHER_RULES_FILE", os.path.join(os.path.dirname(__file__), "rules.json"))
+RULES_CHECK_INTERVAL_SECONDS = float(os.getenv("WEATHER_RULES_CHECK_INTERVAL_SECONDS", "5"))
+
+rules_engine = RulesEngine(RULES_FILE, RULES_CHECK_INTERVAL_SECONDS)
+quantizer = KeyQuantizer(
+    CACHE_QUANTIZATION, CACHE_GEOHASH_PRECISION, CACHE_GRID_CELL_M, CACHE_TIME_BUCKET_MINUTES
+)
+cache_hits = LevelHitStats()
+cache = WeatherCache(
+    ttl_seconds=CACHE_TTL_SECONDS,
+    max_entries=CACHE_MAX_ENTRIES,
+    max_bytes=CACHE_MAX_BYTES,
+)
+forecast_tiles = ForecastTileCache(
+    lambda lat, lon, request_id: _fetch_forecast_series(lat, lon, request_id),
+    WeatherCache(ttl_seconds=FORECAST_TILE_TTL_SECONDS, path=TILES_FILE, max_entries=CACHE_MAX_ENTRIES),
+    tile_deg=FORECAST_TILE_DEG,
+    ttl_seconds=FORECAST_TILE_TTL_SECONDS,
+    stale_seconds=FORECAST_TILE_STALE_SECONDS,
+    rate_limiter=TokenBucket(WEATHER_API_RATE_PER_SECOND, WEATHER_API_BURST),
+    rate_limit_wait_seconds=WEATHER_API_MAX_WAIT_SECONDS,
+    breaker=CircuitBreaker(
+        BREAKER_FAILURE_RATIO, BREAKER_MIN_CALLS, BREAKER_WINDOW_SECONDS, BREAKER_OPEN_SECONDS
+    ),
+)
+prefetcher = ForecastPrefetcher(
+    forecast_tiles,
+    PREFETCH_BBOX,
+    interval_seconds=PREFETCH_INTERVAL_SECONDS,
+    refresh_ahead_seconds=PREFETCH_REFRESH_AHEAD_SECONDS,
+    token_reserve=PREFETCH_TOKEN_RESERVE,
+)
+
+
+# ÉTAPE: Cycle de vie de l'application
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    LOGIQUE:
+    - Au démarrage: client HTTP longue durée vers l'API météo, puis
+      préchargement de la zone en tâche de fond
+    - À l'arrêt: arrêter le préchargement, fermer le client, vider les journaux
+    """
+    app.state.http_client = httpx.AsyncClient(timeout=WEATHER_API_TIMEOUT_SECONDS)
+    if PREFETCH_ENABLED:
+        await prefetcher.start()
+    yield
+    await prefetcher.stop()
+    await app.state.http_client.aclose()
+    cache.close()
+    forecast_tiles.close()
+
+
 # ÉTAPE: Initialiser l'application FastAPI
 app = FastAPI(
     title="Weather Service",
     description="Service de décision météo pour itinéraires santé",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
-# ÉTAPE: Configuration
-WEATHER_API_KEY = os.getenv("WEATHER_API_KEY", "")
-CACHE_TTL_SECONDS = 300  # Cache de 5 minutes
-
 
 class WeatherDecision(str, Enum):
     """Décision météo"""
@@ -58,8 +162,14 @@ async def add_request_id(request: Request, call_next):
     - Extraire ou générer X-Request-Id
     - Logger chaque requête
     """
-    # TODO: Implémenter
-    pass
+    request_id = request.headers.get("X-Request-Id") or str(uuid.uuid4())
+    request.state.request_id = request_id
+    start = time.perf_counter()
+    response = await call_next(request)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    response.headers["X-Request-Id"] = request_id
+    logger.info(f"[{request_id}] {request.method} {request.url.path} -> {response.status_code} ({elapsed_ms:.1f}ms)")
+    return response
 
 
 # ÉTAPE: Endpoint de santé
@@ -73,6 +183,29 @@ async def health_check():
     return {"status": "healthy", "service": "weather"}
 
 
+# ÉTAPE: Endpoint de monitoring - GET /metrics
+@app.get("/metrics")
+async def get_metrics():
+    """
+    LOGIQUE:
+    - Exposer les compteurs du cache (hits, misses, évictions, taille)
+      et le hit ratio par niveau de quantification
+    - Exposer le cache de tuiles (appels à l'API météo, hits par tuile)
+    - Exposer la fraîcheur de la zone préchargée et le token bucket
+    - Exposer la version des règles de décision
+    - Exposer l'état du disjoncteur de l'API météo (et les tuiles servies stale)
+    """
+    return {
+        "cache": cache.get_stats(),
+        "cache_hit_ratio_by_level": cache_hits.get_stats(),
+        "forecast_tiles": forecast_tiles.get_stats(),
+        "prefetch": prefetcher.get_stats(),
+        "upstream_rate_limit": forecast_tiles.rate_limiter.get_stats(),
+        "upstream_breaker": forecast_tiles.breaker.get_stats(),
+        "rules": rules_engine.get_stats(),
+    }
+
+
 # ÉTAPE: Endpoint principal - GET /weather/decision
 @app.get("/weather/decision")
 async def get_weather_decision(
@@ -107,6 +240,8 @@ async def get_weather_decision(
     - reasons: Liste des raisons
     - penalties: walk_penalty (0-1), bike_penalty (0-1)
     - summary: Résumé météo avec détails
+    - stale: True si une prévision expirée a été servie (API indisponible
+      ou rechargement en cours) ; une décision stale n'est pas mise en cache
     
     RÈGLES DE DÉCISION:
     - BLOCK si:
@@ -124,40 +259,334 @@ async def get_weather_decision(
     """
     
     # ÉTAPE 1.1: Extraire requestId
-    # - request_id = request.headers.get('X-Request-Id')
-    # - Logger: "Weather decision request: from ({},{}) to ({},{}) at {}"
-    
+    request_id = request.state.request_id if request else "-"
+    logger.info(
+        f"[{request_id}] Weather decision request: from ({origin_lat},{origin_lon}) "
+        f"to ({dest_lat},{dest_lon}) at {departure_time}"
+    )
+
     # ÉTAPE 1.2: Parser departure_time
-    # - Si "now": datetime.now()
-    # - Sinon: parser ISO 8601
-    # - Calculer arrival_time = departure_time + duration_minutes
-    
+    start_time = _parse_departure_time(departure_time)
+    end_time = start_time + timedelta(minutes=duration_minutes)
+
     # ÉTAPE 1.3: Vérifier le cache
-    # - cache_key = f"weather_{origin_lat}_{origin_lon}_{dest_lat}_{dest_lon}_{departure_time}"
-    # - cached = cache.get(cache_key)
-    # - Si valide (< 5min), retourner cached
-    
+    # - Clé quantifiée: cellules origine/destination + créneaux de départ/arrivée
+    #   (les trajets voisins partagent l'entrée)
+    cache_key = _decision_cache_key(origin_lat, origin_lon, dest_lat, dest_lon, start_time, end_time)
+    cached = cache.get(cache_key)
+    cache_hits.record(quantizer.level, cached is not None)
+    if cached is not None:
+        return cached
+
     # ÉTAPE 1.4: Obtenir les données météo
-    # - Appeler _fetch_weather_data() pour origine et destination
-    # - Moyenner ou prendre le pire des deux
-    
+    # - Assemblées depuis le cache de tuiles (origine et destination dans la
+    #   même tuile: un seul chargement)
+    # - On garde le pire des deux
+    origin_weather, dest_weather = await asyncio.gather(
+        _fetch_weather_data(origin_lat, origin_lon, start_time, end_time, request_id),
+        _fetch_weather_data(dest_lat, dest_lon, start_time, end_time, request_id),
+    )
+    weather_data = _worst_of(origin_weather, dest_weather)
+
     # ÉTAPE 1.5: Appliquer les règles de décision
-    # - Appeler _apply_decision_rules()
-    # - Obtenir decision, reasons, penalties
-    
+    decision, reasons, penalties = _apply_decision_rules(weather_data)
+
     # ÉTAPE 1.6: Construire le résumé
-    # - _build_weather_summary()
-    # - Inclure: rain_probability, temperature, wind_speed, conditions
-    
-    # ÉTAPE 1.7: Mettre en cache
-    # - cache.set(cache_key, response, ttl=CACHE_TTL_SECONDS)
-    
+    response = _build_decision_response(weather_data, decision, reasons, penalties)
+
+    # ÉTAPE 1.7: Mettre en cache (sauf décision stale: la prévision fraîche
+    # sera disponible dès la fin du rechargement)
+    if not response["stale"]:
+        cache.set(cache_key, response, ttl=CACHE_TTL_SECONDS)
+
     # ÉTAPE 1.8: Logger et retourner
-    # - Logger: "Weather decision: {}, reasons: {}"
-    # - Retourner WeatherResponse JSON
-    
-    # TODO: Implémenter
-    pass
+    logger.info(f"[{request_id}] Weather decision: {decision.value}, reasons: {reasons}")
+    return response
+
+
+# ÉTAPE: Endpoint batch - POST /weather/decisions:batch
+@app.post("/weather/decisions:batch")
+async def get_weather_decisions_batch(body: BatchWeatherRequest, request: Request = None):
+    """
+    ÉTAPE: Décisions météo pour plusieurs trajets en un appel
+
+    LOGIQUE:
+    1. Fenêtre temporelle et clé de cache de chaque trajet
+    2. Trajets déjà en cache: réponse directe
+    3. Autres trajets: tuiles distinctes chargées une seule fois (en parallèle)
+    4. Agrégation une fois par (tuile, créneaux), partagée entre trajets
+    5. Règles de décision appliquées à tous les trajets en une passe
+    6. Mise en cache de chaque décision
+
+    OUTPUT:
+    - decisions: dans l'ordre des trajets, même format que GET /weather/decision
+      (ou {"error": ...} si la météo d'un trajet n'a pas pu être obtenue)
+    """
+    request_id = request.state.request_id if request else "-"
+    trips = body.trips
+    decisions: List[Optional[dict]] = [None] * len(trips)
+
+    # ÉTAPE 1 et 2: Fenêtres, clés, cache
+    pending = []
+    for i, trip in enumerate(trips):
+        start_time = _parse_departure_time(trip.departure_time)
+        end_time = start_time + timedelta(minutes=trip.duration_minutes)
+        cache_key = _decision_cache_key(
+            trip.origin_lat, trip.origin_lon, trip.dest_lat, trip.dest_lon, start_time, end_time
+        )
+        cached = cache.get(cache_key)
+        cache_hits.record(quantizer.level, cached is not None)
+        if cached is not None:
+            decisions[i] = cached
+        else:
+            pending.append((i, trip, start_time, end_time, cache_key))
+
+    # ÉTAPE 3: Tuiles distinctes des trajets restants
+    points = {}
+    for _, trip, _, _, _ in pending:
+        for lat, lon in ((trip.origin_lat, trip.origin_lon), (trip.dest_lat, trip.dest_lon)):
+            points.setdefault(forecast_tiles.tile_of(lat, lon), (lat, lon))
+    tiles = list(points)
+    loaded = await asyncio.gather(
+        *(forecast_tiles.get_slots(lat, lon, request_id) for lat, lon in points.values()),
+        return_exceptions=True
+    )
+    slots_by_tile = dict(zip(tiles, loaded))
+
+    # ÉTAPE 4: Agrégation par (tuile, fenêtre)
+    windows = {}
+
+    def window_weather(lat: float, lon: float, start_time: datetime, end_time: datetime) -> dict:
+        tile = forecast_tiles.tile_of(lat, lon)
+        loaded_tile = slots_by_tile[tile]
+        if isinstance(loaded_tile, BaseException):
+            raise loaded_tile
+        slots, stale = loaded_tile
+        key = (tile, slot_of(start_time.timestamp()), slot_of(max(end_time.timestamp() - 1, start_time.timestamp())))
+        if key not in windows:
+            windows[key] = _aggregate_window(slots, start_time, end_time, stale)
+        return windows[key]
+
+    evaluated = []
+    for i, trip, start_time, end_time, cache_key in pending:
+        try:
+            weather_data = _worst_of(
+                window_weather(trip.origin_lat, trip.origin_lon, start_time, end_time),
+                window_weather(trip.dest_lat, trip.dest_lon, start_time, end_time),
+            )
+        except (HTTPException, RateLimited, CircuitOpen) as e:
+            if not isinstance(e, HTTPException):
+                e = _upstream_unavailable(e)
+            decisions[i] = {"error": e.detail}
+            continue
+        evaluated.append((i, cache_key, weather_data))
+
+    # ÉTAPE 5: Règles en une passe
+    results = _apply_decision_rules_batch([weather_data for _, _, weather_data in evaluated])
+
+    # ÉTAPE 6: Réponses et cache
+    for (i, cache_key, weather_data), (decision, reasons, penalties) in zip(evaluated, results):
+        response = _build_decision_response(weather_data, decision, reasons, penalties)
+        if not response["stale"]:
+            cache.set(cache_key, response, ttl=CACHE_TTL_SECONDS)
+        decisions[i] = response
+
+    logger.info(
+        f"[{request_id}] Weather batch: {len(trips)} trips, {len(trips) - len(pending)} cached, "
+        f"{len(tiles)} tiles, {len(windows)} windows"
+    )
+    return {"decisions": decisions}
+
+
+# ÉTAPE: Endpoint itinéraire - POST /weather/route
+@app.post("/weather/route")
+async def get_route_weather(body: RouteWeatherRequest, request: Request = None):
+    """
+    ÉTAPE: Météo par segment, alignée sur l'heure de passage
+
+    LOGIQUE:
+    1. Parcourir les segments dans l'ordre (heure d'entrée = fin du précédent)
+    2. Échantillonner chaque géométrie en (tuile, créneau de 3h) traversés
+    3. Charger chaque tuile distincte une seule fois (en parallèle)
+    4. Agréger par segment les créneaux traversés
+    5. Règles appliquées à tous les segments en une passe
+    6. Décision globale = pire segment actif (WALK / BIKE) ; pénalités
+       globales = moyennes pondérées par la durée des segments actifs
+
+    OUTPUT:
+    - decision, reasons, penalties, summary (même format que GET /weather/decision)
+    - segments: [{index, mode, decision, reasons, penalty, penalties, tiles}]
+      (penalty = pénalité du mode du segment, 0 pour TRANSIT / WAIT)
+    - tiles: nombre de tuiles distinctes évaluées
+    - stale: True si au moins une tuile a été servie expirée
+    """
+    request_id = request.state.request_id if request else "-"
+
+    # ÉTAPE 1 et 2: Échantillonnage
+    current_ts = _parse_departure_time(body.departure_time).timestamp()
+    sampled = []
+    for i, segment in enumerate(body.segments):
+        points = _segment_points(segment, i)
+        samples, current_ts = sample_segment(
+            points, current_ts, segment.duration_minutes * 60,
+            forecast_tiles.tile_of, forecast_tiles.tile_deg
+        )
+        sampled.append(samples)
+
+    # ÉTAPE 3: Tuiles distinctes (une requête au plus par tuile)
+    tiles = sorted({tile for samples in sampled for tile, _ in samples})
+    loaded = await asyncio.gather(
+        *(forecast_tiles.get_slots(*forecast_tiles.tile_center(tile), request_id) for tile in tiles),
+        return_exceptions=True
+    )
+    slots_by_tile = {}
+    stale_tiles = set()
+    for tile, loaded_tile in zip(tiles, loaded):
+        if isinstance(loaded_tile, (RateLimited, CircuitOpen)):
+            raise _upstream_unavailable(loaded_tile)
+        if isinstance(loaded_tile, BaseException):
+            raise loaded_tile
+        slots_by_tile[tile], stale = loaded_tile
+        if stale:
+            stale_tiles.add(tile)
+
+    # ÉTAPE 4: Agrégation par segment
+    segment_weather = [
+        dict(
+            _aggregate_periods([_nearest_slot(slots_by_tile[tile], slot) for tile, slot in sorted(samples)]),
+            stale=any(tile in stale_tiles for tile, _ in samples),
+        )
+        for samples in sampled
+    ]
+
+    # ÉTAPE 5: Règles en une passe
+    results = _apply_decision_rules_batch(segment_weather, {"avoid_rain": body.avoid_rain})
+
+    # ÉTAPE 6: Synthèse
+    segments = []
+    active = []
+    for i, (segment, samples, (decision, reasons, penalties)) in enumerate(zip(body.segments, sampled, results)):
+        mode = segment.mode.upper()
+        penalty = {"WALK": penalties["walk_penalty"], "BIKE": penalties["bike_penalty"]}.get(mode, 0.0)
+        segments.append({
+            "index": i,
+            "mode": mode,
+            "decision": decision.value,
+            "reasons": reasons,
+            "penalty": penalty,
+            "penalties": penalties,
+            "tiles": len({tile for tile, _ in samples}),
+        })
+        if mode in ("WALK", "BIKE"):
+            active.append(i)
+    considered = active or list(range(len(segments)))
+    worst = max(considered, key=lambda i: DECISIONS.index(results[i][0].value))
+    weights = [body.segments[i].duration_minutes for i in considered]
+    if not sum(weights):
+        weights = [1.0] * len(considered)
+    penalties = {
+        key: round(sum(results[i][2][key] * w for i, w in zip(considered, weights)) / sum(weights), 3)
+        for key in ("walk_penalty", "bike_penalty")
+    }
+    reasons = []
+    for i in considered:
+        reasons.extend(reason for reason in results[i][1] if reason not in reasons)
+
+    logger.info(
+        f"[{request_id}] Route weather: {len(segments)} segments, {len(tiles)} tiles, "
+        f"decision {results[worst][0].value}"
+    )
+    return {
+        "decision": results[worst][0].value,
+        "reasons": reasons,
+        "penalties": penalties,
+        "summary": _build_weather_summary(
+            _aggregate_periods([segment_weather[i] for i in considered])
+        ),
+        "segments": segments,
+        "tiles": len(tiles),
+        "stale": bool(stale_tiles),
+    }
+
+
+def _segment_points(segment: RouteSegmentInput, index: int) -> List[tuple]:
+    """Géométrie décodée du segment, ou ligne from -> to"""
+    if segment.geometry:
+        try:
+            points = polyline.decode(segment.geometry)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid geometry for segment {index}")
+        if points:
+            return points
+    ends = [p for p in (segment.from_location, segment.to_location) if p is not None]
+    if not ends:
+        raise HTTPException(status_code=400, detail=f"Segment {index} has neither geometry nor from/to")
+    return [(p.lat, p.lon) for p in ends]
+
+
+def _decision_cache_key(
+    origin_lat: float,
+    origin_lon: float,
+    dest_lat: float,
+    dest_lon: float,
+    start_time: datetime,
+    end_time: datetime
+) -> str:
+    """Clé quantifiée: cellules origine/destination + créneaux de départ/arrivée"""
+    return (
+        f"weather_{quantizer.cell(origin_lat, origin_lon)}_{quantizer.cell(dest_lat, dest_lon)}"
+        f"_{quantizer.time_bucket(start_time)}_{quantizer.time_bucket(end_time)}"
+    )
+
+
+def _build_decision_response(
+    weather_data: dict,
+    decision: "WeatherDecision",
+    reasons: List[str],
+    penalties: dict
+) -> dict:
+    """Réponse d'une décision (format de GET /weather/decision)"""
+    return {
+        "decision": decision.value,
+        "reasons": reasons,
+        "penalties": penalties,
+        "summary": _build_weather_summary(weather_data),
+        "stale": weather_data.get("stale", False),
+    }
+
+
+def _upstream_unavailable(error: Exception) -> HTTPException:
+    """503 pour un appel à l'API météo refusé (limite de débit, disjoncteur ouvert)"""
+    if isinstance(error, CircuitOpen):
+        return HTTPException(status_code=503, detail="Weather API circuit open")
+    return HTTPException(status_code=503, detail="Weather API rate limit reached")
+
+
+def _parse_departure_time(departure_time: str) -> datetime:
+    """Parser "now" ou ISO 8601 (heure locale naïve, comme datetime.now())"""
+    if not departure_time or departure_time == "now":
+        return datetime.now()
+    try:
+        parsed = datetime.fromisoformat(departure_time.replace("Z", "+00:00"))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid departure_time: {departure_time}")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+
+def _worst_of(first: dict, second: dict) -> dict:
+    """Combiner deux points: pire pluie / vent, température moyenne, alertes cumulées (stale si l'un l'est)"""
+    worst = first if first["rain_intensity_mmh"] >= second["rain_intensity_mmh"] else second
+    return {
+        "rain_probability": max(first["rain_probability"], second["rain_probability"]),
+        "rain_intensity_mmh": worst["rain_intensity_mmh"],
+        "temperature_c": (first["temperature_c"] + second["temperature_c"]) / 2,
+        "wind_speed_kmh": max(first["wind_speed_kmh"], second["wind_speed_kmh"]),
+        "conditions": worst["conditions"],
+        "alerts": first["alerts"] + [a for a in second["alerts"] if a not in first["alerts"]],
+        "stale": first.get("stale", False) or second.get("stale", False),
+    }
 
 
 async def _fetch_weather_data(
@@ -168,67 +597,123 @@ async def _fetch_weather_data(
     request_id: str
 ) -> dict:
     """
-    ÉTAPE 2.1: Obtenir les données météo depuis l'API externe
+    ÉTAPE 2.1: Obtenir les données météo pour un point et une fenêtre
     
     LOGIQUE:
-    - Appeler l'API météo (ex: OpenWeatherMap, Weather API)
-    - Obtenir prévisions pour la fenêtre temporelle
-    - Parser et extraire:
+    - Créneaux de 3h de la tuile contenant le point (cache de tuiles,
+      l'API n'est appelée que pour une tuile absente ou périmée ; une tuile
+      périmée est servie stale pendant son rechargement)
+    - Agréger les créneaux qui chevauchent [start_time, end_time]:
       * Probabilité de pluie
       * Intensité de pluie (mm/h)
       * Température
       * Vitesse du vent
       * Conditions générales
       * Alertes officielles
-    
+    """
+    try:
+        slots, stale = await forecast_tiles.get_slots(lat, lon, request_id)
+    except (RateLimited, CircuitOpen) as e:
+        error = _upstream_unavailable(e)
+        logger.warning(f"[{request_id}] {error.detail} for ({lat},{lon})")
+        raise error
+    return _aggregate_window(slots, start_time, end_time, stale)
+
+
+def _aggregate_window(
+    slots: Dict[int, dict],
+    start_time: datetime,
+    end_time: datetime,
+    stale: bool = False
+) -> dict:
+    """
+    ÉTAPE 2.1.4: Agréger les créneaux d'une fenêtre temporelle
+
+    LOGIQUE:
+    - Créneaux qui chevauchent [start_time, end_time]
+    - À défaut (fenêtre hors prévisions), le créneau le plus proche
+    - rain_probability / temperature: moyennes ; rain_intensity / wind: max
+    - conditions: la plus fréquente
+    - stale: la série de la tuile était expirée
+    """
+    if not slots:
+        raise HTTPException(status_code=503, detail="Weather API returned no forecast")
+    first = slot_of(start_time.timestamp())
+    last = slot_of(max(end_time.timestamp() - 1, start_time.timestamp()))
+    window = [slots[slot] for slot in range(first, last + 1) if slot in slots]
+    if not window:
+        window = [_nearest_slot(slots, first)]
+    return dict(_aggregate_periods(window), stale=stale)
+
+
+def _nearest_slot(slots: Dict[int, dict], slot: int) -> dict:
+    """Créneau demandé, ou le plus proche disponible (fenêtre hors prévisions)"""
+    if slot in slots:
+        return slots[slot]
+    if not slots:
+        raise HTTPException(status_code=503, detail="Weather API returned no forecast")
+    return slots[min(slots, key=lambda candidate: abs(candidate - slot))]
+
+
+def _aggregate_periods(window: List[dict]) -> dict:
+    """Moyennes (probabilité, température), max (pluie, vent), condition la plus fréquente, stale si l'une l'est"""
+    # Pas d'alertes officielles dans l'API forecast (One Call seulement)
+    return {
+        "rain_probability": sum(p["rain_probability"] for p in window) / len(window),
+        "rain_intensity_mmh": max(p["rain_intensity_mmh"] for p in window),
+        "temperature_c": sum(p["temperature_c"] for p in window) / len(window),
+        "wind_speed_kmh": max(p["wind_speed_kmh"] for p in window),
+        "conditions": Counter(p["conditions"] for p in window).most_common(1)[0][0],
+        "alerts": [],
+        "stale": any(p.get("stale", False) for p in window),
+    }
+
+
+async def _fetch_forecast_series(lat: float, lon: float, request_id: str) -> Dict[int, dict]:
+    """
+    ÉTAPE 2.1.1: Obtenir la série de prévisions depuis l'API externe
+
+    LOGIQUE:
+    - Appeler l'API météo (OpenWeatherMap forecast: 5 jours, pas de 3h)
+    - Un appel par tuile (au centre de la tuile)
+    - Retourner {créneau: période normalisée}
+
     API SUGGÉRÉES:
     - OpenWeatherMap (gratuit avec limites)
     - WeatherAPI.com
     - Météo France API
     """
-    
-    # ÉTAPE 2.1.1: Construire la requête API
-    # - URL: ex. "https://api.openweathermap.org/data/2.5/forecast"
-    # - Params:
-    #   * lat, lon
-    #   * appid: WEATHER_API_KEY
-    #   * units: metric
-    
-    # ÉTAPE 2.1.2: Envoyer la requête
-    # - async with httpx.AsyncClient() as client:
-    # - response = await client.get(url, params=params, timeout=3.0)
-    
+    params = {
+        "lat": round(lat, 4),
+        "lon": round(lon, 4),
+        "appid": WEATHER_API_KEY,
+        "units": "metric",
+        "lang": "fr",
+    }
+
+    # ÉTAPE 2.1.2: Envoyer la requête (client partagé, keep-alive)
+    try:
+        response = await app.state.http_client.get(WEATHER_API_URL, params=params)
+        response.raise_for_status()
+        data = response.json()
+    except (httpx.HTTPError, ValueError) as e:
+        logger.error(f"[{request_id}] Weather API call failed for ({lat},{lon}): {e}")
+        raise HTTPException(status_code=503, detail="Weather API unavailable")
+
     # ÉTAPE 2.1.3: Parser la réponse
-    # - data = response.json()
-    # - Extraire les prévisions pour la fenêtre temporelle
-    # - Pour chaque période (ex: 3h):
-    #   * Vérifier si overlap avec [start_time, end_time]
-    #   * Extraire météo
-    
-    # ÉTAPE 2.1.4: Agréger les données
-    # - Calculer moyennes/max pour la fenêtre
-    # - rain_probability: moyenne des probabilités
-    # - rain_intensity: max des intensités
-    # - temperature: moyenne
-    # - wind_speed: max
-    # - conditions: condition la plus fréquente
-    
-    # ÉTAPE 2.1.5: Vérifier les alertes
-    # - Si l'API fournit des alertes (alerts[])
-    # - Extraire event, severity, description
-    
-    # ÉTAPE 2.1.6: Retourner dict normalisé
-    # - {
-    #     'rain_probability': 0.45,  # 0-1
-    #     'rain_intensity_mmh': 5.2,
-    #     'temperature_c': 12.5,
-    #     'wind_speed_kmh': 25.0,
-    #     'conditions': 'light rain',
-    #     'alerts': [...]
-    #   }
-    
-    # TODO: Implémenter
-    pass
+    return {slot_of(item["dt"]): _parse_forecast_period(item) for item in data.get("list", [])}
+
+
+def _parse_forecast_period(item: dict) -> dict:
+    """Normaliser une période de prévision OpenWeatherMap (3h)"""
+    weather = item.get("weather") or [{}]
+    return {
+        "rain_probability": float(item.get("pop", 0.0)),
+        "rain_intensity_mmh": float((item.get("rain") or {}).get("3h", 0.0)) / FORECAST_PERIOD_HOURS,
+        "temperature_c": float(item.get("main", {}).get("temp", 0.0)),
+        "wind_speed_kmh": float(item.get("wind", {}).get("speed", 0.0)) * 3.6,
+        "conditions": weather[0].get("description", ""),
+    }
 
 
 def _apply_decision_rules(
@@ -266,38 +751,33 @@ def _apply_decision_rules(
        - walk_penalty = (rain_intensity / 20) * 0.5 + (wind_speed / 100) * 0.3
        - bike_penalty = walk_penalty * 1.5 (vélo plus sensible)
        - Clamp entre 0 et 1
+
+    Seuils et poids: rules.json (WEATHER_RULES_FILE), rechargé à chaud
     """
     
-    # ÉTAPE 2.2.1: Initialiser
-    decision = WeatherDecision.OK
-    reasons = []
-    walk_penalty = 0.0
-    bike_penalty = 0.0
-    
-    # ÉTAPE 2.2.2: Vérifier alertes officielles
-    # - Si alerts et severity == "severe":
-    #   * decision = BLOCK
-    #   * reasons.append("Alerte météo sévère")
-    
-    # ÉTAPE 2.2.3: Vérifier pluie
-    # - Appliquer les règles ci-dessus
-    # - Mettre à jour decision et reasons
-    
-    # ÉTAPE 2.2.4: Vérifier vent
-    # - Appliquer les règles
-    
-    # ÉTAPE 2.2.5: Vérifier température
-    # - Appliquer les règles
-    
-    # ÉTAPE 2.2.6: Calculer pénalités
-    # - Formules ci-dessus
-    # - Clamp à [0, 1]
-    
-    # ÉTAPE 2.2.7: Retourner
-    # - return (decision, reasons, {'walk_penalty': walk_penalty, 'bike_penalty': bike_penalty})
-    
-    # TODO: Implémenter
-    pass
+    # ÉTAPE 2.2.1 à 2.2.7: Moteur de règles (seuils et pénalités dans rules.json)
+    return _apply_decision_rules_batch([weather_data], user_preferences)[0]
+
+
+def _apply_decision_rules_batch(
+    weather_list: List[dict],
+    user_preferences: Optional[dict] = None
+) -> List[tuple]:
+    """
+    ÉTAPE 2.2 (batch): Appliquer les règles à plusieurs fenêtres en une passe
+
+    LOGIQUE:
+    - Évaluation vectorisée par le moteur de règles (rechargé à chaud)
+
+    RETURN: [(decision, reasons, penalties)] dans l'ordre de weather_list
+    """
+    strict = (user_preferences or {}).get("avoid_rain") == "strict"
+    return [
+        (WeatherDecision(decision), reasons, penalties)
+        for decision, reasons, penalties in rules_engine.evaluate(
+            weather_list, [strict] * len(weather_list) if strict else None
+        )
+    ]
 
 
 def _build_weather_summary(weather_data: dict) -> dict:
@@ -313,14 +793,16 @@ def _build_weather_summary(weather_data: dict) -> dict:
     """
     
     # ÉTAPE: Construire le dict
-    # - rain_probability: int (%)
-    # - temperature: float (°C)
-    # - wind_speed_kmh: float
-    # - conditions: string (ex: "Nuageux avec pluie légère")
-    # - alerts: liste de strings
-    
-    # TODO: Implémenter
-    pass
+    return {
+        "rain_probability": int(round(weather_data["rain_probability"] * 100)),
+        "temperature": round(weather_data["temperature_c"], 1),
+        "wind_speed_kmh": round(weather_data["wind_speed_kmh"], 1),
+        "conditions": (weather_data["conditions"] or "").capitalize(),
+        "alerts": [
+            alert.get("event", str(alert)) if isinstance(alert, dict) else str(alert)
+            for alert in weather_data.get("alerts", [])
+        ],
+    }
 
 
 @app.get("/weather/current")
@@ -337,9 +819,11 @@ async def get_current_weather(
     - Retourner les données brutes
     - Utile pour tests
     """
-    
-    # TODO: Implémenter
-    pass
+    request_id = request.state.request_id if request else "-"
+    now = datetime.now()
+    return await _fetch_weather_data(
+        lat, lon, now, now + timedelta(hours=FORECAST_PERIOD_HOURS), request_id
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,70 @@
+"""
+Modèles de données pour le Weather Service
+
+LOGIQUE:
+- Définir les structures Pydantic des requêtes POST
+- Assurer la cohérence avec les contrats REST (mêmes champs que GET /weather/decision)
+"""
+
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+MAX_BATCH_TRIPS = 100
+
+
+class TripWeatherRequest(BaseModel):
+    """Un trajet à évaluer"""
+    origin_lat: float = Field(..., ge=-90, le=90)
+    origin_lon: float = Field(..., ge=-180, le=180)
+    dest_lat: float = Field(..., ge=-90, le=90)
+    dest_lon: float = Field(..., ge=-180, le=180)
+    departure_time: str = "now"  # ISO 8601 ou "now"
+    duration_minutes: int = Field(..., gt=0)
+
+
+class BatchWeatherRequest(BaseModel):
+    """
+    Requête de décisions météo groupées
+
+    LOGIQUE:
+    - Les décisions sont retournées dans l'ordre des trajets
+    """
+    trips: List[TripWeatherRequest] = Field(..., min_length=1, max_length=MAX_BATCH_TRIPS)
+
+
+MAX_ROUTE_SEGMENTS = 50
+
+
+class RoutePoint(BaseModel):
+    """Coordonnées d'un point"""
+    lat: float = Field(..., ge=-90, le=90)
+    lon: float = Field(..., ge=-180, le=180)
+
+
+class RouteSegmentInput(BaseModel):
+    """
+    Segment d'itinéraire (mêmes champs que Segment du Health Planner)
+
+    LOGIQUE:
+    - geometry: polyline encodée (précision 5) ; à défaut, ligne from -> to
+    """
+    mode: str = "WALK"  # WALK / BIKE / TRANSIT / WAIT
+    from_location: Optional[RoutePoint] = Field(None, alias="from")
+    to_location: Optional[RoutePoint] = Field(None, alias="to")
+    duration_minutes: float = Field(..., ge=0)
+    geometry: Optional[str] = None
+
+    class Config:
+        populate_by_name = True
+
+
+class RouteWeatherRequest(BaseModel):
+    """
+    Requête d'évaluation météo le long d'un itinéraire
+
+    LOGIQUE:
+    - Les segments sont parcourus dans l'ordre à partir de departure_time
+    """
+    departure_time: str = "now"  # ISO 8601 ou "now"
+    segments: List[RouteSegmentInput] = Field(..., min_length=1, max_length=MAX_ROUTE_SEGMENTS)
+    avoid_rain: Optional[str] = None  # "strict" / "flexible"
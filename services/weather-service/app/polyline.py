@@ -0,0 +1,40 @@
+"""
+Décodage des polylines encodées (format Google / OSRM, précision 5)
+
+LOGIQUE:
+- Chaque coordonnée est un delta par rapport au point précédent,
+  multiplié par 10^precision, encodé en base64 par blocs de 5 bits
+"""
+
+from typing import List, Tuple
+
+
+def decode(encoded: str, precision: int = 5) -> List[Tuple[float, float]]:
+    """
+    ÉTAPE: Décoder une polyline en liste de (lat, lon)
+
+    LOGIQUE:
+    - ValueError si la chaîne est tronquée
+    """
+    factor = 10 ** precision
+    points = []
+    index, lat, lon = 0, 0, 0
+    length = len(encoded)
+    while index < length:
+        deltas = []
+        for _ in range(2):
+            result, shift = 0, 0
+            while True:
+                if index >= length:
+                    raise ValueError("Truncated polyline")
+                byte = ord(encoded[index]) - 63
+                index += 1
+                result |= (byte & 0x1F) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += deltas[0]
+        lon += deltas[1]
+        points.append((lat / factor, lon / factor))
+    return points
@@ -0,0 +1,151 @@
+"""
+Préchargement proactif des tuiles de prévisions (zone de Nantes Métropole)
+
+LOGIQUE:
+- Le trafic est concentré sur une zone connue: ses tuiles sont gardées
+  chaudes par une tâche de fond, les requêtes ne paient jamais la latence
+  de l'API météo
+- À chaque cycle, les tuiles absentes ou proches de l'expiration sont
+  rechargées, les plus anciennes d'abord
+- Chaque chargement passe par le token bucket avec une réserve: le
+  préchargement ne consomme jamais les derniers jetons (requêtes utilisateur)
+- Chargements partagés avec les requêtes (ForecastTileCache.prefetch): une
+  tuile déjà en cours de chargement n'est pas redemandée à l'API
+- Disjoncteur ouvert (API en panne): le cycle s'arrête, les tuiles restent
+  servies stale jusqu'au cycle suivant
+- Métriques de fraîcheur: tuiles chaudes, âge max / moyen, durée du cycle
+"""
+
+import asyncio
+import logging
+import time
+from typing import List, Optional, Tuple
+
+from .circuit_breaker import CircuitOpen
+from .forecast_tiles import ForecastTileCache
+
+logger = logging.getLogger(__name__)
+
+BoundingBox = Tuple[float, float, float, float]  # (lat_min, lon_min, lat_max, lon_max)
+
+
+class ForecastPrefetcher:
+    """
+    Tâche de fond qui maintient les tuiles d'une zone en cache
+    """
+
+    def __init__(
+        self,
+        tiles: ForecastTileCache,
+        bbox: BoundingBox,
+        interval_seconds: float = 60,
+        refresh_ahead_seconds: float = 300,
+        token_reserve: int = 2
+    ):
+        """
+        ÉTAPE: Initialiser
+
+        LOGIQUE:
+        - Tuiles de la zone calculées une fois (résolution = celle du cache)
+        - refresh_ahead_seconds: recharger une tuile dont il reste moins
+          que ce délai avant expiration
+        - token_reserve: jetons laissés aux requêtes utilisateur
+        """
+        self.tiles = tiles
+        self.bbox = bbox
+        self.interval_seconds = interval_seconds
+        self.refresh_ahead_seconds = refresh_ahead_seconds
+        self.token_reserve = token_reserve
+        lat_min, lon_min, lat_max, lon_max = bbox
+        row_min, col_min = tiles.tile_of(lat_min, lon_min)
+        row_max, col_max = tiles.tile_of(lat_max, lon_max)
+        self.area: List[Tuple[int, int]] = [
+            (row, col)
+            for row in range(row_min, row_max + 1)
+            for col in range(col_min, col_max + 1)
+        ]
+        self._task: Optional[asyncio.Task] = None
+        self.cycles = 0
+        self.loads = 0
+        self.failures = 0
+        self.last_cycle_at: Optional[float] = None
+        self.last_cycle_seconds: Optional[float] = None
+
+    async def start(self):
+        """ÉTAPE: Lancer la boucle (appelé par le lifespan, premier cycle immédiat)"""
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Forecast prefetch started for {len(self.area)} tiles in {self.bbox}")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self):
+        while True:
+            await self.run_once()
+            await asyncio.sleep(self.interval_seconds)
+
+    async def run_once(self):
+        """
+        ÉTAPE: Un cycle de préchargement
+
+        LOGIQUE:
+        - Âge de chaque tuile de la zone (absente = infiniment vieille)
+        - Recharger, des plus anciennes aux plus récentes, celles qui
+          expirent avant refresh_ahead_seconds
+        - Une erreur sur une tuile n'arrête pas le cycle (sauf disjoncteur ouvert)
+        """
+        started = time.time()
+        stale_after = self.tiles.ttl_seconds - self.refresh_ahead_seconds
+        due = []
+        for tile in self.area:
+            age = self._age(tile, started)
+            if age is None or age >= stale_after:
+                due.append((-(age if age is not None else float("inf")), tile))
+        due.sort()
+
+        for _, tile in due:
+            try:
+                await self.tiles.prefetch(tile, "prefetch", reserve=self.token_reserve)
+                self.loads += 1
+            except asyncio.CancelledError:
+                raise
+            except CircuitOpen:
+                self.failures += 1
+                logger.warning("Forecast prefetch cycle interrupted: weather API circuit open")
+                break
+            except Exception as e:
+                self.failures += 1
+                logger.warning(f"Forecast prefetch failed for tile {tile}: {e}")
+
+        self.cycles += 1
+        self.last_cycle_at = time.time()
+        self.last_cycle_seconds = round(self.last_cycle_at - started, 3)
+        if due:
+            logger.debug(f"Forecast prefetch cycle: {len(due)} tiles refreshed in {self.last_cycle_seconds}s")
+
+    def _age(self, tile: Tuple[int, int], now: float) -> Optional[float]:
+        entry = self.tiles.peek(tile)
+        return now - entry["fetched_at"] if entry is not None else None
+
+    def get_stats(self) -> dict:
+        """Retourner la fraîcheur de la zone (pour /metrics)"""
+        now = time.time()
+        ages = [age for age in (self._age(tile, now) for tile in self.area) if age is not None]
+        return {
+            "bbox": list(self.bbox),
+            "tiles": len(self.area),
+            "tiles_warm": len(ages),
+            "max_age_seconds": round(max(ages), 1) if ages else None,
+            "mean_age_seconds": round(sum(ages) / len(ages), 1) if ages else None,
+            "interval_seconds": self.interval_seconds,
+            "cycles": self.cycles,
+            "loads": self.loads,
+            "failures": self.failures,
+            "seconds_since_cycle": round(now - self.last_cycle_at, 1) if self.last_cycle_at else None,
+            "last_cycle_seconds": self.last_cycle_seconds,
+        }
@@ -0,0 +1,78 @@
+"""
+Limiteur de débit (token bucket) pour l'API météo externe
+
+LOGIQUE:
+- `rate_per_second` jetons ajoutés en continu, au plus `capacity` en réserve
+- Chaque appel à l'API consomme un jeton ; sans jeton, on attend le suivant
+- `reserve`: un appelant de basse priorité (préchargement) ne prend un jeton
+  que s'il en reste au moins `reserve` après lui, pour les requêtes utilisateur
+- `timeout`: un appelant pressé échoue (RateLimited) plutôt que d'attendre
+"""
+
+import asyncio
+import time
+from typing import Optional
+
+
+class RateLimited(Exception):
+    """Aucun jeton disponible avant l'échéance"""
+    pass
+
+
+class TokenBucket:
+    """
+    Seau à jetons partagé par tous les appels à l'API
+    """
+
+    def __init__(self, rate_per_second: float, capacity: int):
+        self.rate_per_second = rate_per_second
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self._updated_at = time.monotonic()
+        self.granted = 0
+        self.waited = 0
+        self.rejected = 0
+
+    def _refill(self) -> float:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated_at) * self.rate_per_second)
+        self._updated_at = now
+        return now
+
+    async def acquire(self, reserve: int = 0, timeout: Optional[float] = None):
+        """
+        ÉTAPE: Prendre un jeton
+
+        LOGIQUE:
+        - Disponible (au-delà de la réserve): le prendre immédiatement
+        - Sinon: dormir le temps de la recharge manquante, puis réessayer
+        - Échéance dépassée: RateLimited
+        """
+        needed = 1 + min(reserve, self.capacity - 1)
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        waited = False
+        while True:
+            now = self._refill()
+            if self.tokens >= needed:
+                self.tokens -= 1
+                self.granted += 1
+                self.waited += waited
+                return
+            delay = (needed - self.tokens) / self.rate_per_second
+            if deadline is not None and now + delay > deadline:
+                self.rejected += 1
+                raise RateLimited(f"No upstream token within {timeout}s")
+            waited = True
+            await asyncio.sleep(delay)
+
+    def get_stats(self) -> dict:
+        """Retourner l'état du seau (pour /metrics)"""
+        self._refill()
+        return {
+            "rate_per_second": self.rate_per_second,
+            "capacity": self.capacity,
+            "tokens": round(self.tokens, 2),
+            "granted": self.granted,
+            "waited": self.waited,
+            "rejected": self.rejected,
+        }
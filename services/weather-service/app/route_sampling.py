@@ -0,0 +1,65 @@
+"""
+Échantillonnage d'un itinéraire en (tuile, créneau) alignés dans le temps
+
+LOGIQUE:
+- Chaque segment est parcouru le long de sa géométrie ; l'heure de passage
+  en un point est interpolée sur la distance parcourue dans le segment
+- Les arêtes plus longues qu'une demi-tuile sont subdivisées: aucune tuile
+  traversée n'est sautée
+- Un segment se résume à l'ensemble des (tuile, créneau de 3h) traversés:
+  le coût de l'évaluation dépend du nombre de tuiles distinctes, pas du
+  nombre de points de la géométrie
+"""
+
+import math
+from typing import Callable, List, Set, Tuple
+
+from .forecast_tiles import slot_of
+
+Tile = Tuple[int, int]
+TileSlot = Tuple[Tile, int]
+
+
+def _distance_m(a: Tuple[float, float], b: Tuple[float, float]) -> float:
+    """Distance équirectangulaire (suffisante à l'échelle d'une arête)"""
+    mean_lat = math.radians((a[0] + b[0]) / 2)
+    dy = (b[0] - a[0]) * 111_320.0
+    dx = (b[1] - a[1]) * 111_320.0 * math.cos(mean_lat)
+    return math.hypot(dx, dy)
+
+
+def sample_segment(
+    points: List[Tuple[float, float]],
+    start_ts: float,
+    duration_seconds: float,
+    tile_of: Callable[[float, float], Tile],
+    tile_deg: float
+) -> Tuple[Set[TileSlot], float]:
+    """
+    ÉTAPE: (tuile, créneau) traversés par un segment
+
+    INPUT:
+    - points: géométrie décodée (au moins un point)
+    - start_ts: timestamp d'entrée dans le segment
+
+    RETURN: (ensemble des (tuile, créneau), timestamp de sortie)
+    """
+    end_ts = start_ts + duration_seconds
+    if len(points) == 1:
+        tile = tile_of(*points[0])
+        return {(tile, slot) for slot in range(slot_of(start_ts), slot_of(end_ts) + 1)}, end_ts
+
+    lengths = [_distance_m(a, b) for a, b in zip(points, points[1:])]
+    total = sum(lengths)
+    samples: Set[TileSlot] = set()
+    travelled = 0.0
+    for (a, b), length in zip(zip(points, points[1:]), lengths):
+        steps = max(1, math.ceil(max(abs(b[0] - a[0]), abs(b[1] - a[1])) / (tile_deg / 2)))
+        for step in range(steps + 1):
+            ratio = step / steps
+            lat = a[0] + (b[0] - a[0]) * ratio
+            lon = a[1] + (b[1] - a[1]) * ratio
+            progress = (travelled + length * ratio) / total if total > 0 else 0.0
+            samples.add((tile_of(lat, lon), slot_of(start_ts + duration_seconds * progress)))
+        travelled += length
+    return samples, end_ts
@@ -0,0 +1,264 @@
+"""
+Moteur de règles météo vectorisé (NumPy), piloté par un fichier de config
+
+LOGIQUE:
+- Les seuils (rules.json) sont compilés en tableaux: colonne de la
+  variable, opérateur, seuil, sévérité, groupe
+- Une évaluation traite N fenêtres d'un coup: matrice (N x variables),
+  comparaisons (N x règles) vectorisées
+- Dans un groupe (alerte, pluie, vent, température) les règles sont un
+  if / elif: seule la première qui se déclenche compte
+- Décision = sévérité max des règles retenues ; pénalités = combinaison
+  linéaire des variables, bornée à [0, 1]
+- Rechargement à chaud: le fichier est re-lu quand sa date de
+  modification change (vérifiée au plus toutes les `check_interval_seconds`) ;
+  une config invalide est ignorée et les règles courantes restent actives
+
+FORMAT (rules.json):
+- rules: [{group, field, op (> >= < <=), value, strict_value?, decision, reason}]
+  (strict_value: seuil utilisé quand avoid_rain == "strict")
+- penalties: {walk_weights: {variable: poids}, bike_multiplier}
+"""
+
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DECISIONS = ["OK", "WARNING", "BLOCK"]  # Index = sévérité
+FIELDS = ["rain_probability", "rain_intensity_mmh", "temperature_c", "wind_speed_kmh", "alert_severity"]
+ALERT_SEVERITY = {"moderate": 1, "severe": 2}
+
+_OPS = {
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "<": np.less,
+    "<=": np.less_equal,
+}
+
+
+@dataclass(frozen=True)
+class CompiledRules:
+    """Règles compilées en tableaux (une version immuable par chargement)"""
+    version: int
+    columns: np.ndarray          # (R,) colonne de FIELDS
+    thresholds: np.ndarray       # (R,)
+    strict_thresholds: np.ndarray  # (R,)
+    severities: np.ndarray       # (R,)
+    op_groups: List[Tuple[np.ufunc, np.ndarray]]  # (opérateur, indices des règles)
+    groups: List[np.ndarray]     # indices des règles de chaque groupe, dans l'ordre du fichier
+    reasons: List[str]
+    walk_weights: np.ndarray     # (F,)
+    bike_multiplier: float
+
+
+def compile_rules(config: dict, version: int) -> CompiledRules:
+    """
+    ÉTAPE: Compiler la config en tableaux
+
+    LOGIQUE:
+    - Valider chaque règle (variable, opérateur, décision connus)
+    - ValueError si la config est invalide
+    """
+    rules = config.get("rules")
+    if not isinstance(rules, list) or not rules:
+        raise ValueError("rules must be a non-empty list")
+    columns, thresholds, strict_thresholds, severities, reasons, ops = [], [], [], [], [], []
+    group_index: Dict[str, List[int]] = {}
+    for i, rule in enumerate(rules):
+        try:
+            columns.append(FIELDS.index(rule["field"]))
+            if rule["op"] not in _OPS:
+                raise ValueError(f"unknown operator {rule['op']}")
+            ops.append(rule["op"])
+            thresholds.append(float(rule["value"]))
+            strict_thresholds.append(float(rule.get("strict_value", rule["value"])))
+            severities.append(DECISIONS.index(rule["decision"]))
+            reasons.append(str(rule["reason"]))
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"invalid rule #{i}: {e}") from e
+        group_index.setdefault(rule.get("group", f"rule{i}"), []).append(i)
+
+    penalties = config.get("penalties", {})
+    walk_weights = np.zeros(len(FIELDS))
+    for field, weight in penalties.get("walk_weights", {}).items():
+        if field not in FIELDS:
+            raise ValueError(f"unknown penalty field {field}")
+        walk_weights[FIELDS.index(field)] = float(weight)
+
+    ops_array = np.array(ops)
+    return CompiledRules(
+        version=version,
+        columns=np.array(columns, dtype=np.intp),
+        thresholds=np.array(thresholds),
+        strict_thresholds=np.array(strict_thresholds),
+        severities=np.array(severities, dtype=np.int8),
+        op_groups=[(_OPS[op], np.nonzero(ops_array == op)[0]) for op in _OPS if (ops_array == op).any()],
+        groups=[np.array(indices, dtype=np.intp) for indices in group_index.values()],
+        reasons=reasons,
+        walk_weights=walk_weights,
+        bike_multiplier=float(penalties.get("bike_multiplier", 1.5)),
+    )
+
+
+def features_matrix(weather_list: Sequence[dict]) -> np.ndarray:
+    """
+    ÉTAPE: Construire la matrice (N x FIELDS) depuis des dicts weather_data
+
+    LOGIQUE:
+    - alert_severity = sévérité max des alertes (0 sans alerte)
+    """
+    features = np.empty((len(weather_list), len(FIELDS)))
+    for i, weather_data in enumerate(weather_list):
+        features[i, 0] = weather_data["rain_probability"]
+        features[i, 1] = weather_data["rain_intensity_mmh"]
+        features[i, 2] = weather_data["temperature_c"]
+        features[i, 3] = weather_data["wind_speed_kmh"]
+        features[i, 4] = max(
+            (ALERT_SEVERITY.get(alert.get("severity"), 0)
+             for alert in weather_data.get("alerts", []) if isinstance(alert, dict)),
+            default=0,
+        )
+    return features
+
+
+class RulesEngine:
+    """
+    Évaluation vectorisée des règles, rechargeables à chaud
+    """
+
+    def __init__(self, path: str, check_interval_seconds: float = 5.0):
+        """
+        ÉTAPE: Charger les règles
+
+        LOGIQUE:
+        - Une config invalide au démarrage est une erreur (ValueError)
+        """
+        self.path = path
+        self.check_interval_seconds = check_interval_seconds
+        self._mtime = os.stat(path).st_mtime
+        self._checked_at = time.monotonic()
+        self.rules = compile_rules(self._read(), version=1)
+        self.reloads = 0
+        self.reload_errors = 0
+        self.evaluated = 0
+
+    def _read(self) -> dict:
+        with open(self.path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def maybe_reload(self):
+        """
+        ÉTAPE: Recharger si le fichier a changé
+
+        LOGIQUE:
+        - Au plus un stat() toutes les check_interval_seconds
+        - Remplacement atomique de self.rules ; en cas d'erreur, garder l'ancien
+        """
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval_seconds:
+            return
+        self._checked_at = now
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError as e:
+            logger.error(f"Cannot stat rules file {self.path}: {e}")
+            return
+        if mtime == self._mtime:
+            return
+        self._mtime = mtime
+        try:
+            self.rules = compile_rules(self._read(), version=self.rules.version + 1)
+        except (OSError, ValueError) as e:
+            self.reload_errors += 1
+            logger.error(f"Invalid rules file {self.path}, keeping v{self.rules.version}: {e}")
+            return
+        self.reloads += 1
+        logger.info(f"Weather rules reloaded from {self.path} (v{self.rules.version})")
+
+    def evaluate_matrix(
+        self,
+        features: np.ndarray,
+        strict: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        ÉTAPE: Évaluer N fenêtres (cœur vectorisé, sans dicts)
+
+        INPUT:
+        - features: (N x FIELDS)
+        - strict: (N,) bool, avoid_rain == "strict" (optionnel)
+
+        RETURN:
+        - severities (N,) int: index dans DECISIONS
+        - fired (N x R) bool: règles retenues (première de chaque groupe)
+        - walk_penalty (N,), bike_penalty (N,)
+        """
+        self.maybe_reload()
+        rules = self.rules
+        n = features.shape[0]
+        values = features[:, rules.columns]                       # (N x R)
+        thresholds = np.broadcast_to(rules.thresholds, values.shape)
+        if strict is not None and strict.any():
+            thresholds = np.where(strict[:, None], rules.strict_thresholds, rules.thresholds)
+        matched = np.zeros(values.shape, dtype=bool)
+        for op, indices in rules.op_groups:
+            matched[:, indices] = op(values[:, indices], thresholds[:, indices])
+
+        # if / elif dans chaque groupe: première règle déclenchée seulement
+        fired = np.zeros_like(matched)
+        rows = np.arange(n)
+        for indices in rules.groups:
+            group = matched[:, indices]
+            first = group.argmax(axis=1)
+            hit = group[rows, first]
+            fired[rows[hit], indices[first[hit]]] = True
+
+        severities = np.where(fired, rules.severities, 0).max(axis=1, initial=0)
+        walk = np.clip(features @ rules.walk_weights, 0.0, 1.0)
+        bike = np.clip(walk * rules.bike_multiplier, 0.0, 1.0)
+        self.evaluated += n
+        return severities, fired, walk, bike
+
+    def evaluate(
+        self,
+        weather_list: Sequence[dict],
+        strict: Optional[Sequence[bool]] = None
+    ) -> List[Tuple[str, List[str], dict]]:
+        """
+        ÉTAPE: Évaluer une liste de weather_data
+
+        RETURN: [(décision, raisons, {"walk_penalty", "bike_penalty"})]
+        """
+        if not weather_list:
+            return []
+        severities, fired, walk, bike = self.evaluate_matrix(
+            features_matrix(weather_list),
+            np.asarray(strict, dtype=bool) if strict is not None else None,
+        )
+        rules = self.rules
+        reasons: List[List[str]] = [[] for _ in weather_list]
+        for row, rule in zip(*np.nonzero(fired)):
+            reasons[row].append(rules.reasons[rule])
+        walk = np.round(walk, 3).tolist()
+        bike = np.round(bike, 3).tolist()
+        return [
+            (DECISIONS[severity], reasons[i], {"walk_penalty": walk[i], "bike_penalty": bike[i]})
+            for i, severity in enumerate(severities.tolist())
+        ]
+
+    def get_stats(self) -> dict:
+        """Retourner l'état des règles (pour /metrics)"""
+        return {
+            "path": self.path,
+            "version": self.rules.version,
+            "rules": len(self.rules.reasons),
+            "reloads": self.reloads,
+            "reload_errors": self.reload_errors,
+            "evaluated": self.evaluated,
+        }
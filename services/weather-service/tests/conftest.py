@@ -0,0 +1,11 @@
+"""
+Configuration des tests du Weather Service
+
+LOGIQUE:
+- Le dossier du service sur le chemin d'import (package app)
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
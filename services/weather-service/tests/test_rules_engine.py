@@ -0,0 +1,137 @@
+"""
+Tests du moteur de règles météo (rules_engine)
+
+LOGIQUE:
+- Mêmes décisions, raisons et pénalités que l'ancienne chaîne if / elif
+  (_apply_decision_rules avant le moteur vectorisé) sur une grille de
+  prévisions encadrant chaque seuil, avec et sans avoid_rain strict
+- Rechargement à chaud: une config invalide est rejetée, les règles
+  courantes restent actives ; une config valide est prise en compte
+"""
+
+import itertools
+import json
+import os
+import shutil
+
+from app.rules_engine import RulesEngine
+
+RULES_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app", "rules.json")
+
+SEVERITY = {"OK": 0, "WARNING": 1, "BLOCK": 2}
+
+
+def reference_rules(weather_data: dict, strict: bool) -> tuple:
+    """Ancienne chaîne de règles (_apply_decision_rules), décisions en texte"""
+    decision, reasons = "OK", []
+
+    def worse(candidate):
+        return candidate if SEVERITY[candidate] > SEVERITY[decision] else decision
+
+    for alert in weather_data.get("alerts", []):
+        if alert.get("severity") == "severe":
+            decision = worse("BLOCK")
+            reasons.append("Alerte météo sévère")
+        elif alert.get("severity") == "moderate":
+            decision = worse("WARNING")
+            reasons.append("Alerte météo")
+
+    rain = weather_data["rain_intensity_mmh"]
+    if rain > 10:
+        decision = worse("BLOCK")
+        reasons.append("Pluie forte")
+    elif rain > 5:
+        decision = worse("WARNING")
+        reasons.append("Pluie modérée")
+    elif weather_data["rain_probability"] > (0.4 if strict else 0.7):
+        decision = worse("WARNING")
+        reasons.append("Risque élevé de pluie")
+
+    wind = weather_data["wind_speed_kmh"]
+    if wind > 70:
+        decision = worse("BLOCK")
+        reasons.append("Vent très fort")
+    elif wind > 40:
+        decision = worse("WARNING")
+        reasons.append("Vent fort")
+
+    temperature = weather_data["temperature_c"]
+    if temperature < 0:
+        decision = worse("WARNING")
+        reasons.append("Températures glaciales")
+    elif temperature > 35:
+        decision = worse("WARNING")
+        reasons.append("Canicule")
+
+    walk_penalty = min(max((rain / 20) * 0.5 + (wind / 100) * 0.3, 0.0), 1.0)
+    bike_penalty = min(max(walk_penalty * 1.5, 0.0), 1.0)
+    return decision, reasons, {"walk_penalty": round(walk_penalty, 3), "bike_penalty": round(bike_penalty, 3)}
+
+
+def forecast_grid():
+    """Fenêtres de prévision de part et d'autre de chaque seuil"""
+    for probability, rain, temperature, wind, alert, strict in itertools.product(
+        [0.0, 0.4, 0.41, 0.7, 0.71, 1.0],
+        [0.0, 3.0, 5.0, 5.01, 10.0, 10.5, 40.0],
+        [-5.0, 0.0, 20.0, 35.0, 35.5],
+        [0.0, 40.0, 40.5, 70.0, 71.0, 400.0],
+        [None, "moderate", "severe"],
+        [False, True],
+    ):
+        yield {
+            "rain_probability": probability,
+            "rain_intensity_mmh": rain,
+            "temperature_c": temperature,
+            "wind_speed_kmh": wind,
+            "alerts": [{"severity": alert}] if alert else [],
+        }, strict
+
+
+def test_engine_matches_previous_rules():
+    engine = RulesEngine(RULES_FILE)
+    grid = list(forecast_grid())
+    results = engine.evaluate([weather for weather, _ in grid], [strict for _, strict in grid])
+    for (weather, strict), (decision, reasons, penalties) in zip(grid, results):
+        expected_decision, expected_reasons, expected_penalties = reference_rules(weather, strict)
+        assert (decision, reasons) == (expected_decision, expected_reasons), (weather, strict)
+        # Pénalités arrondies à 3 décimales: un écart d'un millième (arrondi d'un flottant) est admis
+        for name, value in expected_penalties.items():
+            assert abs(penalties[name] - value) <= 0.001 + 1e-9, (weather, strict, name)
+
+
+def _rewrite(path, content, engine):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+    # Nouvelle date de modification, même si l'écriture tombe dans la même seconde
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    engine.maybe_reload()
+
+
+def test_hot_reload_rejects_invalid_rules(tmp_path):
+    path = tmp_path / "rules.json"
+    shutil.copy(RULES_FILE, path)
+    engine = RulesEngine(str(path), check_interval_seconds=0)
+    windy = {"rain_probability": 0.0, "rain_intensity_mmh": 0.0, "temperature_c": 15.0, "wind_speed_kmh": 50.0}
+    assert engine.evaluate([windy])[0][0] == "WARNING"
+
+    config = json.loads(path.read_text(encoding="utf-8"))
+    invalid = [
+        "{ not json",
+        json.dumps({"rules": []}),
+        json.dumps({**config, "rules": [{**config["rules"][0], "op": "=="}]}),
+        json.dumps({**config, "rules": [{**config["rules"][0], "field": "humidity"}]}),
+    ]
+    for errors, content in enumerate(invalid, start=1):
+        _rewrite(path, content, engine)
+        assert engine.reload_errors == errors
+        assert engine.rules.version == 1
+        assert engine.evaluate([windy])[0][0] == "WARNING"
+
+    for rule in config["rules"]:
+        if rule["reason"] == "Vent fort":
+            rule["value"] = 60
+    _rewrite(path, json.dumps(config), engine)
+    assert engine.reloads == 1
+    assert engine.rules.version == 2
+    assert engine.evaluate([windy])[0][0] == "OK"